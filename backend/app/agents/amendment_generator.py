@@ -1,14 +1,32 @@
 """Amendment generation agent."""
 
-from typing import List
+import asyncio
+import logging
+from typing import List, Optional
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
-from app.core.llm import get_llm
+from app.core.config import settings
+from app.core.json_repair import TolerantJsonOutputParser, ainvoke_json
+from app.core.llm import LLMTask, get_llm
+from app.core.metrics import AGENT_PARSE_FAILURES, instrument
+from app.core.tokens import pack_indices, plan_budget
+from app.core.tracing import set_attributes
 from app.models.amendment import AmendmentSuggestion, AmendmentType
 
 
+AMENDMENT_COMPLETION_TOKENS = 1024
+# Proposed text roughly mirrors the original, plus rationale and negotiation points
+AMENDMENT_OUTPUT_RATIO = 1.5
+# Share of the input budget the contract summary may take
+SUMMARY_BUDGET_SHARE = 0.2
+# Share of a single clause's budget its risk analysis may take
+RISK_ANALYSIS_BUDGET_SHARE = 1 / 3
+PRIORITY_ORDER = ["low", "medium", "high"]
+
+logger = logging.getLogger(__name__)
+
+
 class AmendmentResult(BaseModel):
     """Amendment generation result."""
     amendments: List[dict] = Field(description="List of suggested amendments")
@@ -18,19 +36,21 @@ class AmendmentGeneratorAgent:
     """Agent for generating contract amendments."""
 
     def __init__(self):
-        self.llm = get_llm()
-        self.parser = JsonOutputParser(pydantic_object=AmendmentResult)
+        self.llm = get_llm(LLMTask.AMENDMENT_BULK)
+        self.single_llm = get_llm(LLMTask.AMENDMENT_SINGLE)
+        self.parser = TolerantJsonOutputParser(pydantic_object=AmendmentResult, agent="amendment_generator")
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert legal contract drafter. Generate suggested amendments for problematic clauses.
 
-For each clause that needs modification, provide:
-1. original_text: The original clause text
-2. proposed_text: The improved clause text
-3. amendment_type: modification, addition, deletion, or replacement
-4. rationale: Why this change is recommended
-5. risk_mitigation: How this amendment reduces risk
-6. negotiation_points: Key points for negotiation
-7. priority: low, medium, or high
+Clauses are numbered like [3]. For each clause that needs modification, provide:
+1. clause_ref: The number of the clause being amended
+2. original_text: The original clause text
+3. proposed_text: The improved clause text
+4. amendment_type: modification, addition, deletion, or replacement
+5. rationale: Why this change is recommended
+6. risk_mitigation: How this amendment reduces risk
+7. negotiation_points: Key points for negotiation
+8. priority: low, medium, or high
 
 Focus on:
 - Balancing interests of all parties
@@ -40,60 +60,137 @@ Focus on:
 - Industry standard practices
 
 {format_instructions}"""),
-            ("human", """Generate amendments for these problematic clauses in a {contract_type} contract:
+            # The summary precedes the clauses so every group of a contract
+            # shares the prompt prefix
+            ("human", """Contract Summary ({contract_type} contract):
+{contract_summary}"""),
+            ("human", """Generate amendments for these problematic clauses:
 
-{clauses_with_risks}
-
-Contract Summary:
-{contract_summary}""")
+{clauses_with_risks}""")
         ])
 
+    @instrument("amendment_generator")
     async def generate(
         self,
-        clauses_with_risks: str,
+        clauses_with_risks: List[str],
         contract_type: str,
         contract_summary: str = ""
     ) -> List[AmendmentSuggestion]:
-        """Generate amendment suggestions."""
-        chain = self.prompt | self.llm | self.parser
-
-        result = await chain.ainvoke({
-            "clauses_with_risks": clauses_with_risks,
-            "contract_type": contract_type,
-            "contract_summary": contract_summary or "No summary available",
-            "format_instructions": self.parser.get_format_instructions()
-        })
-
-        suggestions = []
-        for amendment_data in result.get("amendments", []):
-            try:
-                amendment_type_str = amendment_data.get("amendment_type", "modification").lower()
+        """Generate amendment suggestions.
+
+        Each entry of `clauses_with_risks` describes one clause. Entries are
+        packed into groups of at most `amendment_group_tokens`, which are
+        generated concurrently; each suggestion's `clause_index` points
+        back at its entry when the model's answer allows it. An entry too
+        large for a group is split into parts sent under the same clause
+        number, each amended on its own. A group that still fails after its
+        retries is skipped, keeping the other groups' amendments; only when
+        every group fails is the first error raised.
+        """
+        format_instructions = self.parser.get_format_instructions()
+        budget = plan_budget(
+            LLMTask.AMENDMENT_BULK,
+            self.prompt,
+            AMENDMENT_COMPLETION_TOKENS,
+            format_instructions=format_instructions,
+            contract_type=contract_type
+        )
+        limit = budget.input_tokens(AMENDMENT_OUTPUT_RATIO)
+        contract_summary = budget.trim(
+            contract_summary or "No summary available",
+            int(limit * SUMMARY_BUDGET_SHARE)
+        )
+        clause_limit = min(limit - budget.count(contract_summary), settings.amendment_group_tokens)
+
+        # Parts of the clauses, and the clause each part belongs to
+        parts: List[str] = []
+        owners: List[int] = []
+        for i, clause in enumerate(clauses_with_risks):
+            clause_parts = budget.split(clause, clause_limit) if budget.count(clause) > clause_limit else [clause]
+            parts.extend(clause_parts)
+            owners.extend([i] * len(clause_parts))
+
+        part_groups = pack_indices(parts, clause_limit, budget.provider)
+        set_attributes(clauses=len(clauses_with_risks), parts=len(parts), groups=len(part_groups))
+
+        async def generate_group(part_group: List[int]) -> List[AmendmentSuggestion]:
+            clauses_text = "\n\n".join(
+                f"[{owners[j] + 1}] {budget.trim(parts[j], clause_limit)}" for j in part_group
+            )
+            group = list(dict.fromkeys(owners[j] for j in part_group))
+            result = await ainvoke_json(self.prompt, self.llm, self.parser, {
+                "clauses_with_risks": clauses_text,
+                "contract_type": contract_type,
+                "contract_summary": contract_summary,
+                "format_instructions": format_instructions
+            }, list_field="amendments")
+
+            group_suggestions = []
+            for amendment_data in result.get("amendments", []):
                 try:
-                    amendment_type = AmendmentType(amendment_type_str)
-                except ValueError:
-                    amendment_type = AmendmentType.MODIFICATION
-
-                suggestions.append(AmendmentSuggestion(
-                    original_text=amendment_data.get("original_text", ""),
-                    proposed_text=amendment_data.get("proposed_text", ""),
-                    amendment_type=amendment_type,
-                    rationale=amendment_data.get("rationale", ""),
-                    risk_mitigation=amendment_data.get("risk_mitigation", ""),
-                    negotiation_points=amendment_data.get("negotiation_points", []),
-                    priority=amendment_data.get("priority", "medium")
-                ))
-            except Exception:
-                continue
-
-        return suggestions
+                    suggestion = self._to_suggestion(amendment_data)
+                except Exception:
+                    AGENT_PARSE_FAILURES.inc(agent="amendment_generator")
+                    continue
+                suggestion.clause_index = self._clause_index(
+                    amendment_data, suggestion, group, clauses_with_risks
+                )
+                group_suggestions.append(suggestion)
+            return group_suggestions
+
+        # Groups are independent; the router's rate limits and adaptive
+        # concurrency bound how many actually run at once
+        results = await asyncio.gather(*(generate_group(group) for group in part_groups), return_exceptions=True)
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            set_attributes(failed_groups=len(failures))
+            if len(failures) == len(results):
+                raise failures[0]
+            logger.warning(
+                "Amendment generation failed for %d of %d clause groups", len(failures), len(results),
+                exc_info=failures[0]
+            )
+        return [
+            suggestion for group_suggestions in results if not isinstance(group_suggestions, Exception)
+            for suggestion in group_suggestions
+        ]
+
+    @staticmethod
+    def _clause_index(
+        amendment_data: dict,
+        suggestion: AmendmentSuggestion,
+        group: List[int],
+        clauses_with_risks: List[str]
+    ) -> Optional[int]:
+        """Map an amendment back to the clause it addresses within its group."""
+        try:
+            index = int(str(amendment_data.get("clause_ref", "")).strip("[] ")) - 1
+        except ValueError:
+            index = None
+        if index in group:
+            return index
+        if len(group) == 1:
+            return group[0]
+        # Fall back to the quoted original text
+        original = suggestion.original_text.strip()[:200]
+        if original:
+            for i in group:
+                if original in clauses_with_risks[i]:
+                    return i
+        return None
 
+    @instrument("amendment_generator")
     async def generate_single(
         self,
         clause_text: str,
         clause_type: str,
         risk_analysis: str
     ) -> AmendmentSuggestion:
-        """Generate amendment for a single clause."""
+        """Generate amendment for a single clause.
+
+        A clause too large for the budget is amended in parts, which are
+        merged into one suggestion.
+        """
         single_prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert legal contract drafter. Generate an improved version of the problematic clause.
 
@@ -116,21 +213,61 @@ Risk Analysis:
 {risk_analysis}""")
         ])
 
-        chain = single_prompt | self.llm | self.parser
+        format_instructions = self.parser.get_format_instructions()
+        budget = plan_budget(
+            LLMTask.AMENDMENT_SINGLE,
+            single_prompt,
+            AMENDMENT_COMPLETION_TOKENS,
+            format_instructions=format_instructions,
+            clause_type=clause_type
+        )
+        limit = budget.input_tokens(AMENDMENT_OUTPUT_RATIO)
+        risk_analysis = budget.trim(risk_analysis, int(limit * RISK_ANALYSIS_BUDGET_SHARE))
+        clause_limit = limit - budget.count(risk_analysis)
+
+        async def generate_part(part: str) -> AmendmentSuggestion:
+            result = await ainvoke_json(single_prompt, self.single_llm, self.parser, {
+                "clause_text": part,
+                "clause_type": clause_type,
+                "risk_analysis": risk_analysis,
+                "format_instructions": format_instructions
+            })
+
+            amendments = result.get("amendments", [result])
+            if not amendments:
+                amendments = [result]
 
-        result = await chain.ainvoke({
-            "clause_text": clause_text,
-            "clause_type": clause_type,
-            "risk_analysis": risk_analysis,
-            "format_instructions": self.parser.get_format_instructions()
-        })
+            amendment_data = amendments[0] if isinstance(amendments, list) else amendments
+            amendment_data.setdefault("original_text", part)
+            return self._to_suggestion(amendment_data)
 
-        amendments = result.get("amendments", [result])
-        if not amendments:
-            amendments = [result]
+        if budget.count(clause_text) > clause_limit:
+            parts = budget.split(clause_text, clause_limit)
+            set_attributes(parts=len(parts))
+            suggestions = await asyncio.gather(*(generate_part(part) for part in parts))
+            return self._merge(clause_text, suggestions)
 
-        amendment_data = amendments[0] if isinstance(amendments, list) else amendments
+        return await generate_part(clause_text)
+
+    @staticmethod
+    def _merge(clause_text: str, suggestions: List[AmendmentSuggestion]) -> AmendmentSuggestion:
+        """Combine the amendments of a clause's parts, in clause order."""
+        return AmendmentSuggestion(
+            original_text=clause_text,
+            proposed_text="\n\n".join(s.proposed_text for s in suggestions if s.proposed_text),
+            amendment_type=suggestions[0].amendment_type,
+            rationale="\n\n".join(s.rationale for s in suggestions if s.rationale),
+            risk_mitigation="\n\n".join(s.risk_mitigation for s in suggestions if s.risk_mitigation),
+            negotiation_points=list(dict.fromkeys(p for s in suggestions for p in s.negotiation_points)),
+            priority=max(
+                (s.priority for s in suggestions),
+                key=lambda p: PRIORITY_ORDER.index(p) if p in PRIORITY_ORDER else 1
+            )
+        )
 
+    @staticmethod
+    def _to_suggestion(amendment_data: dict) -> AmendmentSuggestion:
+        """Build a suggestion from one amendment object in the model output."""
         amendment_type_str = amendment_data.get("amendment_type", "modification").lower()
         try:
             amendment_type = AmendmentType(amendment_type_str)
@@ -138,7 +275,7 @@ Risk Analysis:
             amendment_type = AmendmentType.MODIFICATION
 
         return AmendmentSuggestion(
-            original_text=amendment_data.get("original_text", clause_text),
+            original_text=amendment_data.get("original_text", ""),
             proposed_text=amendment_data.get("proposed_text", ""),
             amendment_type=amendment_type,
             rationale=amendment_data.get("rationale", ""),
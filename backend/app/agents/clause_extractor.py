@@ -1,14 +1,25 @@
 """Clause extraction agent."""
 
-from typing import List
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
-from app.core.llm import get_llm
+from app.core.json_repair import TolerantJsonOutputParser, ainvoke_json
+from app.core.llm import LLMTask, get_llm
+from app.core.memory_budget import reserve_text
+from app.core.metrics import AGENT_PARSE_FAILURES, instrument
+from app.core.text_store import ContractText, read_text, text_size
+from app.core.tokens import plan_budget
+from app.core.tracing import set_attributes
 from app.models.clause import ClauseType
 
 
+EXTRACTION_COMPLETION_TOKENS = 512
+# Extraction echoes clause text back, so reserve output room per input token
+EXTRACTION_OUTPUT_RATIO = 1.2
+
+
 class ExtractedClause(BaseModel):
     """Extracted clause schema."""
     clause_type: str = Field(description="Type of clause")
@@ -27,8 +38,8 @@ class ClauseExtractorAgent:
     """Agent for extracting clauses from contracts."""
 
     def __init__(self):
-        self.llm = get_llm()
-        self.parser = JsonOutputParser(pydantic_object=ClauseExtractionResult)
+        self.llm = get_llm(LLMTask.CLAUSE_EXTRACTION)
+        self.parser = TolerantJsonOutputParser(pydantic_object=ClauseExtractionResult, agent="clause_extractor")
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert legal document analyst specializing in clause identification.
 
@@ -45,20 +56,55 @@ Be thorough and extract all identifiable clauses.
             ("human", "Extract clauses from this contract:\n\n{contract_text}")
         ])
 
-    async def extract(self, contract_text: str) -> List[ExtractedClause]:
-        """Extract clauses from contract text."""
-        # Truncate if too long
-        max_chars = 50000
-        if len(contract_text) > max_chars:
-            contract_text = contract_text[:max_chars]
-
-        chain = self.prompt | self.llm | self.parser
-
-        result = await chain.ainvoke({
-            "contract_text": contract_text,
-            "format_instructions": self.parser.get_format_instructions()
-        })
-
+    @instrument("clause_extractor")
+    async def extract(
+        self,
+        contract_text: ContractText,
+        on_chunk: Optional[Callable[[List[ExtractedClause]], Awaitable[None]]] = None
+    ) -> List[ExtractedClause]:
+        """Extract clauses from contract text.
+
+        Text larger than the token budget is split at paragraph boundaries
+        and the parts are extracted concurrently, as far as the job's memory
+        budget allows. Parts of spilled text are read only when their call runs.
+        `on_chunk` is awaited with each part's clauses as soon as that part
+        is done, one part at a time; the result lists them in document order.
+        """
+        format_instructions = self.parser.get_format_instructions()
+        budget = plan_budget(
+            LLMTask.CLAUSE_EXTRACTION,
+            self.prompt,
+            EXTRACTION_COMPLETION_TOKENS,
+            format_instructions=format_instructions
+        )
+        chunks = budget.split(contract_text, budget.input_tokens(EXTRACTION_OUTPUT_RATIO))
+        set_attributes(chars=len(contract_text), chunks=len(chunks))
+
+        async def extract_chunk(index: int, chunk) -> Tuple[int, List[ExtractedClause]]:
+            async with reserve_text(text_size(chunk)):
+                result = await ainvoke_json(self.prompt, self.llm, self.parser, {
+                    "contract_text": read_text(chunk),
+                    "format_instructions": format_instructions
+                }, list_field="clauses")
+            return index, self._to_clauses(result)
+
+        tasks = [asyncio.ensure_future(extract_chunk(i, chunk)) for i, chunk in enumerate(chunks)]
+        results: List[List[ExtractedClause]] = [[] for _ in chunks]
+        try:
+            for done in asyncio.as_completed(tasks):
+                index, chunk_clauses = await done
+                results[index] = chunk_clauses
+                if on_chunk is not None:
+                    await on_chunk(chunk_clauses)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return [clause for chunk_clauses in results for clause in chunk_clauses]
+
+    @staticmethod
+    def _to_clauses(result: dict) -> List[ExtractedClause]:
+        """Clauses of one extraction answer, skipping malformed entries."""
         clauses = []
         for clause_data in result.get("clauses", []):
             try:
@@ -74,6 +120,7 @@ Be thorough and extract all identifiable clauses.
                     key_terms=clause_data.get("key_terms", [])
                 ))
             except Exception:
+                AGENT_PARSE_FAILURES.inc(agent="clause_extractor")
                 continue
 
         return clauses
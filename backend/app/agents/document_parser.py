@@ -1,23 +1,35 @@
 """Document parsing agent."""
 
-from typing import Optional
-import fitz  # PyMuPDF
-from docx import Document
+import asyncio
+from typing import Iterator, Optional, Set
 from pathlib import Path
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
-
-from app.core.llm import get_llm
+from langchain_core.output_parsers import StrOutputParser
+
+from app.core.config import settings
+from app.core.json_repair import TolerantJsonOutputParser, ainvoke_json
+from app.core.llm import LLMTask, get_llm
+from app.core.memory_budget import reserve_text
+from app.core.metrics import instrument
+from app.core.text_store import ContractText, read_text, spool_text, text_size
+from app.core.tokens import plan_budget
+from app.core.tracing import set_attributes, traced
 from app.models.contract import ContractAnalysis, ContractType
 
 
+ANALYSIS_COMPLETION_TOKENS = 1024
+# Analysis fields the rule-based metadata extractor can settle
+EXTRACTABLE_FIELDS = ["parties", "effective_date", "expiration_date"]
+CONDENSE_COMPLETION_TOKENS = 1024
+
+
 class DocumentParserAgent:
     """Agent for parsing contract documents."""
 
     def __init__(self):
-        self.llm = get_llm()
-        self.parser = JsonOutputParser(pydantic_object=ContractAnalysis)
+        self.llm = get_llm(LLMTask.DOCUMENT_SUMMARY)
+        self.parser = TolerantJsonOutputParser(pydantic_object=ContractAnalysis, agent="document_parser")
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert legal document analyst. Analyze the provided contract text and extract key information.
 
@@ -33,11 +45,24 @@ Extract the following:
 9. Recommendations for review
 
 {format_instructions}"""),
-            ("human", "Analyze this contract:\n\n{contract_text}")
+            ("human", "Analyze this contract:{known_note}\n\n{contract_text}")
         ])
+        self.condense_prompt = ChatPromptTemplate.from_messages([
+            ("system", """You are an expert legal document analyst. Condense this portion of a contract into dense notes for a later full-contract analysis.
+
+Preserve parties, dates, amounts, obligations, termination and liability terms, and any unusual provisions. Use at most {max_words} words."""),
+            ("human", "Contract portion {part} of {total}:\n\n{contract_text}")
+        ])
+
+    @staticmethod
+    def extract_text_from_pdf(file_path: str) -> str:
+        """Extract text from PDF file, layout-aware unless `pdf_extraction_mode` is "plain"."""
+        if settings.pdf_extraction_mode == "layout":
+            from app.services.pdf_extraction import extract_pdf_layout
+            return extract_pdf_layout(file_path)
+
+        import fitz  # PyMuPDF
 
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file."""
         doc = fitz.open(file_path)
         text = ""
         for page in doc:
@@ -45,49 +70,125 @@ Extract the following:
         doc.close()
         return text
 
-    def extract_text_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file."""
+    @staticmethod
+    def extract_text_from_docx(file_path: str) -> str:
+        """Extract text from DOCX file, streamed unless `docx_extraction_mode` is "plain"."""
+        if settings.docx_extraction_mode == "stream":
+            from app.services.docx_extraction import extract_docx_text
+            return extract_docx_text(file_path)
+
+        from docx import Document
+
         doc = Document(file_path)
         text = ""
         for paragraph in doc.paragraphs:
             text += paragraph.text + "\n"
         return text
 
-    def extract_text(self, file_path: str) -> str:
+    @staticmethod
+    @traced("document_parser.extract_text")
+    def extract_text(file_path: str) -> str:
         """Extract text from document based on file type."""
         path = Path(file_path)
         extension = path.suffix.lower()
+        set_attributes(extension=extension)
 
         if extension == ".pdf":
-            return self.extract_text_from_pdf(file_path)
+            return DocumentParserAgent.extract_text_from_pdf(file_path)
         elif extension in [".docx", ".doc"]:
-            return self.extract_text_from_docx(file_path)
+            return DocumentParserAgent.extract_text_from_docx(file_path)
         elif extension == ".txt":
             with open(file_path, "r", encoding="utf-8") as f:
                 return f.read()
         else:
             raise ValueError(f"Unsupported file type: {extension}")
 
+    @staticmethod
+    def iter_text(file_path: str) -> Iterator[str]:
+        """Extract text from a document piece by piece (pages, lines or blocks)."""
+        extension = Path(file_path).suffix.lower()
+        if extension == ".pdf":
+            if settings.pdf_extraction_mode == "layout":
+                from app.services.pdf_extraction import iter_pdf_layout
+                yield from iter_pdf_layout(file_path)
+                return
+            import fitz  # PyMuPDF
+
+            with fitz.open(file_path) as doc:
+                for page in doc:
+                    yield page.get_text()
+        elif extension in [".docx", ".doc"]:
+            if settings.docx_extraction_mode == "stream":
+                from app.services.docx_extraction import iter_docx_lines
+                for line in iter_docx_lines(file_path):
+                    yield line + "\n"
+                return
+            yield DocumentParserAgent.extract_text_from_docx(file_path)
+        elif extension == ".txt":
+            with open(file_path, "r", encoding="utf-8") as f:
+                while True:
+                    block = f.read(1024 * 1024)
+                    if not block:
+                        return
+                    yield block
+        else:
+            raise ValueError(f"Unsupported file type: {extension}")
+
+    @staticmethod
+    @traced("document_parser.extract_contract_text")
+    def extract_contract_text(file_path: str, spill_path: str) -> ContractText:
+        """Extract text, keeping it on disk at `spill_path` if it exceeds `text_spill_threshold`."""
+        if not settings.text_spill_threshold:
+            return DocumentParserAgent.extract_text(file_path)
+        text = spool_text(DocumentParserAgent.iter_text(file_path), spill_path, settings.text_spill_threshold)
+        set_attributes(chars=len(text), spilled=not isinstance(text, str))
+        return text
+
+    @instrument("document_parser")
     async def parse(self, file_path: str) -> tuple[str, ContractAnalysis]:
         """Parse contract document and extract analysis."""
         raw_text = self.extract_text(file_path)
+        analysis = await self.analyze(raw_text)
+        return raw_text, analysis
 
-        # Truncate if too long
-        max_chars = 50000
-        if len(raw_text) > max_chars:
-            raw_text = raw_text[:max_chars] + "\n\n[Document truncated for analysis...]"
+    @instrument("document_parser")
+    async def analyze(self, raw_text: ContractText, known_fields: Optional[Set[str]] = None) -> ContractAnalysis:
+        """Analyze contract text, condensing it first if it exceeds the token budget.
+
+        `known_fields` were already extracted without the LLM, which is told
+        to leave them empty. Spilled text is read a chunk at a time.
+        """
+        format_instructions = self.parser.get_format_instructions()
+        known = [name for name in EXTRACTABLE_FIELDS if name in (known_fields or ())]
+        known_note = f" ({', '.join(known)} already extracted; leave empty)" if known else ""
+        budget = plan_budget(
+            LLMTask.DOCUMENT_SUMMARY,
+            self.prompt,
+            ANALYSIS_COMPLETION_TOKENS,
+            format_instructions=format_instructions,
+            known_note=known_note
+        )
+        limit = budget.input_tokens()
 
-        chain = self.prompt | self.llm | self.parser
+        tokens = budget.count(raw_text)
+        set_attributes(chars=len(raw_text), tokens=tokens, condensed=tokens > limit)
 
-        result = await chain.ainvoke({
-            "contract_text": raw_text,
-            "format_instructions": self.parser.get_format_instructions()
-        })
+        if tokens > limit:
+            contract_text = budget.trim(await self._condense(raw_text, limit), limit)
+        else:
+            contract_text = read_text(raw_text)
 
-        analysis = ContractAnalysis(
+        async with reserve_text(len(contract_text)):
+            result = await ainvoke_json(self.prompt, self.llm, self.parser, {
+                "contract_text": contract_text,
+                "format_instructions": format_instructions,
+                "known_note": known_note
+            })
+
+        return ContractAnalysis(
             summary=result.get("summary", ""),
             contract_type=ContractType(result.get("contract_type", "other")),
-            parties=result.get("parties", []),
+            parties=result.get("parties") or [],
             effective_date=result.get("effective_date"),
             expiration_date=result.get("expiration_date"),
             key_terms=result.get("key_terms", []),
@@ -96,4 +197,25 @@ Extract the following:
             recommendations=result.get("recommendations", [])
         )
 
-        return raw_text, analysis
+    async def _condense(self, raw_text: ContractText, target_tokens: int) -> str:
+        """Condense an oversized document part by part, in parallel within the job's memory budget."""
+        budget = plan_budget(LLMTask.DOCUMENT_SUMMARY, self.condense_prompt, CONDENSE_COMPLETION_TOKENS)
+        chunks = budget.split(raw_text, budget.input_tokens())
+        set_attributes(chunks=len(chunks))
+        # Roughly 0.75 words per token, shared across parts
+        max_words = max(100, int(target_tokens * 0.75 / len(chunks)))
+
+        chain = self.condense_prompt | self.llm | StrOutputParser()
+
+        async def condense(i: int, chunk) -> str:
+            async with reserve_text(text_size(chunk)):
+                return await chain.ainvoke({
+                    "contract_text": read_text(chunk),
+                    "part": i + 1,
+                    "total": len(chunks),
+                    "max_words": max_words
+                })
+
+        notes = await asyncio.gather(*[condense(i, chunk) for i, chunk in enumerate(chunks)])
+
+        return "\n\n".join(f"[Part {i + 1}]\n{note}" for i, note in enumerate(notes))
@@ -1,14 +1,24 @@
 """Risk analysis agent."""
 
+import asyncio
 from typing import List
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
-from app.core.llm import get_llm
+from app.core.json_repair import TolerantJsonOutputParser, ainvoke_json
+from app.core.llm import LLMTask, get_llm
+from app.core.metrics import instrument
+from app.core.tokens import PromptBudget, plan_budget
+from app.core.tracing import set_attributes
 from app.models.clause import ClauseRiskAssessment, RiskLevel
 
 
+RISK_COMPLETION_TOKENS = 768
+# Share of the input budget a clause may take before it is split
+CLAUSE_BUDGET_SHARE = 0.75
+RISK_LEVEL_ORDER = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+
+
 class RiskAnalysisResult(BaseModel):
     """Risk analysis result schema."""
     risk_level: str = Field(description="low, medium, high, or critical")
@@ -22,8 +32,8 @@ class RiskAnalyzerAgent:
     """Agent for analyzing clause and contract risks."""
 
     def __init__(self):
-        self.llm = get_llm()
-        self.parser = JsonOutputParser(pydantic_object=RiskAnalysisResult)
+        self.llm = get_llm(LLMTask.RISK_ANALYSIS)
+        self.parser = TolerantJsonOutputParser(pydantic_object=RiskAnalysisResult, agent="risk_analyzer")
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are an expert legal risk analyst. Analyze the provided clause for potential legal and business risks.
 
@@ -47,18 +57,20 @@ Provide:
 5. recommendations: Actionable recommendations to mitigate risks
 
 {format_instructions}"""),
+            # Instructions and contract context form a prefix shared by every
+            # clause of a contract, so providers can serve it from cache
+            ("human", """Contract Context:
+{contract_context}"""),
             ("human", """Analyze risks in this {clause_type} clause:
 
 Clause Title: {clause_title}
 Section: {section_number}
 
 Clause Text:
-{clause_text}
-
-Contract Context:
-{contract_context}""")
+{clause_text}""")
         ])
 
+    @instrument("risk_analyzer")
     async def analyze_clause(
         self,
         clause_text: str,
@@ -67,15 +79,66 @@ Contract Context:
         section_number: str = "",
         contract_context: str = ""
     ) -> ClauseRiskAssessment:
-        """Analyze risk for a single clause."""
-        chain = self.prompt | self.llm | self.parser
+        """Analyze risk for a single clause.
+
+        The contract context gets a fixed share of the budget, independent
+        of the clause, so every clause of a contract sends the same prompt
+        prefix; a clause too large for its share is assessed in parts and
+        merged.
+        """
+        format_instructions = self.parser.get_format_instructions()
+        clause_title = clause_title or "Untitled"
+        section_number = section_number or "N/A"
+        budget = plan_budget(
+            LLMTask.RISK_ANALYSIS,
+            self.prompt,
+            RISK_COMPLETION_TOKENS,
+            format_instructions=format_instructions,
+            clause_type=clause_type,
+            clause_title=clause_title,
+            section_number=section_number
+        )
+        limit = budget.input_tokens()
+        clause_limit = int(limit * CLAUSE_BUDGET_SHARE)
+        set_attributes(clause_type=clause_type, chars=len(clause_text))
+
+        if budget.count(clause_text) > clause_limit:
+            parts = budget.split(clause_text, clause_limit)
+            set_attributes(parts=len(parts))
+            assessments = await asyncio.gather(*[
+                self._analyze(budget, limit, part, clause_type, clause_title, section_number, contract_context)
+                for part in parts
+            ])
+            return self._merge(assessments)
+
+        return await self._analyze(
+            budget, limit, clause_text, clause_type, clause_title, section_number, contract_context
+        )
+
+    async def _analyze(
+        self,
+        budget: PromptBudget,
+        limit: int,
+        clause_text: str,
+        clause_type: str,
+        clause_title: str,
+        section_number: str,
+        contract_context: str
+    ) -> ClauseRiskAssessment:
+        """Run one risk analysis call for text that fits the budget."""
+        clause_limit = int(limit * CLAUSE_BUDGET_SHARE)
+        clause_text = budget.trim(clause_text, clause_limit)
+        contract_context = budget.trim(
+            contract_context or "No additional context provided",
+            limit - clause_limit
+        )
 
-        result = await chain.ainvoke({
+        result = await ainvoke_json(self.prompt, self.llm, self.parser, {
             "clause_text": clause_text,
             "clause_type": clause_type,
-            "clause_title": clause_title or "Untitled",
-            "section_number": section_number or "N/A",
-            "contract_context": contract_context or "No additional context provided",
+            "clause_title": clause_title,
+            "section_number": section_number,
+            "contract_context": contract_context,
             "format_instructions": self.parser.get_format_instructions()
         })
 
@@ -97,3 +160,15 @@ Contract Context:
             analysis=result.get("analysis", ""),
             recommendations=result.get("recommendations", [])
         )
+
+    @staticmethod
+    def _merge(assessments: List[ClauseRiskAssessment]) -> ClauseRiskAssessment:
+        """Combine assessments of a clause's parts, keeping the worst risk."""
+        worst = max(assessments, key=lambda a: a.risk_score)
+        return ClauseRiskAssessment(
+            risk_level=max((a.risk_level for a in assessments), key=RISK_LEVEL_ORDER.index),
+            risk_score=worst.risk_score,
+            risk_factors=list(dict.fromkeys(f for a in assessments for f in a.risk_factors)),
+            analysis="\n\n".join(a.analysis for a in assessments if a.analysis),
+            recommendations=list(dict.fromkeys(r for a in assessments for r in a.recommendations))
+        )
@@ -5,7 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.coordination import lease
 from app.core.database import get_db
+from app.core.tracing import set_attributes
 from app.models.amendment import (
     Amendment,
     AmendmentCreate,
@@ -14,7 +16,7 @@ from app.models.amendment import (
 )
 from app.models.contract import Contract
 from app.models.clause import Clause, RiskLevel
-from app.agents.amendment_generator import AmendmentGeneratorAgent
+from app.services.amendments import generate_contract_amendments, get_risky_clauses
 
 router = APIRouter()
 
@@ -64,6 +66,7 @@ async def generate_amendments(
     db: AsyncSession = Depends(get_db)
 ):
     """Generate amendments for high-risk clauses."""
+    set_attributes(contract_id=contract_id)
     # Get contract
     contract_result = await db.execute(
         select(Contract).where(Contract.id == contract_id)
@@ -73,60 +76,18 @@ async def generate_amendments(
     if not contract:
         raise HTTPException(404, "Contract not found")
 
-    # Get high-risk clauses
-    risk_levels = [RiskLevel.CRITICAL, RiskLevel.HIGH]
-    if risk_threshold == RiskLevel.MEDIUM:
-        risk_levels.append(RiskLevel.MEDIUM)
+    async with lease(f"contract:{contract_id}", "amendments"):
+        clauses = await get_risky_clauses(db, contract_id, risk_threshold)
 
-    clauses_result = await db.execute(
-        select(Clause).where(
-            Clause.contract_id == contract_id,
-            Clause.risk_level.in_(risk_levels)
-        )
-    )
-    clauses = clauses_result.scalars().all()
-
-    if not clauses:
-        return {
-            "message": "No high-risk clauses found requiring amendments",
-            "amendments": []
-        }
-
-    # Format clauses for amendment generation
-    clauses_text = "\n\n".join([
-        f"Clause: {c.title or 'Untitled'} ({c.clause_type.value})\n"
-        f"Risk Level: {c.risk_level.value if c.risk_level else 'unknown'}\n"
-        f"Risk Factors: {', '.join(c.risk_factors or [])}\n"
-        f"Text: {c.text}\n"
-        f"Analysis: {c.analysis or 'No analysis'}"
-        for c in clauses
-    ])
-
-    # Generate amendments
-    generator = AmendmentGeneratorAgent()
-    suggestions = await generator.generate(
-        clauses_with_risks=clauses_text,
-        contract_type=contract.contract_type.value,
-        contract_summary=contract.summary or ""
-    )
+        if not clauses:
+            return {
+                "message": "No high-risk clauses found requiring amendments",
+                "amendments": []
+            }
 
-    # Create amendment records
-    amendments_created = []
-    for suggestion in suggestions:
-        amendment = Amendment(
-            contract_id=contract_id,
-            amendment_type=suggestion.amendment_type,
-            original_text=suggestion.original_text,
-            proposed_text=suggestion.proposed_text,
-            rationale=suggestion.rationale,
-            risk_mitigation=suggestion.risk_mitigation,
-            negotiation_points=suggestion.negotiation_points,
-            status=AmendmentStatus.DRAFT
-        )
-        db.add(amendment)
-        amendments_created.append(amendment)
+        amendments_created = await generate_contract_amendments(db, contract, clauses)
 
-    await db.commit()
+        await db.commit()
 
     return {
         "message": f"Generated {len(amendments_created)} amendments",
@@ -150,27 +111,29 @@ async def generate_clause_amendment(
         raise HTTPException(404, "Clause not found")
 
     # Generate amendment
+    from app.agents.amendment_generator import AmendmentGeneratorAgent
     generator = AmendmentGeneratorAgent()
-    suggestion = await generator.generate_single(
-        clause_text=clause.text,
-        clause_type=clause.clause_type.value,
-        risk_analysis=clause.analysis or "No risk analysis available"
-    )
+    async with lease(f"contract:{clause.contract_id}", "amendment"):
+        suggestion = await generator.generate_single(
+            clause_text=clause.text,
+            clause_type=clause.clause_type.value,
+            risk_analysis=clause.analysis or "No risk analysis available"
+        )
 
-    # Create amendment record
-    amendment = Amendment(
-        contract_id=clause.contract_id,
-        clause_id=clause_id,
-        amendment_type=suggestion.amendment_type,
-        original_text=suggestion.original_text,
-        proposed_text=suggestion.proposed_text,
-        rationale=suggestion.rationale,
-        risk_mitigation=suggestion.risk_mitigation,
-        negotiation_points=suggestion.negotiation_points,
-        status=AmendmentStatus.DRAFT
-    )
-    db.add(amendment)
-    await db.commit()
+        # Create amendment record
+        amendment = Amendment(
+            contract_id=clause.contract_id,
+            clause_id=clause_id,
+            amendment_type=suggestion.amendment_type,
+            original_text=suggestion.original_text,
+            proposed_text=suggestion.proposed_text,
+            rationale=suggestion.rationale,
+            risk_mitigation=suggestion.risk_mitigation,
+            negotiation_points=suggestion.negotiation_points,
+            status=AmendmentStatus.DRAFT
+        )
+        db.add(amendment)
+        await db.commit()
     await db.refresh(amendment)
 
     return amendment
@@ -1,6 +1,8 @@
 """Analytics API endpoints."""
 
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
@@ -8,6 +10,7 @@ from app.core.database import get_db
 from app.models.contract import Contract, ContractStatus, ContractType
 from app.models.clause import Clause, ClauseType, RiskLevel
 from app.models.amendment import Amendment, AmendmentStatus
+from app.models.portfolio import RiskModelWeights
 
 router = APIRouter()
 
@@ -133,3 +136,79 @@ async def get_analytics(db: AsyncSession = Depends(get_db)):
         "amendments_by_status": amendments_data,
         "most_risky_clause_types": risky_types_data
     }
+
+
+@router.get("/portfolio-risk")
+async def get_portfolio_risk(
+    contract_type: Optional[ContractType] = None,
+    min_risk_index: Optional[float] = Query(None, ge=0, le=1),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rank contracts by their risk index computed from clause scores."""
+    from app.services.portfolio_risk import PORTFOLIO_RISK
+    return await PORTFOLIO_RISK.rank(
+        db,
+        contract_type=contract_type.value if contract_type else None,
+        min_risk_index=min_risk_index,
+        limit=limit,
+        offset=offset
+    )
+
+
+@router.post("/portfolio-risk")
+async def score_portfolio_risk(
+    weights: RiskModelWeights,
+    contract_type: Optional[ContractType] = None,
+    min_risk_index: Optional[float] = Query(None, ge=0, le=1),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """Rank contracts under custom model weights (omitted fields use the configured ones)."""
+    from app.services.portfolio_risk import PORTFOLIO_RISK
+    return await PORTFOLIO_RISK.rank(
+        db,
+        weights=weights,
+        contract_type=contract_type.value if contract_type else None,
+        min_risk_index=min_risk_index,
+        limit=limit,
+        offset=offset
+    )
+
+
+@router.get("/clause-library")
+async def get_clause_library(
+    clause_type: Optional[ClauseType] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Clause wording variants per clause type, with exemplars and risk statistics."""
+    from app.services.clause_library import library_report
+    return await library_report(db, clause_type)
+
+
+@router.get("/prompt-cache")
+async def get_prompt_cache_stats(
+    contract_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Prompt prefix reuse overall and per contract (most recent first)."""
+    from app.core.prompt_cache import PREFIX_CACHE
+    stats = PREFIX_CACHE.snapshot(contract_id, limit)
+    if stats is None:
+        raise HTTPException(404, "No LLM calls recorded for this contract")
+    return stats
+
+
+@router.get("/llm-routes")
+async def get_llm_route_stats():
+    """Get per-route LLM backend statistics, limiter state and JSON repair counts."""
+    from app.core.json_repair import json_repair_snapshot
+    from app.core.llm_routing import get_router
+    from app.core.rate_limit import limiter_snapshot
+    return {
+        "routes": get_router().snapshot(),
+        "limiters": limiter_snapshot(),
+        "json_repair": json_repair_snapshot()
+    }
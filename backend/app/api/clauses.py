@@ -1,42 +1,99 @@
 """Clause API endpoints."""
 
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.coordination import lease
 from app.core.database import get_db
+from app.core.response_cache import cached_response
+from app.core.tracing import set_attributes
 from app.models.clause import Clause, ClauseResponse, ClauseType, RiskLevel
 from app.models.contract import Contract
-from app.agents.risk_analyzer import RiskAnalyzerAgent
+from app.services.export import (
+    DEFAULT_EXPORT_COLUMNS,
+    EXPORT_FORMATS,
+    build_export_query,
+    stream_export
+)
+from app.services.ingestion import assess_clauses
 
 router = APIRouter()
 
+CLAUSE_LIST = TypeAdapter(List[ClauseResponse])
+
 
 @router.get("/contract/{contract_id}", response_model=List[ClauseResponse])
 async def get_contract_clauses(
     contract_id: str,
+    request: Request,
     clause_type: Optional[ClauseType] = None,
     risk_level: Optional[RiskLevel] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all clauses for a contract."""
-    # Verify contract exists
+    """Get all clauses for a contract (supports If-None-Match / If-Modified-Since)."""
+    # Verify contract exists; its version validates the clause list
     contract_result = await db.execute(
-        select(Contract).where(Contract.id == contract_id)
+        select(Contract.updated_at).where(Contract.id == contract_id)
     )
-    if not contract_result.scalar_one_or_none():
+    version = contract_result.first()
+    if not version:
         raise HTTPException(404, "Contract not found")
 
-    query = select(Clause).where(Clause.contract_id == contract_id)
+    async def build() -> bytes:
+        query = select(Clause).where(Clause.contract_id == contract_id)
+
+        if clause_type:
+            query = query.where(Clause.clause_type == clause_type)
+        if risk_level:
+            query = query.where(Clause.risk_level == risk_level)
+
+        result = await db.execute(query)
+        return CLAUSE_LIST.dump_json(
+            [ClauseResponse.model_validate(c) for c in result.scalars().all()]
+        )
 
-    if clause_type:
-        query = query.where(Clause.clause_type == clause_type)
-    if risk_level:
-        query = query.where(Clause.risk_level == risk_level)
+    return await cached_response(request, contract_id, version.updated_at, build)
 
-    result = await db.execute(query)
-    return result.scalars().all()
+
+@router.get("/export")
+async def export_clauses(
+    format: str = Query("ndjson", description="ndjson or csv"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to include"),
+    clause_type: Optional[List[ClauseType]] = Query(None),
+    risk_level: Optional[List[RiskLevel]] = Query(None),
+    min_risk_score: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    contract_id: Optional[str] = None
+):
+    """Stream clauses and their risk data across the portfolio as NDJSON or CSV."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"Unsupported format. Allowed: {list(EXPORT_FORMATS)}")
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else DEFAULT_EXPORT_COLUMNS
+    try:
+        query = build_export_query(
+            selected,
+            clause_types=clause_type,
+            risk_levels=risk_level,
+            min_risk_score=min_risk_score,
+            created_after=created_after,
+            created_before=created_before,
+            contract_id=contract_id
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    filename = f"clauses-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{format}"
+    return StreamingResponse(
+        stream_export(query, selected, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 @router.get("/{clause_id}", response_model=ClauseResponse)
@@ -69,6 +126,7 @@ async def assess_clause_risk(
 
     if not clause:
         raise HTTPException(404, "Clause not found")
+    set_attributes(clause_id=clause_id, contract_id=clause.contract_id)
 
     # Get contract for context
     contract_result = await db.execute(
@@ -77,22 +135,26 @@ async def assess_clause_risk(
     contract = contract_result.scalar_one_or_none()
 
     # Run risk analysis
+    from app.agents.risk_analyzer import RiskAnalyzerAgent
+    from app.core.prompt_cache import cache_scope
     analyzer = RiskAnalyzerAgent()
-    risk_assessment = await analyzer.analyze_clause(
-        clause_text=clause.text,
-        clause_type=clause.clause_type.value,
-        clause_title=clause.title or "",
-        section_number=clause.section_number or "",
-        contract_context=contract.summary if contract else ""
-    )
+    async with lease(f"contract:{clause.contract_id}", "assess_risk"):
+        with cache_scope(clause.contract_id):
+            risk_assessment = await analyzer.analyze_clause(
+                clause_text=clause.text,
+                clause_type=clause.clause_type.value,
+                clause_title=clause.title or "",
+                section_number=clause.section_number or "",
+                contract_context=contract.summary if contract else ""
+            )
 
-    # Update clause with risk assessment
-    clause.risk_level = risk_assessment.risk_level
-    clause.risk_score = risk_assessment.risk_score
-    clause.risk_factors = risk_assessment.risk_factors
-    clause.analysis = risk_assessment.analysis
+        # Update clause with risk assessment
+        clause.risk_level = risk_assessment.risk_level
+        clause.risk_score = risk_assessment.risk_score
+        clause.risk_factors = risk_assessment.risk_factors
+        clause.analysis = risk_assessment.analysis
 
-    await db.commit()
+        await db.commit()
     await db.refresh(clause)
 
     return clause
@@ -104,6 +166,7 @@ async def assess_all_clause_risks(
     db: AsyncSession = Depends(get_db)
 ):
     """Assess risk for all clauses in a contract."""
+    set_attributes(contract_id=contract_id)
     # Get contract
     contract_result = await db.execute(
         select(Contract).where(Contract.id == contract_id)
@@ -113,38 +176,19 @@ async def assess_all_clause_risks(
     if not contract:
         raise HTTPException(404, "Contract not found")
 
-    # Get all clauses
-    clauses_result = await db.execute(
-        select(Clause).where(Clause.contract_id == contract_id)
-    )
-    clauses = clauses_result.scalars().all()
-
-    if not clauses:
-        raise HTTPException(400, "No clauses found for this contract")
-
-    analyzer = RiskAnalyzerAgent()
-    assessed_count = 0
-
-    for clause in clauses:
-        try:
-            risk_assessment = await analyzer.analyze_clause(
-                clause_text=clause.text,
-                clause_type=clause.clause_type.value,
-                clause_title=clause.title or "",
-                section_number=clause.section_number or "",
-                contract_context=contract.summary or ""
-            )
+    async with lease(f"contract:{contract_id}", "assess_risks"):
+        # Get all clauses
+        clauses_result = await db.execute(
+            select(Clause).where(Clause.contract_id == contract_id)
+        )
+        clauses = clauses_result.scalars().all()
 
-            clause.risk_level = risk_assessment.risk_level
-            clause.risk_score = risk_assessment.risk_score
-            clause.risk_factors = risk_assessment.risk_factors
-            clause.analysis = risk_assessment.analysis
-            assessed_count += 1
+        if not clauses:
+            raise HTTPException(400, "No clauses found for this contract")
 
-        except Exception:
-            continue
+        assessed_count = await assess_clauses(clauses, contract.summary)
 
-    await db.commit()
+        await db.commit()
 
     return {
         "message": f"Assessed {assessed_count} of {len(clauses)} clauses",
@@ -2,25 +2,39 @@
 
 import os
 import uuid
+from datetime import datetime, timedelta
 from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import aiofiles
 
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.coordination import lease
+from app.core.metrics import JOBS_IN_FLIGHT, stage
+from app.core.memory_budget import memory_budget
+from app.core.response_cache import cached_response
+from app.core.text_store import remove_spilled_text, text_size
+from app.core.tracing import set_attributes
 from app.models.contract import (
     Contract,
     ContractCreate,
     ContractResponse,
     ContractStatus,
-    ContractType
+    ContractType,
+    ExpiringContract
+)
+from app.models.clause import RiskLevel
+from app.services.ingestion import (
+    ALLOWED_EXTENSIONS,
+    ARCHIVE_EXTENSIONS,
+    COPY_CHUNK_SIZE,
+    create_contract,
+    job_progress,
+    open_contract_text,
+    start_bulk_ingest
 )
-from app.models.clause import Clause, ClauseType
-from app.agents.document_parser import DocumentParserAgent
-from app.agents.clause_extractor import ClauseExtractorAgent
 
 router = APIRouter()
 
@@ -29,86 +43,75 @@ router = APIRouter()
 async def upload_contract(
     file: UploadFile = File(...),
     title: Optional[str] = None,
+    generate_amendments: bool = False,
+    risk_threshold: RiskLevel = RiskLevel.MEDIUM,
     db: AsyncSession = Depends(get_db)
 ):
-    """Upload and parse a contract document."""
+    """Upload a contract and run the analysis pipeline.
+
+    Parses the document, extracts and risk-assesses its clauses and,
+    optionally, drafts amendments for risky clauses.
+    """
     # Validate file type
-    allowed_types = [".pdf", ".docx", ".doc", ".txt"]
     ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in allowed_types:
-        raise HTTPException(400, f"File type not allowed. Allowed: {allowed_types}")
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(400, f"File type not allowed. Allowed: {ALLOWED_EXTENSIONS}")
 
     # Save file
     os.makedirs(settings.upload_dir, exist_ok=True)
     file_id = str(uuid.uuid4())
     file_path = os.path.join(settings.upload_dir, f"{file_id}{ext}")
 
-    async with aiofiles.open(file_path, "wb") as f:
-        content = await file.read()
-        await f.write(content)
+    with stage("file_write"):
+        # In chunks: a large upload is never held in memory whole
+        async with aiofiles.open(file_path, "wb") as f:
+            while chunk := await file.read(COPY_CHUNK_SIZE):
+                await f.write(chunk)
 
-    # Create contract record
-    contract = Contract(
-        id=file_id,
-        filename=file.filename,
-        title=title or file.filename,
-        status=ContractStatus.PARSING
-    )
-    db.add(contract)
-    await db.commit()
-
-    # Parse document
-    try:
-        parser = DocumentParserAgent()
-        raw_text, analysis = await parser.parse(file_path)
-
-        # Update contract with parsed data
-        contract.raw_text = raw_text
-        contract.summary = analysis.summary
-        contract.contract_type = analysis.contract_type
-        contract.parties = analysis.parties
-        contract.risk_score = analysis.risk_score
-        contract.overall_assessment = analysis.overall_assessment
-
-        # Parse dates if provided
-        if analysis.effective_date:
-            try:
-                contract.effective_date = datetime.fromisoformat(analysis.effective_date)
-            except:
-                pass
-        if analysis.expiration_date:
+    from app.workflows.pipeline import run_pipeline
+
+    contract = await create_contract(db, file_id, file.filename, title)
+    # Held so a resume cannot start on the contract while this run is going
+    async with lease(f"contract:{file_id}", "pipeline"):
+        with JOBS_IN_FLIGHT.track(kind="upload"):
             try:
-                contract.expiration_date = datetime.fromisoformat(analysis.expiration_date)
-            except:
-                pass
+                await run_pipeline(file_id, file_path, generate_amendments, risk_threshold)
+            except Exception as e:
+                contract.status = ContractStatus.ERROR
+                await db.commit()
+                raise HTTPException(500, f"Error parsing contract: {str(e)}")
 
-        contract.status = ContractStatus.PARSED
-        await db.commit()
+    await db.refresh(contract)
+    return contract
 
-        # Extract clauses
-        extractor = ClauseExtractorAgent()
-        extracted_clauses = await extractor.extract(raw_text)
-
-        for clause_data in extracted_clauses:
-            clause = Clause(
-                contract_id=contract.id,
-                clause_type=ClauseType(clause_data.clause_type),
-                title=clause_data.title,
-                text=clause_data.text,
-                section_number=clause_data.section_number,
-                key_terms=clause_data.key_terms
-            )
-            db.add(clause)
 
-        await db.commit()
+@router.post("/bulk", status_code=202)
+async def bulk_upload_contracts(files: List[UploadFile] = File(...)):
+    """Upload many contracts, as individual files and/or ZIP archives.
 
-    except Exception as e:
-        contract.status = ContractStatus.ERROR
-        await db.commit()
-        raise HTTPException(500, f"Error parsing contract: {str(e)}")
+    Ingestion continues in the background; poll the returned job for progress.
+    """
+    allowed_types = ALLOWED_EXTENSIONS + ARCHIVE_EXTENSIONS
+    for file in files:
+        ext = os.path.splitext(file.filename)[1].lower()
+        if ext not in allowed_types:
+            raise HTTPException(400, f"File type not allowed: {file.filename}. Allowed: {allowed_types}")
 
-    await db.refresh(contract)
-    return contract
+    job = await start_bulk_ingest(files)
+    return job.to_dict(limit=0)
+
+
+@router.get("/bulk/{job_id}")
+async def get_bulk_job(
+    job_id: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=1000)
+):
+    """Get progress of a bulk upload, with per-file status and errors."""
+    progress = await job_progress(job_id, skip=skip, limit=limit)
+    if progress is None:
+        raise HTTPException(404, "Bulk job not found")
+    return progress
 
 
 @router.get("", response_model=List[ContractResponse])
@@ -132,21 +135,67 @@ async def list_contracts(
     return result.scalars().all()
 
 
+@router.get("/expiring", response_model=List[ExpiringContract])
+async def list_expiring_contracts(
+    days: int = Query(90, ge=0, le=3650),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    contract_type: Optional[ContractType] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Renewal calendar: contracts expiring in the next `days` days, soonest first."""
+    now = datetime.utcnow()
+    # Range scan on the expiration_date index; raw text is never loaded
+    query = select(
+        Contract.id, Contract.title, Contract.contract_type, Contract.parties,
+        Contract.effective_date, Contract.expiration_date, Contract.metadata_
+    ).where(
+        Contract.expiration_date >= now,
+        Contract.expiration_date < now + timedelta(days=days)
+    ).order_by(Contract.expiration_date)
+
+    if contract_type:
+        query = query.where(Contract.contract_type == contract_type)
+
+    result = await db.execute(query.offset(skip).limit(limit))
+    entries = []
+    for row in result.all():
+        notice = ((row.metadata_ or {}).get("extracted") or {}).get("notice_period_days") or {}
+        notice_days = notice.get("value")
+        entries.append(ExpiringContract(
+            id=row.id,
+            title=row.title,
+            contract_type=row.contract_type,
+            parties=row.parties or [],
+            effective_date=row.effective_date,
+            expiration_date=row.expiration_date,
+            days_remaining=(row.expiration_date - now).days,
+            notice_period_days=notice_days,
+            notice_deadline=row.expiration_date - timedelta(days=notice_days) if notice_days else None
+        ))
+    return entries
+
+
 @router.get("/{contract_id}", response_model=ContractResponse)
 async def get_contract(
     contract_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get contract details."""
+    """Get contract details (supports If-None-Match / If-Modified-Since)."""
     result = await db.execute(
-        select(Contract).where(Contract.id == contract_id)
+        select(Contract.updated_at).where(Contract.id == contract_id)
     )
-    contract = result.scalar_one_or_none()
+    version = result.first()
 
-    if not contract:
+    if not version:
         raise HTTPException(404, "Contract not found")
 
-    return contract
+    async def build() -> bytes:
+        contract = await db.get(Contract, contract_id)
+        return ContractResponse.model_validate(contract).model_dump_json().encode()
+
+    return await cached_response(request, contract_id, version.updated_at, build)
 
 
 @router.post("/{contract_id}/analyze")
@@ -155,6 +204,7 @@ async def analyze_contract(
     db: AsyncSession = Depends(get_db)
 ):
     """Run full analysis on a contract."""
+    set_attributes(contract_id=contract_id)
     result = await db.execute(
         select(Contract).where(Contract.id == contract_id)
     )
@@ -163,27 +213,73 @@ async def analyze_contract(
     if not contract:
         raise HTTPException(404, "Contract not found")
 
-    if not contract.raw_text:
-        raise HTTPException(400, "Contract has not been parsed yet")
+    async with lease(f"contract:{contract_id}", "analyze"):
+        with open_contract_text(contract) as raw_text:
+            if raw_text is None or not text_size(raw_text):
+                raise HTTPException(400, "Contract has not been parsed yet")
 
-    contract.status = ContractStatus.ANALYZING
-    await db.commit()
+            contract.status = ContractStatus.ANALYZING
+            await db.commit()
 
-    try:
-        # Re-analyze with fresh LLM call
-        parser = DocumentParserAgent()
-        _, analysis = await parser.parse.__wrapped__(parser, contract.raw_text)
+            try:
+                # Re-analyze with fresh LLM call
+                from app.agents.document_parser import DocumentParserAgent
+                parser = DocumentParserAgent()
+                with memory_budget():
+                    analysis = await parser.analyze(raw_text)
+
+                contract.summary = analysis.summary
+                contract.risk_score = analysis.risk_score
+                contract.overall_assessment = analysis.overall_assessment
+                contract.status = ContractStatus.ANALYZED
+                await db.commit()
+
+            except Exception as e:
+                contract.status = ContractStatus.ERROR
+                await db.commit()
+                raise HTTPException(500, f"Analysis failed: {str(e)}")
 
-        contract.summary = analysis.summary
-        contract.risk_score = analysis.risk_score
-        contract.overall_assessment = analysis.overall_assessment
-        contract.status = ContractStatus.ANALYZED
-        await db.commit()
+    await db.refresh(contract)
+    return contract
 
-    except Exception as e:
-        contract.status = ContractStatus.ERROR
-        await db.commit()
-        raise HTTPException(500, f"Analysis failed: {str(e)}")
+
+@router.get("/{contract_id}/pipeline")
+async def get_contract_pipeline(contract_id: str):
+    """Get checkpointed pipeline progress, including failed nodes."""
+    from app.workflows.pipeline import get_pipeline_state
+
+    state = await get_pipeline_state(contract_id)
+    if state is None:
+        raise HTTPException(404, "No pipeline run found for this contract")
+    return state
+
+
+@router.post("/{contract_id}/pipeline/resume", response_model=ContractResponse)
+async def resume_contract_pipeline(
+    contract_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Re-run only the pipeline nodes that failed for a contract."""
+    from app.workflows.pipeline import get_pipeline_state, resume_pipeline
+
+    set_attributes(contract_id=contract_id)
+    contract = await db.get(Contract, contract_id)
+    if not contract:
+        raise HTTPException(404, "Contract not found")
+
+    async with lease(f"contract:{contract_id}", "pipeline"):
+        state = await get_pipeline_state(contract_id)
+        if state is None:
+            raise HTTPException(404, "No pipeline run found for this contract")
+        if state["completed"]:
+            raise HTTPException(400, "Pipeline already completed")
+
+        try:
+            await resume_pipeline(contract_id)
+        except Exception as e:
+            contract.status = ContractStatus.ERROR
+            await db.commit()
+            raise HTTPException(500, f"Pipeline failed: {str(e)}")
 
     await db.refresh(contract)
     return contract
@@ -195,6 +291,8 @@ async def delete_contract(
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a contract."""
+    from app.workflows.pipeline import delete_pipeline_state
+
     result = await db.execute(
         select(Contract).where(Contract.id == contract_id)
     )
@@ -203,7 +301,11 @@ async def delete_contract(
     if not contract:
         raise HTTPException(404, "Contract not found")
 
-    await db.delete(contract)
-    await db.commit()
+    # Not while a pipeline run or another stage is still writing its results
+    async with lease(f"contract:{contract_id}", "delete"):
+        await db.delete(contract)
+        await db.commit()
+        await delete_pipeline_state(contract_id)
+    remove_spilled_text(contract_id)
 
     return {"message": "Contract deleted successfully"}
@@ -0,0 +1,67 @@
+"""Build the clause library offline.
+
+Usage:
+    python -m app.cli.clause_library --clusters 20
+    python -m app.cli.clause_library --types liability,indemnification --embeddings hashing
+
+Clusters the clauses of each type with mini-batch k-means over their
+embeddings and replaces that type's clusters, one type at a time; see
+app.services.clause_library. Clauses ingested while it runs are assigned
+to the new clusters at the end of their type's build.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from app.core.database import init_db
+from app.models.clause import ClauseType
+from app.services.clause_library import build_clause_library
+
+
+def _print_type(result: dict):
+    if result.get("skipped"):
+        print(f"{result['clause_type']:<24} skipped, being built by another process")
+        return
+    if not result["clusters"]:
+        print(f"{result['clause_type']:<24} no clauses")
+        return
+    print(
+        f"{result['clause_type']:<24} clauses={result['clauses']:<9} clusters={result['clusters']:<3} "
+        f"batches={result['iterations']:<4} mean_distance={result['mean_distance']:<7} "
+        f"late={result['late_assignments']:<5} {result['seconds']}s"
+    )
+
+
+async def main_async(args: argparse.Namespace):
+    await init_db()
+    clause_types = [ClauseType(t) for t in args.types.split(",")] if args.types else None
+    start = time.perf_counter()
+    results = await build_clause_library(clause_types, clusters=args.clusters, seed=args.seed, on_type=_print_type)
+    print(
+        f"{sum(r['clauses'] for r in results)} clauses in {sum(r['clusters'] for r in results)} clusters, "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Cluster clauses per clause type into a clause library")
+    parser.add_argument("--types", help="Comma-separated clause types (default: all)")
+    parser.add_argument("--clusters", type=int, default=settings.clause_library_clusters, help="Clusters per type")
+    parser.add_argument("--embeddings", choices=["model", "hashing"], default=settings.clause_library_embeddings)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    settings.clause_library_embeddings = args.embeddings
+
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        print("\nInterrupted; types already built keep their new clusters.", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
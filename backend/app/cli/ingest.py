@@ -0,0 +1,328 @@
+"""Ingest a directory of contracts outside the API server.
+
+Usage:
+    python -m app.cli.ingest ./contracts --workers 8 --llm-concurrency 16
+
+Text and metadata extraction run in a process pool; the parse, clause
+extraction and risk stages run with bounded async concurrency and write
+through the same models as the API. Every finished stage is appended to a checkpoint file,
+so an interrupted run picks up where it left off when started again.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from app.agents.clause_extractor import ClauseExtractorAgent
+from app.agents.document_parser import DocumentParserAgent
+from app.core.config import settings
+from app.core.coordination import lease
+from app.core.database import async_session_maker, init_db
+from app.core.memory_budget import memory_budget
+from app.core.text_store import DocumentText, spill_path
+from app.models.clause import Clause
+from app.models.contract import Contract, ContractStatus
+from app.services.ingestion import (
+    ALLOWED_EXTENSIONS,
+    add_clauses,
+    apply_analysis,
+    assess_clauses,
+    assign_clusters,
+    open_contract_text
+)
+from app.services.metadata import ContractMetadata, apply_metadata, confident_fields, extract_metadata
+
+STAGES = ["extracted", "parsed", "clauses", "done"]
+
+
+def _init_worker():
+    # Documents already run in parallel across the pool; extracting each
+    # one's pages in a further pool would oversubscribe the cores
+    settings.pdf_page_workers = 1
+
+
+def _extract(path: str, spill: str) -> Tuple[Optional[str], ContractMetadata]:
+    """Extract text and metadata in a pool process; no text when it was spilled to `spill`."""
+    text = DocumentParserAgent.extract_contract_text(path, spill)
+    metadata = extract_metadata(text)
+    if isinstance(text, DocumentText):
+        text.close()
+        return None, metadata
+    return text, metadata
+
+
+class Checkpoint:
+    """Append-only log of finished stages per document.
+
+    Each line records one stage transition, so a crash loses at most the
+    stage in progress; a torn last line is ignored on load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.state.setdefault(entry["path"], {}).update(entry)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def stage(self, path: str) -> int:
+        """Index of the next stage to run for a document."""
+        entry = self.state.get(path)
+        if not entry or entry.get("stage") not in STAGES:
+            return 0
+        return STAGES.index(entry["stage"]) + 1
+
+    def contract_id(self, path: str) -> Optional[str]:
+        return self.state.get(path, {}).get("contract_id")
+
+    def record(self, path: str, **fields):
+        entry = {"path": path, **fields}
+        self.state.setdefault(path, {}).update(entry)
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Counters behind the live throughput line."""
+
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.errors = 0
+        self.active: Dict[str, int] = {}
+        self.start = time.monotonic()
+
+    def enter(self, stage: str):
+        self.active[stage] = self.active.get(stage, 0) + 1
+
+    def leave(self, stage: str):
+        self.active[stage] -= 1
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        remaining = self.total - self.skipped - self.done - self.errors
+        eta = f"{remaining / rate / 60:.1f}m" if rate else "-"
+        active = " ".join(f"{k}={v}" for k, v in self.active.items() if v)
+        return (
+            f"[{self.skipped + self.done}/{self.total}] {rate:.2f} docs/s "
+            f"errors={self.errors} eta={eta} {active}"
+        )
+
+
+class DirectoryIngestor:
+    """Runs every document in a directory through the pipeline stages."""
+
+    def __init__(self, root: str, checkpoint: Checkpoint, workers: int, llm_concurrency: int, assess_risk: bool):
+        self.root = root
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.llm_concurrency = llm_concurrency
+        self.llm_limit = asyncio.Semaphore(llm_concurrency)
+        self.assess_risk = assess_risk
+        self.last_stage = len(STAGES) if assess_risk else STAGES.index("clauses") + 1
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.parser = DocumentParserAgent()
+        self.extractor = ClauseExtractorAgent()
+        self.progress: Optional[Progress] = None
+
+    def discover(self) -> List[str]:
+        paths = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in ALLOWED_EXTENSIONS:
+                    paths.append(os.path.relpath(os.path.join(directory, name), self.root))
+        return sorted(paths)
+
+    async def run(self):
+        paths = self.discover()
+        pending = [p for p in paths if self.checkpoint.stage(p) < self.last_stage]
+        self.progress = Progress(len(paths), len(paths) - len(pending))
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for path in pending:
+            queue.put_nowait(path)
+
+        # Enough documents in flight to keep every process busy while
+        # others wait on the LLM
+        tasks = [
+            asyncio.create_task(self._worker(queue))
+            for _ in range(self.workers + self.llm_concurrency)
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            reporter.cancel()
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            print("\n" + self.progress.line(), file=sys.stderr)
+
+    async def _report(self):
+        end = "\r" if sys.stderr.isatty() else "\n"
+        while True:
+            await asyncio.sleep(2)
+            print(self.progress.line(), end=end, file=sys.stderr, flush=True)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while not queue.empty():
+            path = queue.get_nowait()
+            try:
+                await self._process(path)
+                self.progress.done += 1
+            except Exception as e:
+                self.progress.errors += 1
+                self.checkpoint.record(path, error=f"{type(e).__name__}: {e}")
+
+    async def _process(self, path: str):
+        next_stage = self.checkpoint.stage(path)
+        async with async_session_maker() as db:
+            contract = None
+            contract_id = self.checkpoint.contract_id(path)
+            if next_stage > 0 and contract_id:
+                contract = await db.get(Contract, contract_id)
+            if contract is None:
+                next_stage = 0
+
+            if next_stage <= STAGES.index("extracted"):
+                self.progress.enter("extracting")
+                contract_id = str(uuid.uuid4())
+                try:
+                    loop = asyncio.get_running_loop()
+                    raw_text, metadata = await loop.run_in_executor(
+                        self.pool, _extract, os.path.join(self.root, path), spill_path(contract_id)
+                    )
+                finally:
+                    self.progress.leave("extracting")
+                contract = Contract(
+                    id=contract_id,
+                    filename=os.path.basename(path),
+                    title=os.path.basename(path),
+                    status=ContractStatus.PARSING,
+                    raw_text=raw_text
+                )
+                apply_metadata(contract, metadata)
+                db.add(contract)
+                await db.commit()
+                self.checkpoint.record(path, contract_id=contract.id, stage="extracted", error=None)
+
+            if next_stage <= STAGES.index("parsed"):
+                async with self._leased(db, contract, "ingest_parse"):
+                    async with self._llm("parsing"):
+                        with open_contract_text(contract) as raw_text, memory_budget():
+                            analysis = await self.parser.analyze(raw_text, known_fields=confident_fields(contract))
+                    apply_analysis(contract, analysis)
+                    await db.commit()
+                self.checkpoint.record(path, stage="parsed")
+
+            if next_stage <= STAGES.index("clauses"):
+                async with self._leased(db, contract, "ingest_clauses"):
+                    async with self._llm("extracting_clauses"):
+                        with open_contract_text(contract) as raw_text, memory_budget():
+                            extracted = await self.extractor.extract(raw_text)
+                    # A run interrupted before its checkpoint re-extracts; replace the clauses
+                    await db.execute(delete(Clause).where(Clause.contract_id == contract.id))
+                    await assign_clusters(db, add_clauses(db, contract.id, extracted))
+                    await db.commit()
+                self.checkpoint.record(path, stage="clauses")
+
+            if self.assess_risk and next_stage <= STAGES.index("done"):
+                async with self._leased(db, contract, "ingest_assess"):
+                    result = await db.execute(
+                        select(Clause).where(Clause.contract_id == contract.id, Clause.risk_level.is_(None))
+                    )
+                    self.progress.enter("assessing")
+                    try:
+                        await assess_clauses(result.scalars().all(), contract.summary, self.llm_limit)
+                    finally:
+                        self.progress.leave("assessing")
+                    contract.status = ContractStatus.ANALYZED
+                    await db.commit()
+                self.checkpoint.record(path, stage="done")
+
+    @asynccontextmanager
+    async def _leased(self, db, contract: Contract, stage: str):
+        """Hold the contract's lease for `stage`, starting from its current row.
+
+        The API's stages take the same lease, so they cannot write the
+        contract's results while the CLI does. A failed stage leaves the
+        contract in ERROR, as the API does.
+        """
+        async with lease(f"contract:{contract.id}", stage):
+            await db.refresh(contract)
+            try:
+                yield
+            except Exception:
+                await db.rollback()
+                contract.status = ContractStatus.ERROR
+                await db.commit()
+                raise
+
+    @asynccontextmanager
+    async def _llm(self, stage: str):
+        """Hold one LLM slot, counted under `stage` in the progress line."""
+        async with self.llm_limit:
+            self.progress.enter(stage)
+            try:
+                yield
+            finally:
+                self.progress.leave(stage)
+
+
+async def main_async(args: argparse.Namespace):
+    await init_db()
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(args.directory, ".ingest-checkpoint.jsonl"))
+    try:
+        ingestor = DirectoryIngestor(
+            args.directory,
+            checkpoint,
+            workers=args.workers,
+            llm_concurrency=args.llm_concurrency,
+            assess_risk=not args.skip_risk
+        )
+        await ingestor.run()
+    finally:
+        checkpoint.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory of contracts")
+    parser.add_argument("directory")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <directory>/.ingest-checkpoint.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Text extraction processes")
+    parser.add_argument(
+        "--llm-concurrency", type=int, default=settings.ingest_llm_concurrency,
+        help="LLM calls in flight (provider rate limits still apply)"
+    )
+    parser.add_argument("--skip-risk", action="store_true", help="Stop after clause extraction")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Summarize exported traces.
+
+Usage:
+    python -m app.cli.traces ./traces/traces.jsonl --top 5
+
+Prints a waterfall of the slowest traces followed by a per-span-name
+breakdown of where time goes across all of them.
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+BAR_WIDTH = 40
+
+
+def load_traces(path: str) -> Dict[str, List[dict]]:
+    """Group exported spans by trace id."""
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def _root(spans: List[dict]) -> dict:
+    ids = {s["span_id"] for s in spans}
+    roots = [s for s in spans if s["parent_id"] not in ids]
+    return min(roots, key=lambda s: s["start_ns"])
+
+
+def _duration(spans: List[dict]) -> float:
+    return (max(s["end_ns"] for s in spans) - min(s["start_ns"] for s in spans)) / 1e6
+
+
+def render_waterfall(spans: List[dict]) -> str:
+    """Render one trace as an indented tree with timeline bars."""
+    children: Dict[str, List[dict]] = defaultdict(list)
+    for s in spans:
+        children[s["parent_id"]].append(s)
+
+    start = min(s["start_ns"] for s in spans)
+    total = max(1, max(s["end_ns"] for s in spans) - start)
+    root = _root(spans)
+    lines = [f"trace {root['trace_id']}  {_duration(spans):.1f} ms"]
+
+    def walk(span: dict, depth: int):
+        offset = int((span["start_ns"] - start) / total * BAR_WIDTH)
+        width = max(1, int((span["end_ns"] - span["start_ns"]) / total * BAR_WIDTH))
+        bar = " " * offset + "#" * min(width, BAR_WIDTH - offset)
+        label = ("  " * depth + span["name"])[:48]
+        marker = " !" if span.get("status") == "error" else ""
+        lines.append(f"  {label:<48} |{bar:<{BAR_WIDTH}}| {span['duration_ms']:>9.1f} ms{marker}")
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start_ns"]):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    ids = {s["span_id"] for s in spans}
+    for orphan in spans:
+        if orphan is not root and orphan["parent_id"] not in ids:
+            walk(orphan, 0)
+    return "\n".join(lines)
+
+
+def render_summary(traces: Dict[str, List[dict]]) -> str:
+    """Render total and self time per span name, largest first."""
+    totals: Dict[str, List[float]] = defaultdict(list)
+    self_times: Dict[str, float] = defaultdict(float)
+    for spans in traces.values():
+        child_time: Dict[str, float] = defaultdict(float)
+        for s in spans:
+            if s["parent_id"]:
+                child_time[s["parent_id"]] += s["duration_ms"]
+        for s in spans:
+            totals[s["name"]].append(s["duration_ms"])
+            # Concurrent children can exceed the parent, so clamp at zero
+            self_times[s["name"]] += max(0.0, s["duration_ms"] - child_time[s["span_id"]])
+
+    lines = [f"{'span':<40} {'count':>6} {'total ms':>11} {'self ms':>11} {'p50 ms':>9} {'max ms':>9}"]
+    for name, durations in sorted(totals.items(), key=lambda kv: -self_times[kv[0]]):
+        durations.sort()
+        lines.append(
+            f"{name[:40]:<40} {len(durations):>6} {sum(durations):>11.1f} "
+            f"{self_times[name]:>11.1f} {durations[len(durations) // 2]:>9.1f} {durations[-1]:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize exported traces")
+    parser.add_argument("path", help="JSONL file written by the jsonl exporter")
+    parser.add_argument("--top", type=int, default=5, help="Number of slowest traces to show")
+    parser.add_argument("--name", help="Only consider traces whose root span name contains this")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    if args.name:
+        traces = {k: v for k, v in traces.items() if args.name in _root(v)["name"]}
+    if not traces:
+        print("No traces found")
+        return
+
+    slowest = sorted(traces.values(), key=_duration, reverse=True)[:args.top]
+    for spans in slowest:
+        print(render_waterfall(spans))
+        print()
+    print(render_summary(traces))
+
+
+if __name__ == "__main__":
+    main()
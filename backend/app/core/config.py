@@ -1,7 +1,7 @@
 """Application configuration."""
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -27,10 +27,151 @@ class Settings(BaseSettings):
     # Ollama
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.2"
+    ollama_num_ctx: int = 4096
+    ollama_keep_alive: str = "30m"  # Keeps the model, and its prompt cache, loaded between calls
 
-    # LlamaCpp
+    # LlamaCpp (served in-process by a dedicated inference worker)
     llamacpp_model_path: Optional[str] = None
     llamacpp_n_ctx: int = 4096
+    llamacpp_n_threads: Optional[int] = None
+    llamacpp_max_tokens: int = 1024
+    llamacpp_max_queue: int = 256
+    llamacpp_max_batch: int = 8
+    llamacpp_short_prompt_tokens: int = 1024  # Longer prompts are never batched
+    # Queue priority per task; lower runs first
+    llamacpp_priorities: Dict[str, int] = {
+        "amendment_single": 0,
+        "risk_analysis": 1,
+        "document_summary": 2,
+        "clause_extraction": 2,
+        "amendment_bulk": 2,
+    }
+
+    # LLM Routing
+    # JSON map of task -> backend pool, e.g.
+    # {"clause_extraction": [{"provider": "ollama", "base_url": "http://gpu-1:11434", "weight": 2}]}
+    # Tasks without a route use llm_provider.
+    llm_routes: Dict[str, List[Dict[str, Any]]] = {}
+    llm_route_stats_window: int = 50
+
+    # LLM Resilience
+    # Deadlines in seconds per task, covering retries and failover; they start
+    # once the first call holds its rate limit slot
+    llm_timeouts: Dict[str, float] = {
+        "document_summary": 120,
+        "clause_extraction": 300,
+        "risk_analysis": 60,
+        "amendment_single": 90,
+        "amendment_bulk": 300,
+    }
+    llm_default_timeout: float = 120
+    llm_max_attempts: int = 3
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 8.0
+    llm_hedging: bool = False
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    # Requests for the rest of a truncated JSON answer before keeping what was salvaged
+    llm_json_followups: int = 2
+    # Seconds a prompt prefix stays cached (Anthropic's cache lives 5 minutes)
+    llm_prefix_cache_ttl: float = 300
+
+    # LLM Rate Limits
+    # JSON map of provider -> quota, e.g. {"openai": {"rpm": 500, "tpm": 150000}}
+    llm_rate_limits: Dict[str, Dict[str, int]] = {}
+    llm_completion_tokens_estimate: int = 1024
+    llm_concurrency_min: int = 1
+    llm_concurrency_max: int = 32
+    llm_concurrency_initial: int = 4
+    llm_queue_timeout: float = 0  # Seconds a call may wait for its slot and quota; 0 = as long as it takes
+
+    # LLM Context Windows
+    # Tokens per remote provider (Ollama and LlamaCpp use their own settings)
+    llm_context_windows: Dict[str, int] = {"openai": 128000, "anthropic": 200000}
+
+    # Fake LLM (provider "fake", for local testing)
+    fake_llm_latency: float = 0.0
+    fake_llm_latency_jitter: float = 0.0
+    fake_llm_latency_distribution: str = "uniform"  # uniform, lognormal
+    fake_llm_failure_rate: float = 0.0
+    fake_llm_hang_rate: float = 0.0  # Share of calls that stall, like a stuck generation
+    fake_llm_hang_seconds: float = 300.0
+    fake_llm_malformed_rate: float = 0.0  # Share of answers truncated or otherwise broken
+    fake_llm_prompt_cache: bool = False  # Report repeated prompt prefixes as cached tokens
+    fake_llm_seed: Optional[int] = None
+
+    # Metadata Extraction (rule-based, before the LLM)
+    # Fields extracted at or above this confidence are not asked of the LLM
+    metadata_confidence_threshold: float = 0.8
+
+    # Amendment Generation
+    # Clause tokens per generation call; groups run concurrently, and small
+    # groups keep each JSON answer well inside the completion limit
+    amendment_group_tokens: int = 1500
+
+    # Startup warm-up (runs in the background; /ready reports when done)
+    warmup_local_models: bool = True  # Send one short prompt to Ollama/llama.cpp backends
+    warmup_embeddings: bool = False
+    warmup_timeout: float = 120
+
+    # Workflow (empty checkpoint path keeps pipeline state in memory)
+    workflow_checkpoint_path: str = "./workflow_checkpoints.db"
+    workflow_node_max_attempts: int = 2
+
+    # Tracing (none, jsonl, otlp)
+    tracing_exporter: str = "none"
+    tracing_jsonl_path: str = "./traces/traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318/v1/traces"
+    tracing_service_name: str = "contract-analysis-agent"
+
+    # Response Cache (serialized contract and clause responses)
+    response_cache_entries: int = 2048
+    response_cache_max_bytes: int = 67108864  # 64MB
+
+    # Coordination (state shared by API workers and CLI jobs)
+    coordination_backend: str = "database"  # database (every process on the same database) or memory (one process)
+    coordination_lease_ttl: float = 60.0  # Seconds a crashed holder blocks a stage; renewed every third of it
+    coordination_cache_ttl: float = 3600.0  # Seconds shared cache entries live
+    coordination_sweep_interval: float = 300.0  # Seconds between deletions of expired shared rows
+    coordination_job_publish_interval: float = 2.0  # Seconds between bulk job progress snapshots
+
+    # Portfolio Risk Model (contract risk index from clause risk scores)
+    portfolio_clause_type_weights: Dict[str, float] = {
+        "indemnification": 1.5,
+        "liability": 1.5,
+        "intellectual_property": 1.3,
+        "termination": 1.2,
+        "non_compete": 1.2,
+        "confidentiality": 1.1,
+        "entire_agreement": 0.5,
+        "severability": 0.5,
+        "notices": 0.5,
+    }  # Unlisted clause types weigh 1.0
+    portfolio_mean_weight: float = 0.5
+    portfolio_max_weight: float = 0.3
+    portfolio_percentile: float = 90
+    portfolio_percentile_weight: float = 0.2
+    portfolio_missing_clause_penalties: Dict[str, float] = {
+        "liability": 0.1,
+        "termination": 0.05,
+        "governing_law": 0.05,
+        "dispute_resolution": 0.05,
+    }
+    portfolio_level_thresholds: List[float] = [0.3, 0.5, 0.7]  # low / medium / high / critical
+
+    # Clause Library (clusters of clause wording per clause type)
+    clause_library_embeddings: str = "model"  # model (the embeddings model) or hashing (local feature hashing)
+    clause_library_embedding_dim: int = 512  # Dimensions of hashing embeddings
+    clause_library_clusters: int = 20  # Per clause type
+    clause_library_min_cluster_size: int = 5  # Fewer clusters for types with few clauses
+    clause_library_batch_size: int = 1024  # Mini-batch k-means
+    clause_library_max_iterations: int = 300
+    clause_library_exemplars: int = 3  # Clauses closest to each centroid
+    clause_library_embed_batch: int = 256  # Clauses embedded per call
+    clause_library_assign_on_ingest: bool = True
+
+    # Export
+    export_batch_size: int = 5000  # Rows fetched and encoded per chunk
 
     # Vector Store
     chroma_persist_dir: str = "./chroma_db"
@@ -39,6 +180,24 @@ class Settings(BaseSettings):
     upload_dir: str = "./uploads"
     max_file_size: int = 52428800  # 50MB
 
+    # Text Extraction
+    pdf_extraction_mode: str = "layout"  # layout (pdfplumber, tables as Markdown) or plain (PyMuPDF)
+    pdf_page_workers: int = 0  # Processes for layout extraction; 0 = one per core, 1 = in-thread
+    pdf_parallel_min_pages: int = 8  # Shorter PDFs are extracted in the calling thread
+    docx_extraction_mode: str = "stream"  # stream (tables, list numbering) or plain (python-docx paragraphs)
+
+    # Large Documents
+    text_spill_threshold: int = 4 * 1024 * 1024  # Extracted text above this many bytes stays on disk, memory-mapped; 0 = never
+    text_spill_dir: str = "./uploads/text"
+    job_memory_budget: int = 64 * 1024 * 1024  # Bytes of document text a job's LLM calls may hold at once; 0 = unlimited
+
+    # Bulk Ingestion
+    ingest_queue_size: int = 16
+    ingest_workers: int = 8
+    ingest_extraction_concurrency: int = 4  # CPU-bound text extraction
+    ingest_llm_concurrency: int = 4  # LLM calls of a bulk job in flight at once
+    ingest_max_archive_entries: int = 10000
+
     class Config:
         env_file = ".env"
         extra = "ignore"
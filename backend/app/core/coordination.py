@@ -0,0 +1,263 @@
+"""Locks and a cache shared by every process serving the application.
+
+Each API worker (and each CLI job) is its own process, so in-process locks
+and caches cannot stop two workers from analyzing the same contract at
+once, and one worker's cache is invisible to the others. A coordinator
+provides both across processes:
+
+* leases: exclusive, expiring claims on a resource, such as a contract
+  whose results a stage is writing. The holder renews its lease while it
+  works; a holder that dies stops renewing, and the lease frees itself
+  after `COORDINATION_LEASE_TTL` seconds.
+* a shared cache of byte values with a TTL, read and written by all
+  processes behind their own in-process caches.
+
+The `database` backend keeps both in the application database, so every
+process pointed at it coordinates with no extra service. Expiry compares
+the hosts' clocks, which must roughly agree. The `memory` backend keeps
+them in the process, for a single worker.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.metrics import LEASES
+from app.models.coordination import Lease, SharedCacheEntry
+
+# Leases are renewed this many times per TTL, so a few slow renewals are survivable
+RENEWALS_PER_TTL = 3
+# Entries kept by the in-memory cache
+MAX_MEMORY_CACHE_ENTRIES = 4096
+
+# Identifies this process in lease owners
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseHeld(Exception):
+    """Another process (or request) is already doing this work."""
+
+    def __init__(self, key: str, stage: str):
+        self.key = key
+        self.stage = stage
+        super().__init__(f"'{key}' already has work in progress; retry {stage} once it has finished")
+
+
+class Coordinator(ABC):
+    """Lease and shared cache operations; see the backends below."""
+
+    # Whether other processes see this coordinator's state
+    shared = False
+
+    @abstractmethod
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Take a lease if it is free or expired; False if someone else holds it."""
+
+    @abstractmethod
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        """Extend a lease; False if `owner` no longer holds it."""
+
+    @abstractmethod
+    async def release(self, key: str, owner: str):
+        """Give up a lease `owner` holds."""
+
+    @abstractmethod
+    async def cache_get(self, key: str) -> Optional[bytes]:
+        """A live cached value, or None."""
+
+    @abstractmethod
+    async def cache_set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """Cache a value for `ttl` seconds (COORDINATION_CACHE_TTL by default)."""
+
+
+class MemoryCoordinator(Coordinator):
+    """Leases and cache in this process only."""
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._cache: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        now = time.monotonic()
+        holder = self._leases.get(key)
+        if holder is not None and holder[1] > now:
+            return False
+        self._leases[key] = (owner, now + ttl)
+        return True
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        holder = self._leases.get(key)
+        if holder is None or holder[0] != owner:
+            return False
+        self._leases[key] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release(self, key: str, owner: str):
+        holder = self._leases.get(key)
+        if holder is not None and holder[0] == owner:
+            del self._leases[key]
+
+    async def cache_get(self, key: str) -> Optional[bytes]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    async def cache_set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._cache.pop(key, None)
+        self._cache[key] = (value, time.monotonic() + (ttl or settings.coordination_cache_ttl))
+        while len(self._cache) > MAX_MEMORY_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+
+
+class DatabaseCoordinator(Coordinator):
+    """Leases and cache in the `leases` and `shared_cache` tables.
+
+    Each operation is one short transaction. A lease is taken by inserting
+    its row, or by updating the row when the previous holder let it
+    expire; the primary key and the conditional update make exactly one
+    contender win either way.
+    """
+
+    shared = True
+
+    def __init__(self):
+        self._swept = time.monotonic()
+
+    async def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        now = datetime.utcnow()
+        values = {"owner": owner, "acquired_at": now, "expires_at": now + timedelta(seconds=ttl)}
+        async with async_session_maker() as db:
+            try:
+                await db.execute(insert(Lease).values(key=key, **values))
+                await db.commit()
+                return True
+            except IntegrityError:
+                await db.rollback()
+            result = await db.execute(
+                update(Lease).where(Lease.key == key, Lease.expires_at <= now).values(**values)
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def renew(self, key: str, owner: str, ttl: float) -> bool:
+        async with async_session_maker() as db:
+            result = await db.execute(
+                update(Lease)
+                .where(Lease.key == key, Lease.owner == owner)
+                .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def release(self, key: str, owner: str):
+        async with async_session_maker() as db:
+            await db.execute(delete(Lease).where(Lease.key == key, Lease.owner == owner))
+            await db.commit()
+
+    async def cache_get(self, key: str) -> Optional[bytes]:
+        async with async_session_maker() as db:
+            row = (await db.execute(
+                select(SharedCacheEntry.value, SharedCacheEntry.expires_at).where(SharedCacheEntry.key == key)
+            )).first()
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row.value
+
+    async def cache_set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl or settings.coordination_cache_ttl)
+        async with async_session_maker() as db:
+            # Update-then-insert works on every dialect; a concurrent insert
+            # of the same key wrote an equally fresh value
+            result = await db.execute(
+                update(SharedCacheEntry)
+                .where(SharedCacheEntry.key == key)
+                .values(value=value, expires_at=expires_at)
+            )
+            if result.rowcount == 0:
+                try:
+                    await db.execute(insert(SharedCacheEntry).values(key=key, value=value, expires_at=expires_at))
+                except IntegrityError:
+                    await db.rollback()
+                    return
+            await db.commit()
+        if time.monotonic() - self._swept > settings.coordination_sweep_interval:
+            await self.sweep()
+
+    async def sweep(self):
+        """Delete expired cache entries and abandoned leases."""
+        self._swept = time.monotonic()
+        now = datetime.utcnow()
+        async with async_session_maker() as db:
+            await db.execute(delete(SharedCacheEntry).where(SharedCacheEntry.expires_at <= now))
+            await db.execute(delete(Lease).where(Lease.expires_at <= now))
+            await db.commit()
+
+
+@lru_cache(maxsize=None)
+def get_coordinator() -> Coordinator:
+    """The configured coordinator, one per process."""
+    backend = settings.coordination_backend.lower()
+    if backend == "database":
+        return DatabaseCoordinator()
+    if backend == "memory":
+        return MemoryCoordinator()
+    raise ValueError(f"Unsupported coordination backend: {backend}")
+
+
+async def _keep_renewed(coordinator: Coordinator, key: str, owner: str, ttl: float, stage: str):
+    while True:
+        await asyncio.sleep(ttl / RENEWALS_PER_TTL)
+        try:
+            renewed = await coordinator.renew(key, owner, ttl)
+        except Exception:
+            # Transient database errors: the next renewal may still be in time
+            continue
+        if not renewed:
+            # Renewals were late and another process took over; the work
+            # in progress finishes, but is no longer exclusive
+            LEASES.inc(stage=stage, outcome="lost")
+            return
+
+
+@asynccontextmanager
+async def lease(resource: str, stage: str, ttl: Optional[float] = None):
+    """Hold the lease on `resource` (e.g. "contract:<id>") to run `stage`.
+
+    Every stage that writes a contract's or its clauses' results takes the
+    same contract lease, so they exclude each other as well as duplicates;
+    `stage` only labels metrics and errors. Raises LeaseHeld right away if
+    anyone else holds it, including another request in this process. The
+    lease is renewed until the block exits.
+    """
+    coordinator = get_coordinator()
+    key = resource
+    ttl = ttl or settings.coordination_lease_ttl
+    owner = f"{PROCESS_ID}:{uuid.uuid4().hex[:12]}"
+    if not await coordinator.acquire(key, owner, ttl):
+        LEASES.inc(stage=stage, outcome="held")
+        raise LeaseHeld(key, stage)
+    LEASES.inc(stage=stage, outcome="acquired")
+    renewer = asyncio.create_task(_keep_renewed(coordinator, key, owner, ttl, stage))
+    try:
+        yield
+    finally:
+        renewer.cancel()
+        await coordinator.release(key, owner)
@@ -1,11 +1,15 @@
 """Database configuration and session management."""
 
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.tracing import span
 
 engine = create_async_engine(settings.database_url, echo=settings.debug)
+instrument_engine(engine)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -16,14 +20,44 @@ class Base(DeclarativeBase):
 
 async def get_db():
     """Get database session."""
-    async with async_session_maker() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    with span("db.session", activate=False):
+        async with async_session_maker() as session:
+            try:
+                yield session
+            finally:
+                await session.close()
+
+
+def _add_columns(conn):
+    # create_all never alters existing tables; nullable columns added to a
+    # model since the table was created are added here
+    inspector = inspect(conn)
+    preparer = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add required column {table.name}.{column.name} to an existing table")
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+            ))
+
+
+def _create_indexes(conn):
+    # create_all skips existing tables, indexes included
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
 
 
 async def init_db():
-    """Initialize database tables."""
+    """Initialize database tables and any columns and indexes added since."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_columns)
+        await conn.run_sync(_create_indexes)
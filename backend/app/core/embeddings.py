@@ -0,0 +1,65 @@
+"""Local text embeddings by feature hashing."""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Function words carry no signal about how a clause is worded
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall such that the this "
+    "to under was were which will with".split()
+)
+# Bounds the token -> feature memo, not the vocabulary
+MAX_MEMO_TOKENS = 1_000_000
+
+
+class HashingEmbeddings:
+    """Signed feature hashing of word unigrams and bigrams.
+
+    Nothing to download or call: each text becomes a bag of hashed
+    features with sublinear term weights, L2-normalized. Hashes are stable
+    across processes, so vectors computed at ingest line up with centroids
+    built offline. Implements `embed_documents` / `embed_query` like
+    LangChain embeddings.
+    """
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim or settings.clause_library_embedding_dim
+        self._features: Dict[str, Tuple[int, float]] = {}
+
+    def _feature(self, token: str) -> Tuple[int, float]:
+        feature = self._features.get(token)
+        if feature is None:
+            digest = zlib.crc32(token.encode("utf-8"))
+            feature = (digest % self.dim, 1.0 if digest & 0x80000000 else -1.0)
+            if len(self._features) < MAX_MEMO_TOKENS:
+                self._features[token] = feature
+        return feature
+
+    def embed_array(self, texts: Sequence[str]) -> np.ndarray:
+        """Unit-length float32 vectors, one row per text."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = [w for w in TOKEN_RE.findall(text.lower()) if w not in STOP_WORDS]
+            counts = Counter(words)
+            counts.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+            vector = vectors[row]
+            for token, count in counts.items():
+                index, sign = self._feature(token)
+                vector[index] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
@@ -0,0 +1,232 @@
+"""Local stand-in chat model with injectable latency and failures."""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeLLMError(Exception):
+    """Injected provider failure."""
+
+    def __init__(self, message: str = "Injected failure", status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers locally after a configurable delay.
+
+    Latency is drawn uniformly from `latency` +/- `latency_jitter` seconds,
+    or with `latency_distribution="lognormal"` from a log-normal with median
+    `latency` and shape `latency_jitter`, for realistic long tails.
+    With probability `failure_rate` the call raises a transient FakeLLMError,
+    and with probability `hang_rate` it sleeps for `hang_seconds` first.
+    With probability `malformed_rate` a JSON answer comes back broken:
+    truncated, with trailing commas, or wrapped in prose. With
+    `prompt_cache`, prompt prefixes seen before are reported as cached
+    input tokens, like a provider with prefix caching.
+    """
+
+    response: str = "{}"
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    latency_distribution: str = "uniform"
+    failure_rate: float = 0.0
+    failure_status_code: int = 503
+    hang_rate: float = 0.0
+    hang_seconds: float = 300.0
+    malformed_rate: float = 0.0
+    prompt_cache: bool = False
+    seed: Optional[int] = None
+
+    _rng: random.Random = PrivateAttr()
+    _prefixes: set = PrivateAttr(default_factory=set)
+    calls: int = 0
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _delay(self) -> float:
+        if self.hang_rate and self._rng.random() < self.hang_rate:
+            return self.hang_seconds
+        if self.latency_distribution == "lognormal" and self.latency > 0:
+            return self._rng.lognormvariate(math.log(self.latency), self.latency_jitter)
+        jitter = self._rng.uniform(-self.latency_jitter, self.latency_jitter)
+        return max(0.0, self.latency + jitter)
+
+    def _maybe_fail(self):
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise FakeLLMError(status_code=self.failure_status_code)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        content = self.render(messages)
+        if self.malformed_rate and content.startswith("{") and self._rng.random() < self.malformed_rate:
+            content = self._malform(content)
+        message = AIMessage(content=content)
+        if self.prompt_cache:
+            message.usage_metadata = self._usage(messages, content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def render(self, messages: List[BaseMessage]) -> str:
+        """Produce the response text for a prompt."""
+        return self.response
+
+    def _usage(self, messages: List[BaseMessage], content: str) -> dict:
+        from app.core.prompt_cache import prefix_key
+        from app.core.tokens import count_tokens
+
+        input_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        cached = 0
+        key = prefix_key(messages)
+        if key in self._prefixes:
+            cached = sum(count_tokens(str(m.content)) for m in messages[:-1])
+        elif key is not None:
+            self._prefixes.add(key)
+        output_tokens = count_tokens(content)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_token_details": {"cache_read": cached},
+        }
+
+    def _malform(self, content: str) -> str:
+        kind = self._rng.choice(["truncate", "trailing_comma", "prose"])
+        if kind == "truncate":
+            return content[:int(len(content) * self._rng.uniform(0.5, 0.95))]
+        if kind == "trailing_comma":
+            return content.replace("]", ",]", 1)[:-1] + ",}"
+        return f"Here is the requested JSON:\n{content}\nLet me know if you need anything else."
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        self._maybe_fail()
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        self._maybe_fail()
+        return self._respond(messages)
+
+
+SECTION_PATTERN = re.compile(r"^(?:Section|Article)?\s*(\d+(?:\.\d+)*)[.)]\s+(.+)$", re.MULTILINE)
+RISK_LEVELS = ["low", "medium", "high", "critical"]
+
+
+class ContractFakeChatModel(FakeChatModel):
+    """Fake model answering each pipeline agent's prompt with schema-valid JSON.
+
+    Answers are derived from a hash of the prompt, so the same document
+    always yields the same clauses, risks and amendments.
+    """
+
+    def render(self, messages: List[BaseMessage]) -> str:
+        from app.core.json_repair import FOLLOWUP_PREFIX
+
+        system = messages[0].content if messages else ""
+        text = messages[-1].content if messages else ""
+        if text.startswith(FOLLOWUP_PREFIX):
+            # Answer the original request, then return only what was asked for
+            original = next(i for i, m in enumerate(messages) if m.type == "ai")
+            return self._continue(self._answer(system, messages[original - 1].content), text)
+        return self._answer(system, text)
+
+    @staticmethod
+    def _continue(answer: str, request: str) -> str:
+        full = json.loads(answer)
+        match = re.search(r'after (\d+) complete item\(s\) of "(\w+)"', request)
+        if match:
+            return json.dumps({match.group(2): full.get(match.group(2), [])[int(match.group(1)):]})
+        fields = request.rsplit(":", 1)[-1].strip(" .").split(", ")
+        return json.dumps({name: full[name] for name in fields if name in full})
+
+    def _answer(self, system: str, text: str) -> str:
+        digest = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+        if "Condense" in system:
+            return " ".join(text.split()[:200])
+        if "clause identification" in system:
+            return json.dumps({"clauses": self._clauses(text)})
+        if "risk analyst" in system:
+            level = RISK_LEVELS[digest % len(RISK_LEVELS)]
+            return json.dumps({
+                "risk_level": level,
+                "risk_score": round((RISK_LEVELS.index(level) + 1) / 4 - (digest % 10) / 100, 2),
+                "risk_factors": ["One-sided obligations", "Ambiguous scope"][:1 + digest % 2],
+                "analysis": "The clause allocates risk unevenly between the parties.",
+                "recommendations": ["Add a mutual cap on liability"],
+            })
+        if "drafter" in system:
+            amendment = {
+                "original_text": text[:300],
+                "proposed_text": "Each party's aggregate liability shall not exceed the fees paid.",
+                "amendment_type": "modification",
+                "rationale": "Balances risk between the parties.",
+                "risk_mitigation": "Caps exposure.",
+                "negotiation_points": ["Cap amount"],
+                "priority": "high" if digest % 2 else "medium",
+            }
+            refs = re.findall(r"^\[(\d+)\]", text, re.MULTILINE) or ["1"]
+            return json.dumps({"amendments": [{**amendment, "clause_ref": int(ref)} for ref in refs]})
+
+        from app.models.contract import ContractType
+        types = [t.value for t in ContractType]
+        return json.dumps({
+            "summary": " ".join(text.split()[3:40]),
+            "contract_type": types[digest % len(types)],
+            "parties": ["Acme Corp", "Globex LLC"],
+            "effective_date": "2024-01-01",
+            "expiration_date": "2026-12-31",
+            "key_terms": ["term", "fees", "liability"],
+            "risk_score": RISK_LEVELS[digest % 3],
+            "overall_assessment": "Standard commercial terms with some one-sided provisions.",
+            "recommendations": ["Review the limitation of liability"],
+        })
+
+    @staticmethod
+    def _clauses(text: str) -> List[dict]:
+        from app.models.clause import ClauseType
+
+        types = [t.value for t in ClauseType]
+        matches = list(SECTION_PATTERN.finditer(text))
+        clauses = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            title = match.group(2).strip()[:80]
+            key = title.lower().replace(" ", "_")
+            clauses.append({
+                "clause_type": key if key in types else types[len(title) % len(types)],
+                "title": title,
+                "text": text[match.start():end].strip()[:1000],
+                "section_number": match.group(1),
+                "key_terms": title.lower().split()[:3],
+            })
+        return clauses
@@ -0,0 +1,264 @@
+"""Dedicated worker for in-process llama.cpp inference.
+
+A llama.cpp model serves one generation at a time and holds a CPU (or GPU)
+for seconds per call. Rather than letting concurrent requests contend for
+it from the event loop's thread pool, one worker thread per model owns the
+`Llama` instance and serves a priority queue; callers await futures.
+llama.cpp releases the GIL while evaluating, so the event loop, and every
+non-LLM endpoint, keeps running while the model is saturated.
+
+Short prompts queued together are taken as a micro-batch and run back to
+back grouped by prompt prefix (every message but the last, see
+app.core.prompt_cache): llama-cpp-python reuses the KV cache for the
+longest common prefix with the previous prompt, so only each request's
+own suffix is evaluated.
+"""
+
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+from app.core.llm import current_llm_task
+from app.core.metrics import INFERENCE_BATCH_SIZE, INFERENCE_QUEUE_SECONDS
+from app.core.tokens import count_tokens
+
+ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class InferenceQueueFull(Exception):
+    """The inference queue is at capacity; retried like a provider 429."""
+    status_code = 429
+
+
+@dataclass(order=True)
+class InferenceRequest:
+    """One queued generation, ordered by priority then arrival."""
+    priority: int
+    seq: int
+    messages: List[dict] = field(compare=False)
+    params: dict = field(compare=False)
+    prompt_tokens: int = field(compare=False)
+    future: Future = field(compare=False, default_factory=Future)
+    queued_at: float = field(compare=False, default_factory=time.monotonic)
+
+    @property
+    def prefix(self) -> str:
+        return "\n".join(m["content"] for m in self.messages[:-1])
+
+
+class InferenceWorker:
+    """Thread owning one model and serving its request queue.
+
+    `load` builds the model on the worker thread; `generate(model, messages,
+    **params)` runs one chat completion and returns the OpenAI-style result
+    llama-cpp-python produces.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Any],
+        generate: Callable[..., dict],
+        max_queue: int,
+        max_batch: int,
+        short_prompt_tokens: int
+    ):
+        self.load = load
+        self.generate = generate
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.short_prompt_tokens = short_prompt_tokens
+        self.queue: "queue.PriorityQueue[InferenceRequest]" = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.busy = False
+
+    def submit(self, messages: List[dict], priority: int, **params: Any) -> Future:
+        """Queue a generation; the future resolves to the completion result."""
+        if self.queue.qsize() >= self.max_queue:
+            raise InferenceQueueFull(f"Inference queue full ({self.max_queue} requests)")
+        text = "\n".join(m["content"] for m in messages)
+        request = InferenceRequest(
+            priority=priority,
+            seq=next(self._seq),
+            messages=messages,
+            params=params,
+            prompt_tokens=count_tokens(text, "llamacpp")
+        )
+        self._ensure_started()
+        self.queue.put(request)
+        return request.future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llamacpp-inference", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> List[InferenceRequest]:
+        """The head request plus any short ones of the same priority already queued."""
+        first = self.queue.get()
+        batch = [first]
+        if first.prompt_tokens > self.short_prompt_tokens:
+            return batch
+        deferred = []
+        while len(batch) < self.max_batch:
+            try:
+                request = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if request.priority == first.priority and request.prompt_tokens <= self.short_prompt_tokens:
+                batch.append(request)
+            else:
+                deferred.append(request)
+                if request.priority > first.priority:
+                    # Everything behind it is lower priority too
+                    break
+        for request in deferred:
+            self.queue.put(request)
+        # Shared prefixes back to back for KV cache reuse
+        batch.sort(key=lambda r: (r.prefix, r.seq))
+        return batch
+
+    def _run(self):
+        try:
+            model = self.load()
+        except Exception as e:
+            model, load_error = None, e
+        else:
+            load_error = None
+
+        while True:
+            batch = self._next_batch()
+            INFERENCE_BATCH_SIZE.observe(len(batch))
+            self.busy = True
+            for request in batch:
+                # Skips requests whose caller already gave up
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                INFERENCE_QUEUE_SECONDS.observe(
+                    time.monotonic() - request.queued_at, priority=str(request.priority)
+                )
+                if load_error is not None:
+                    request.future.set_exception(load_error)
+                    continue
+                try:
+                    result = self.generate(model, request.messages, **request.params)
+                except Exception as e:
+                    request.future.set_exception(e)
+                else:
+                    request.future.set_result(result)
+            self.busy = False
+
+    def snapshot(self) -> dict:
+        return {"queued": self.queue.qsize(), "busy": self.busy}
+
+
+def _load_llama(model_path: str):
+    from llama_cpp import Llama
+
+    return Llama(
+        model_path=model_path,
+        n_ctx=settings.llamacpp_n_ctx,
+        n_threads=settings.llamacpp_n_threads,
+        verbose=False
+    )
+
+
+def _generate(model, messages: List[dict], **params: Any) -> dict:
+    return model.create_chat_completion(messages=messages, **params)
+
+
+_workers: Dict[str, InferenceWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(model_path: str) -> InferenceWorker:
+    """Get the inference worker for a model file (one per process)."""
+    with _workers_lock:
+        worker = _workers.get(model_path)
+        if worker is None:
+            worker = InferenceWorker(
+                load=lambda: _load_llama(model_path),
+                generate=_generate,
+                max_queue=settings.llamacpp_max_queue,
+                max_batch=settings.llamacpp_max_batch,
+                short_prompt_tokens=settings.llamacpp_short_prompt_tokens
+            )
+            _workers[model_path] = worker
+        return worker
+
+
+def inference_snapshot() -> Dict[str, dict]:
+    """Queue state of every inference worker."""
+    return {path: worker.snapshot() for path, worker in _workers.items()}
+
+
+class LlamaCppChatModel(BaseChatModel):
+    """Chat model served by the shared llama.cpp inference worker.
+
+    Requests are prioritised by pipeline task (`LLAMACPP_PRIORITIES`, lower
+    runs first), so interactive calls overtake bulk ingestion.
+    """
+
+    model_path: str
+    temperature: float = 0.1
+    max_tokens: int = 1024
+
+    @property
+    def _llm_type(self) -> str:
+        return "llamacpp-worker"
+
+    def _submit(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> Future:
+        task = current_llm_task.get()
+        priority = settings.llamacpp_priorities.get(task, max(settings.llamacpp_priorities.values(), default=0))
+        return get_worker(self.model_path).submit(
+            [{"role": ROLES.get(m.type, "user"), "content": str(m.content)} for m in messages],
+            priority,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stop=stop
+        )
+
+    @staticmethod
+    def _to_result(completion: dict) -> ChatResult:
+        usage = completion.get("usage") or {}
+        message = AIMessage(
+            content=completion["choices"][0]["message"]["content"] or "",
+            usage_metadata={
+                "input_tokens": usage.get("prompt_tokens", 0),
+                "output_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self._to_result(self._submit(messages, stop).result())
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        # Cancelling the await (e.g. a deadline) cancels the queued request
+        completion = await asyncio.wrap_future(self._submit(messages, stop))
+        return self._to_result(completion)
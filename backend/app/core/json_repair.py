@@ -0,0 +1,370 @@
+"""Tolerant parsing of model JSON output, shared by all agents.
+
+Local models often emit almost-valid JSON: prose or code fences around
+the object, trailing or missing commas, single quotes, Python literals, or
+an answer cut off by the completion limit. Rather than failing the whole
+call, `repair_json` fixes what it can and, for truncated output, keeps
+every complete element and drops the partial one. `ainvoke_json` then asks
+the model, in the same conversation, for just what is missing: the
+remaining array items or the absent fields.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.config import settings
+from app.core.metrics import LLM_JSON_FOLLOWUPS, LLM_JSON_REPAIRS
+
+# Follow-up requests start with this, so fake models can recognise them
+FOLLOWUP_PREFIX = "Your previous answer was cut off"
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][\w-]*")
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_CLOSERS = {"{": "}", "[": "]"}
+_WHITESPACE_RE = re.compile(r"[ \t\r\n]*")
+_STRING_BODY_RES = {'"': re.compile(r'[^"\\\n]*'), "'": re.compile(r"[^'\\\n]*")}
+
+
+@dataclass
+class ParsedOutput:
+    """A parsed model answer and what it took to parse it."""
+    value: Any
+    repairs: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+    @property
+    def repaired(self) -> bool:
+        return bool(self.repairs)
+
+
+class _Incomplete(Exception):
+    """The text ended inside a value."""
+
+
+class _TolerantParser:
+    """Recursive-descent JSON parser that notes and survives common defects."""
+
+    def __init__(self, text: str, pos: int):
+        self.text = text
+        self.pos = pos
+        self.repairs: List[str] = []
+        self.truncated = False
+
+    def note(self, repair: str):
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def skip(self):
+        text, n = self.text, len(self.text)
+        while self.pos < n:
+            self.pos = _WHITESPACE_RE.match(text, self.pos).end()
+            if text.startswith("//", self.pos):
+                end = text.find("\n", self.pos)
+                self.pos = n if end < 0 else end
+                self.note("comments")
+            elif text.startswith("/*", self.pos):
+                end = text.find("*/", self.pos)
+                self.pos = n if end < 0 else end + 2
+                self.note("comments")
+            else:
+                break
+
+    def at_end(self) -> bool:
+        self.skip()
+        return self.pos >= len(self.text)
+
+    def value(self) -> Tuple[Any, bool]:
+        """Parse one value; returns it and whether it was complete."""
+        if self.at_end():
+            raise _Incomplete()
+        char = self.text[self.pos]
+        if char in "{[":
+            return self.container(char)
+        if char in "\"'":
+            return self.string(), True
+        match = _NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            # A number at the very end may have been cut short
+            if self.pos >= len(self.text):
+                raise _Incomplete()
+            number = match.group(0)
+            return (float(number) if any(c in number for c in ".eE") else int(number)), True
+        match = _IDENTIFIER_RE.match(self.text, self.pos)
+        if match and match.group(0) in _LITERALS:
+            if match.group(0) not in ("true", "false", "null"):
+                self.note("python literals")
+            self.pos = match.end()
+            return _LITERALS[match.group(0)], True
+        if match and match.end() >= len(self.text):
+            raise _Incomplete()
+        raise ValueError(f"Unexpected {char!r} at {self.pos}")
+
+    def string(self) -> str:
+        quote = self.text[self.pos]
+        if quote == "'":
+            self.note("single quotes")
+        self.pos += 1
+        body = _STRING_BODY_RES[quote]
+        chunks, text, n = [], self.text, len(self.text)
+        while True:
+            end = body.match(text, self.pos).end()
+            chunks.append(text[self.pos:end])
+            if end >= n:
+                raise _Incomplete()
+            char = text[end]
+            if char == quote:
+                self.pos = end + 1
+                return "".join(chunks)
+            if char == "\n":
+                self.note("raw newlines")
+                chunks.append("\n")
+                self.pos = end + 1
+                continue
+            # Escape sequence
+            if end + 1 >= n:
+                raise _Incomplete()
+            escape = text[end + 1]
+            if escape == "u":
+                digits = text[end + 2:end + 6]
+                if len(digits) < 4:
+                    raise _Incomplete()
+                try:
+                    chunks.append(chr(int(digits, 16)))
+                except ValueError:
+                    chunks.append(digits)
+                self.pos = end + 6
+            else:
+                chunks.append({"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}.get(escape, escape))
+                self.pos = end + 2
+
+    def key(self) -> str:
+        char = self.text[self.pos]
+        if char in "\"'":
+            return self.string()
+        match = _IDENTIFIER_RE.match(self.text, self.pos)
+        if not match:
+            raise ValueError(f"Expected a key at {self.pos}")
+        if match.end() >= len(self.text):
+            raise _Incomplete()
+        self.note("unquoted keys")
+        self.pos = match.end()
+        return match.group(0)
+
+    def container(self, opener: str) -> Tuple[Any, bool]:
+        """Parse an object or array; a truncated one keeps its complete members."""
+        closer = _CLOSERS[opener]
+        is_object = opener == "{"
+        result: Any = {} if is_object else []
+        self.pos += 1
+        expect_separator = False
+        while True:
+            if self.at_end():
+                self.truncated = True
+                return result, False
+            char = self.text[self.pos]
+            if char == closer:
+                self.pos += 1
+                return result, True
+            if char in "}]":
+                # Mismatched closer: treat as ours
+                self.note("mismatched brackets")
+                self.pos += 1
+                return result, True
+            if char == ",":
+                self.pos += 1
+                if not expect_separator:
+                    self.note("extra commas")
+                expect_separator = False
+                # A trailing comma is caught by the closer check next round
+                if not self.at_end() and self.text[self.pos] == closer:
+                    self.note("trailing commas")
+                continue
+            if expect_separator:
+                self.note("missing commas")
+
+            start = self.pos
+            try:
+                if is_object:
+                    name = self.key()
+                    if self.at_end():
+                        raise _Incomplete()
+                    if self.text[self.pos] == ":":
+                        self.pos += 1
+                    else:
+                        self.note("missing colons")
+                    value, complete = self.value()
+                else:
+                    value, complete = self.value()
+            except _Incomplete:
+                self.truncated = True
+                self.pos = len(self.text)
+                return result, False
+            if not complete:
+                # Cut off inside a member: fields keep their salvaged
+                # containers, arrays drop their partial last element
+                if is_object and isinstance(value, (list, dict)) and value:
+                    result[name] = value
+                self.pos = max(self.pos, start)
+                return result, False
+            if is_object:
+                result[name] = value
+            else:
+                result.append(value)
+            expect_separator = True
+
+
+def _start(text: str) -> int:
+    positions = [p for p in (text.find("{"), text.find("[")) if p >= 0]
+    if not positions:
+        raise ValueError("No JSON object or array in output")
+    return min(positions)
+
+
+def repair_json(text: str) -> ParsedOutput:
+    """Parse model output as JSON, repairing common defects.
+
+    Raises ValueError when the output holds no usable JSON at all.
+    """
+    start = _start(text)
+    prefix = text[:start].strip()
+    repairs = []
+    if prefix and not re.fullmatch(r"```(?:json)?", prefix, re.IGNORECASE):
+        repairs.append("surrounding prose")
+
+    try:
+        value, end = json.JSONDecoder().raw_decode(text, start)
+    except json.JSONDecodeError:
+        pass
+    else:
+        suffix = text[end:].strip()
+        if suffix and suffix != "```":
+            repairs.append("surrounding prose")
+        return ParsedOutput(value, repairs)
+
+    parser = _TolerantParser(text, start)
+    value, _ = parser.value() if not parser.at_end() else (None, False)
+    if value in (None, {}, []) and parser.truncated:
+        raise ValueError("Output was cut off before any complete value")
+    return ParsedOutput(value, repairs + parser.repairs, parser.truncated)
+
+
+class TolerantJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that repairs malformed output instead of raising.
+
+    Used in a chain it returns the repaired value; `parse_output` also
+    reports whether the output was truncated, for follow-up requests.
+    """
+
+    agent: str = "unknown"
+
+    def parse_output(self, text: str) -> ParsedOutput:
+        try:
+            output = repair_json(text)
+        except ValueError as e:
+            LLM_JSON_REPAIRS.inc(agent=self.agent, outcome="unrecoverable")
+            raise OutputParserException(f"Invalid JSON output: {e}", llm_output=text) from e
+        if output.truncated:
+            LLM_JSON_REPAIRS.inc(agent=self.agent, outcome="salvaged")
+        elif output.repaired:
+            LLM_JSON_REPAIRS.inc(agent=self.agent, outcome="repaired")
+        return output
+
+    def parse_result(self, result: list, *, partial: bool = False) -> Any:
+        if partial:
+            return super().parse_result(result, partial=True)
+        return self.parse_output(result[0].text).value
+
+    def required_fields(self) -> List[str]:
+        if self.pydantic_object is None:
+            return []
+        return [name for name, info in self.pydantic_object.model_fields.items() if info.is_required()]
+
+
+def _followup_request(result: Any, output: ParsedOutput, required: List[str], list_field: Optional[str]) -> Optional[str]:
+    """What to ask for after a truncated answer, if anything."""
+    if not output.truncated or not isinstance(result, dict):
+        return None
+    items = result.get(list_field) if list_field else None
+    if isinstance(items, list):
+        last = json.dumps(items[-1])[:300] if items else "(none)"
+        return (
+            f"{FOLLOWUP_PREFIX} after {len(items)} complete item(s) of \"{list_field}\". "
+            f"Reply with a JSON object of the same shape containing only the remaining items, "
+            f"in order, starting after this one: {last}"
+        )
+    missing = [name for name in required if name not in result]
+    if missing:
+        return f"{FOLLOWUP_PREFIX}. Reply with a JSON object containing only these fields: {', '.join(missing)}."
+    return None
+
+
+def _merge(result: dict, addition: Any, list_field: Optional[str]) -> dict:
+    if not isinstance(addition, dict):
+        return result
+    merged = dict(result)
+    for name, value in addition.items():
+        if name == list_field and isinstance(value, list) and isinstance(merged.get(name), list):
+            merged[name] = merged[name] + value
+        elif name not in merged:
+            merged[name] = value
+    return merged
+
+
+async def ainvoke_json(
+    prompt: ChatPromptTemplate,
+    llm: Any,
+    parser: TolerantJsonOutputParser,
+    inputs: dict,
+    list_field: Optional[str] = None
+) -> dict:
+    """Run `prompt | llm` and parse the answer, completing truncated output.
+
+    When the answer was cut off, up to `llm_json_followups` follow-ups ask
+    for the items of `list_field` after the last complete one, or for the
+    required fields that are missing, instead of regenerating everything.
+    A failed follow-up keeps what was already salvaged.
+    """
+    messages = prompt.format_messages(**inputs)
+    text = (await llm.ainvoke(messages)).content
+    output = parser.parse_output(text)
+    result = output.value
+    required = parser.required_fields()
+
+    for _ in range(settings.llm_json_followups):
+        request = _followup_request(result, output, required, list_field)
+        if request is None:
+            break
+        messages = [*messages, AIMessage(content=text), HumanMessage(content=request)]
+        try:
+            text = (await llm.ainvoke(messages)).content
+            output = parser.parse_output(text)
+        except Exception:
+            LLM_JSON_FOLLOWUPS.inc(agent=parser.agent, outcome="failed")
+            break
+        LLM_JSON_FOLLOWUPS.inc(agent=parser.agent, outcome="ok")
+        result = _merge(result, output.value, list_field)
+    return result
+
+
+def json_repair_snapshot() -> dict:
+    """Repair and follow-up counts per agent.
+
+    Every repaired or salvaged output is a full generation that did not
+    have to be repeated; follow-ups are the (shorter) calls spent instead.
+    """
+    snapshot: dict = {}
+    for (agent, outcome), value in LLM_JSON_REPAIRS.values.items():
+        snapshot.setdefault(agent, {})[outcome] = int(value)
+    for (agent, outcome), value in LLM_JSON_FOLLOWUPS.values.items():
+        snapshot.setdefault(agent, {})[f"followups_{outcome}"] = int(value)
+    for counts in snapshot.values():
+        counts["calls_saved"] = counts.get("repaired", 0) + counts.get("salvaged", 0)
+    return snapshot
@@ -1,60 +1,118 @@
 """LLM provider configuration."""
 
+from contextvars import ContextVar
+from enum import Enum
 from functools import lru_cache
+from typing import Optional
+
 from langchain_core.language_models.chat_models import BaseChatModel
 
 from app.core.config import settings
 
 
-@lru_cache()
-def get_llm() -> BaseChatModel:
-    """Get configured LLM instance."""
-    provider = settings.llm_provider.lower()
+class LLMTask(str, Enum):
+    """Pipeline tasks that can be routed to different models."""
+    DOCUMENT_SUMMARY = "document_summary"
+    CLAUSE_EXTRACTION = "clause_extraction"
+    RISK_ANALYSIS = "risk_analysis"
+    AMENDMENT_SINGLE = "amendment_single"
+    AMENDMENT_BULK = "amendment_bulk"
+
+
+# Task of the LLM call in progress, set by the router for backends that
+# schedule by task
+current_llm_task: ContextVar[Optional[str]] = ContextVar("current_llm_task", default=None)
+
+
+@lru_cache(maxsize=None)
+def create_llm(
+    provider: str,
+    model: Optional[str] = None,
+    base_url: Optional[str] = None
+) -> BaseChatModel:
+    """Create an LLM instance for a provider, falling back to configured defaults."""
+    provider = provider.lower()
 
     if provider == "openai":
         from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             api_key=settings.openai_api_key,
-            model=settings.openai_model,
+            model=model or settings.openai_model,
+            base_url=base_url,
             temperature=0.1,
         )
 
     elif provider == "anthropic":
         from langchain_anthropic import ChatAnthropic
+        kwargs = {"base_url": base_url} if base_url else {}
         return ChatAnthropic(
             api_key=settings.anthropic_api_key,
-            model=settings.anthropic_model,
+            model=model or settings.anthropic_model,
             temperature=0.1,
+            **kwargs,
         )
 
     elif provider == "ollama":
         from langchain_community.chat_models import ChatOllama
         return ChatOllama(
-            base_url=settings.ollama_base_url,
-            model=settings.ollama_model,
+            base_url=base_url or settings.ollama_base_url,
+            model=model or settings.ollama_model,
+            num_ctx=settings.ollama_num_ctx,
+            keep_alive=settings.ollama_keep_alive,
             temperature=0.1,
         )
 
     elif provider == "llamacpp":
-        from langchain_community.chat_models import ChatLlamaCpp
-        return ChatLlamaCpp(
-            model_path=settings.llamacpp_model_path,
-            n_ctx=settings.llamacpp_n_ctx,
+        from app.core.inference import LlamaCppChatModel
+        return LlamaCppChatModel(
+            model_path=model or settings.llamacpp_model_path,
+            max_tokens=settings.llamacpp_max_tokens,
             temperature=0.1,
         )
 
+    elif provider == "fake":
+        from app.core.fake_llm import ContractFakeChatModel
+        return ContractFakeChatModel(
+            latency=settings.fake_llm_latency,
+            latency_jitter=settings.fake_llm_latency_jitter,
+            latency_distribution=settings.fake_llm_latency_distribution,
+            failure_rate=settings.fake_llm_failure_rate,
+            hang_rate=settings.fake_llm_hang_rate,
+            hang_seconds=settings.fake_llm_hang_seconds,
+            malformed_rate=settings.fake_llm_malformed_rate,
+            prompt_cache=settings.fake_llm_prompt_cache,
+            seed=settings.fake_llm_seed,
+        )
+
     else:
         raise ValueError(f"Unsupported LLM provider: {provider}")
 
 
+def get_llm(task: Optional[LLMTask] = None):
+    """Get configured LLM instance.
+
+    With a task, returns the routed model pool configured for that task.
+    """
+    if task is None:
+        return create_llm(settings.llm_provider)
+
+    from app.core.llm_routing import get_router
+    return get_router().route(task)
+
+
+@lru_cache(maxsize=None)
 def get_embeddings():
-    """Get embeddings model."""
+    """Get the embeddings model, loaded once per process."""
     provider = settings.llm_provider.lower()
 
     if provider == "openai":
         from langchain_openai import OpenAIEmbeddings
         return OpenAIEmbeddings(api_key=settings.openai_api_key)
 
+    elif provider == "fake":
+        from app.core.embeddings import HashingEmbeddings
+        return HashingEmbeddings()
+
     else:
         from langchain_community.embeddings import HuggingFaceEmbeddings
         return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
@@ -0,0 +1,419 @@
+"""Task-aware routing of LLM calls across provider/model pools."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.core.config import settings
+from app.core.llm import LLMTask, create_llm, current_llm_task
+from app.core.metrics import (
+    CACHE_HITS,
+    LLM_CALL_SECONDS,
+    LLM_CALLS,
+    LLM_COMPLETION_TOKENS,
+    LLM_HEDGES,
+    LLM_PROMPT_SIZE,
+    LLM_PROMPT_TOKENS,
+    LLM_RETRIES,
+)
+from app.core.prompt_cache import PREFIX_CACHE, prepare_prompt
+from app.core.rate_limit import ProviderLimiter, Reservation, get_limiter
+from app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    LLMQueueTimeoutError,
+    LLMTimeoutError,
+    get_breaker,
+    get_retry_policy,
+    get_timeout,
+    is_transient,
+)
+from app.core.tokens import count_prompt_tokens, count_tokens
+from app.core.tracing import span
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    """A single provider/model endpoint within a route."""
+    provider: str
+    model: Optional[str] = None
+    base_url: Optional[str] = None
+    weight: float = 1.0
+
+    @property
+    def name(self) -> str:
+        name = f"{self.provider}:{self.model or 'default'}"
+        if self.base_url:
+            name += f"@{self.base_url}"
+        return name
+
+
+class BackendStats:
+    """Rolling latency and error statistics for one backend of a route."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.last_prompt_tokens = 0
+
+    def record(self, latency: float, ok: bool):
+        """Record the outcome of a call."""
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.errors += 1
+
+    def record_tokens(self, prompt_tokens: int, completion_tokens: int):
+        """Record token usage of a successful call."""
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.last_prompt_tokens = prompt_tokens
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        return sum(self.latencies) / len(self.latencies)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile over the window (q in 0-100)."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "mean_latency": self.mean_latency,
+            "p95_latency": self.percentile(95),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "last_prompt_tokens": self.last_prompt_tokens,
+        }
+
+
+class LLMBackend:
+    """A backend bound to a route, with its own statistics."""
+
+    def __init__(self, config: BackendConfig, window: int):
+        self.config = config
+        self.stats = BackendStats(window)
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def model(self) -> BaseChatModel:
+        return create_llm(self.config.provider, self.config.model, self.config.base_url)
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return get_breaker(self.name)
+
+    @property
+    def limiter(self) -> ProviderLimiter:
+        return get_limiter(self.config.provider, self.name)
+
+    def record_success(self, latency: float):
+        self.stats.record(latency, ok=True)
+        self.breaker.record_success()
+
+    def record_failure(self, latency: float):
+        self.stats.record(latency, ok=False)
+        self.breaker.record_failure()
+
+
+class RoutedChatModel(Runnable[Any, BaseMessage]):
+    """Chat model that load-balances a task across a pool with failover.
+
+    The primary backend is drawn by weight, discounted by its recent error
+    rate and latency relative to the fastest backend in the pool. Remaining
+    backends are tried in score order when the primary errors, skipping any
+    whose circuit breaker is open.
+    """
+
+    def __init__(self, task: LLMTask, backends: List[LLMBackend]):
+        if not backends:
+            raise ValueError(f"No backends configured for task: {task.value}")
+        self.task = task
+        self.backends = backends
+
+    def _score(self, backend: LLMBackend, fastest: Optional[float]) -> float:
+        score = backend.config.weight * (1.0 - 0.9 * backend.stats.error_rate)
+        latency = backend.stats.mean_latency
+        if fastest and latency:
+            score *= fastest / latency
+        return max(score, 1e-3)
+
+    def ordered_backends(self) -> List[LLMBackend]:
+        """Backends in the order they should be attempted for the next call."""
+        if len(self.backends) == 1:
+            return list(self.backends)
+
+        latencies = [b.stats.mean_latency for b in self.backends if b.stats.mean_latency]
+        fastest = min(latencies) if latencies else None
+        scores = {b.name: self._score(b, fastest) for b in self.backends}
+
+        primary = random.choices(self.backends, weights=[scores[b.name] for b in self.backends])[0]
+        rest = sorted(
+            (b for b in self.backends if b is not primary),
+            key=lambda b: scores[b.name],
+            reverse=True
+        )
+        return [primary] + rest
+
+    @staticmethod
+    def _claim(candidates: List[LLMBackend]) -> Optional[LLMBackend]:
+        """Take the next candidate whose circuit breaker allows a call, if any.
+
+        Breakers are asked only right before their backend is tried: a
+        half-open breaker's `allow` claims its single probe, which would be
+        wasted on a backend that is never called.
+        """
+        while candidates:
+            backend = candidates.pop(0)
+            if backend.breaker.allow():
+                return backend
+        return None
+
+    def _unavailable(self) -> CircuitOpenError:
+        return CircuitOpenError(f"All backends for {self.task.value} are unavailable")
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        """Synchronous call with failover only; deadlines and retries apply to ainvoke."""
+        candidates = self.ordered_backends()
+        last_error: Optional[Exception] = None
+        while (backend := self._claim(candidates)) is not None:
+            start = time.perf_counter()
+            try:
+                token = current_llm_task.set(self.task.value)
+                try:
+                    result = backend.model.invoke(input, config, **kwargs)
+                finally:
+                    current_llm_task.reset(token)
+            except Exception as e:
+                backend.record_failure(time.perf_counter() - start)
+                last_error = e
+                continue
+            backend.record_success(time.perf_counter() - start)
+            return result
+        raise last_error or self._unavailable()
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> BaseMessage:
+        """Call the pool within the task deadline, retrying transient errors."""
+        deadline = Deadline(get_timeout(self.task.value))
+        policy = get_retry_policy()
+
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(input, config, kwargs, deadline)
+            except Exception as e:
+                if isinstance(e, (CircuitOpenError, LLMTimeoutError, LLMQueueTimeoutError)) or not is_transient(e):
+                    raise
+                attempt += 1
+                delay = policy.delay(attempt - 1)
+                if attempt >= policy.max_attempts or delay >= deadline.remaining():
+                    raise
+                LLM_RETRIES.inc(task=self.task.value)
+                await asyncio.sleep(delay)
+
+    async def _attempt(
+        self, input: Any, config: Optional[RunnableConfig], kwargs: dict, deadline: Deadline
+    ) -> BaseMessage:
+        """One pass over the pool, failing over between backends."""
+        candidates = self.ordered_backends()
+        last_error: Optional[Exception] = None
+        while (backend := self._claim(candidates)) is not None:
+            try:
+                if settings.llm_hedging and candidates:
+                    return await self._hedged(backend, candidates, input, config, kwargs, deadline)
+                return await self._call(backend, input, config, kwargs, deadline)
+            except LLMTimeoutError:
+                # The deadline is spent; no other backend has time left either
+                raise
+            except Exception as e:
+                last_error = e
+        raise last_error or self._unavailable()
+
+    async def _call(
+        self, backend: LLMBackend, input: Any, config: Optional[RunnableConfig], kwargs: dict, deadline: Deadline
+    ) -> BaseMessage:
+        prompt_tokens = count_prompt_tokens(input, backend.config.provider)
+        estimated = prompt_tokens + settings.llm_completion_tokens_estimate
+        labels = {"task": self.task.value, "backend": backend.name}
+        try:
+            async with backend.limiter.reserve(estimated, settings.llm_queue_timeout) as reservation:
+                # Queueing for the slot is over; from here the deadline runs
+                deadline.start()
+                return await self._invoke(backend, input, config, kwargs, deadline, reservation, prompt_tokens)
+        except LLMQueueTimeoutError:
+            LLM_CALLS.inc(outcome="queue_timeout", **labels)
+            raise
+
+    async def _invoke(
+        self,
+        backend: LLMBackend,
+        input: Any,
+        config: Optional[RunnableConfig],
+        kwargs: dict,
+        deadline: Deadline,
+        reservation: Reservation,
+        prompt_tokens: int
+    ) -> BaseMessage:
+        """One model call within the remaining deadline, recorded in the backend's stats."""
+        labels = {"task": self.task.value, "backend": backend.name}
+        start = time.perf_counter()
+        try:
+            with span(
+                "llm.call",
+                provider=backend.config.provider,
+                prompt_tokens=prompt_tokens,
+                **labels
+            ) as call_span:
+                token = current_llm_task.set(self.task.value)
+                try:
+                    result = await asyncio.wait_for(
+                        backend.model.ainvoke(prepare_prompt(input, backend.config.provider), config, **kwargs),
+                        deadline.remaining()
+                    )
+                finally:
+                    current_llm_task.reset(token)
+        except asyncio.CancelledError:
+            # A losing hedge or an abandoned request; says nothing about the backend
+            LLM_CALLS.inc(outcome="cancelled", **labels)
+            raise
+        except Exception as e:
+            # Includes calls cancelled at the deadline, so a hung backend trips its breaker
+            backend.record_failure(time.perf_counter() - start)
+            if isinstance(e, asyncio.TimeoutError) and deadline.expired():
+                LLM_CALLS.inc(outcome="timeout", **labels)
+                raise LLMTimeoutError(f"{self.task.value} exceeded {deadline.seconds}s deadline") from e
+            LLM_CALLS.inc(outcome="error", **labels)
+            raise
+        latency = time.perf_counter() - start
+        backend.record_success(latency)
+        LLM_CALL_SECONDS.observe(latency, **labels)
+        LLM_CALLS.inc(outcome="ok", **labels)
+
+        usage = getattr(result, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens") or prompt_tokens
+        completion_tokens = usage.get("output_tokens") or count_tokens(
+            str(result.content), backend.config.provider
+        )
+        backend.stats.record_tokens(prompt_tokens, completion_tokens)
+        if call_span is not None:
+            call_span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        reservation.actual_tokens = prompt_tokens + completion_tokens
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, **labels)
+        LLM_COMPLETION_TOKENS.inc(completion_tokens, **labels)
+        LLM_PROMPT_SIZE.observe(prompt_tokens, task=self.task.value)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        if cached_tokens:
+            CACHE_HITS.inc(cache="llm_prompt")
+        prefix_hit = PREFIX_CACHE.record(self.task.value, backend.name, input, start, cached_tokens)
+        if call_span is not None and prefix_hit is not None:
+            call_span.set(prefix_hit=prefix_hit, cached_tokens=cached_tokens)
+        return result
+
+    async def _hedged(
+        self,
+        primary: LLMBackend,
+        candidates: List[LLMBackend],
+        input: Any,
+        config: Optional[RunnableConfig],
+        kwargs: dict,
+        deadline: Deadline
+    ) -> BaseMessage:
+        """Send a duplicate request to the next backend once the primary exceeds its p95."""
+        first = asyncio.ensure_future(self._call(primary, input, config, kwargs, deadline))
+        hedge_after = primary.stats.percentile(95)
+        if hedge_after is None:
+            return await first
+
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        hedge = self._claim(candidates)
+        if hedge is None:
+            return await first
+        LLM_HEDGES.inc(task=self.task.value)
+        second = asyncio.ensure_future(self._call(hedge, input, config, kwargs, deadline))
+        pending = {first, second}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        return {
+            b.name: {"weight": b.config.weight, "circuit": b.breaker.state.value, **b.stats.snapshot()}
+            for b in self.backends
+        }
+
+
+class LLMRouter:
+    """Maps each pipeline task to its configured backend pool."""
+
+    def __init__(self, routes: Dict[str, List[Dict[str, Any]]], window: int = 50):
+        unknown = set(routes) - {task.value for task in LLMTask}
+        if unknown:
+            raise ValueError(f"Unknown LLM route tasks: {sorted(unknown)}")
+
+        default = [{"provider": settings.llm_provider}]
+        self._routes: Dict[LLMTask, RoutedChatModel] = {}
+        for task in LLMTask:
+            backends = [
+                LLMBackend(BackendConfig(**backend), window)
+                for backend in (routes.get(task.value) or default)
+            ]
+            self._routes[task] = RoutedChatModel(task, backends)
+
+    def route(self, task: LLMTask) -> RoutedChatModel:
+        """Get the routed model for a task."""
+        return self._routes[task]
+
+    def snapshot(self) -> dict:
+        """Per-route backend statistics."""
+        return {task.value: routed.snapshot() for task, routed in self._routes.items()}
+
+
+@lru_cache()
+def get_router() -> LLMRouter:
+    """Get the process-wide LLM router."""
+    return LLMRouter(settings.llm_routes, window=settings.llm_route_stats_window)
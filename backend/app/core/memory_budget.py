@@ -0,0 +1,81 @@
+"""Per-job budget for document text held in memory.
+
+Agents split large documents into chunks and fan their LLM calls out
+concurrently, so without a limit a job decodes and renders its whole
+document at once. Each chunk call reserves its text size times
+`TEXT_COPIES_PER_CALL` from the job's budget for as long as it runs; calls
+that would exceed `job_memory_budget` wait, and a single chunk larger
+than the whole budget fails the job with `MemoryBudgetExceeded`.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import JOB_MEMORY_RESERVED, JOB_MEMORY_WAITS
+
+# The decoded chunk, the rendered prompt and the serialized request
+TEXT_COPIES_PER_CALL = 3
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """A single reservation is larger than the job's whole budget."""
+
+
+class MemoryBudget:
+    """Bytes of text one job may hold at once."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        """Hold `nbytes` of the budget for the duration of a block, waiting for room."""
+        if nbytes > self.limit:
+            raise MemoryBudgetExceeded(
+                f"{nbytes} bytes of text exceed the job memory budget of {self.limit} bytes"
+            )
+        async with self._condition:
+            if self.used + nbytes > self.limit:
+                JOB_MEMORY_WAITS.inc()
+            await self._condition.wait_for(lambda: self.used + nbytes <= self.limit)
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+        JOB_MEMORY_RESERVED.inc(nbytes)
+        try:
+            yield
+        finally:
+            JOB_MEMORY_RESERVED.dec(nbytes)
+            async with self._condition:
+                self.used -= nbytes
+                self._condition.notify_all()
+
+
+current_memory_budget: ContextVar[Optional[MemoryBudget]] = ContextVar("current_memory_budget", default=None)
+
+
+@contextmanager
+def memory_budget(limit: Optional[int] = None):
+    """Give the LLM calls in this context a shared budget (`job_memory_budget` by default; 0 = none)."""
+    limit = settings.job_memory_budget if limit is None else limit
+    token = current_memory_budget.set(MemoryBudget(limit) if limit else None)
+    try:
+        yield current_memory_budget.get()
+    finally:
+        current_memory_budget.reset(token)
+
+
+@asynccontextmanager
+async def reserve_text(nbytes: int):
+    """Reserve room for one call over `nbytes` of text in the current job's budget, if any."""
+    budget = current_memory_budget.get()
+    if budget is None:
+        yield
+        return
+    async with budget.reserve(nbytes * TEXT_COPIES_PER_CALL):
+        yield
@@ -0,0 +1,435 @@
+"""In-process metrics with Prometheus text exposition.
+
+Recording is a dict lookup plus an add, so instrumentation stays on in
+production. Values that are expensive or awkward to track on the hot path
+(queue depths, limiter state) are sampled by callback at scrape time.
+"""
+
+import asyncio
+import functools
+import sys
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+
+def _escape_label(value: str) -> str:
+    # The exposition format escapes these three inside label values
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """Base class for a labelled metric family."""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines of every series in the family."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    """Value that goes up and down."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str):
+        """Count something as in progress for the duration of a block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class CallbackGauge(Metric):
+    """Gauge sampled by calling a function at scrape time.
+
+    The callback returns a mapping of label-value tuples to values.
+    """
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[Tuple[str, ...], float]]
+    ):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.callback().items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observations."""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., overflow count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = [0] * (len(self.buckets) + 2)
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of a block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> Tuple[int, float]:
+        """Observation count and sum across all label sets."""
+        count = sum(sum(state[:-1]) for state in self.values.values())
+        return int(count), sum(state[-1] for state in self.values.values())
+
+    def samples(self) -> Iterator[str]:
+        for key, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))
+
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# Agents
+AGENT_CALL_SECONDS = histogram("agent_call_seconds", "Agent method latency", ["agent", "method"])
+AGENT_CALLS = counter("agent_calls_total", "Agent method calls", ["agent", "method", "outcome"])
+AGENT_PARSE_FAILURES = counter(
+    "agent_parse_failures_total", "Model outputs or output items that failed to parse", ["agent"]
+)
+
+# LLM calls
+LLM_CALL_SECONDS = histogram("llm_call_seconds", "LLM backend call latency", ["task", "backend"])
+LLM_CALLS = counter("llm_calls_total", "LLM backend calls", ["task", "backend", "outcome"])
+LLM_PROMPT_TOKENS = counter("llm_prompt_tokens_total", "Prompt tokens sent", ["task", "backend"])
+LLM_COMPLETION_TOKENS = counter(
+    "llm_completion_tokens_total", "Completion tokens received", ["task", "backend"]
+)
+LLM_PROMPT_SIZE = histogram(
+    "llm_prompt_tokens", "Prompt size per call", ["task"], buckets=TOKEN_BUCKETS
+)
+LLM_RETRIES = counter("llm_retries_total", "Retries of transient LLM errors", ["task"])
+LLM_HEDGES = counter("llm_hedges_total", "Hedged duplicate LLM requests", ["task"])
+LLM_JSON_REPAIRS = counter(
+    "llm_json_repairs_total", "Model outputs parsed only after repair or salvage", ["agent", "outcome"]
+)
+LLM_JSON_FOLLOWUPS = counter(
+    "llm_json_followups_total", "Follow-up requests for truncated model output", ["agent", "outcome"]
+)
+LLM_PREFIX_CACHE = counter(
+    "llm_prefix_cache_total", "LLM calls whose prompt prefix was recently served", ["task", "outcome"]
+)
+LLM_CACHED_PROMPT_TOKENS = counter(
+    "llm_cached_prompt_tokens_total", "Prompt tokens providers served from cache", ["task"]
+)
+CACHE_HITS = counter("cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = counter("cache_misses_total", "Cache misses", ["cache"])
+
+# Coordination
+LEASES = counter(
+    "coordination_leases_total", "Lease attempts on shared work (acquired, held elsewhere, lost)", ["stage", "outcome"]
+)
+
+# Local inference
+INFERENCE_BATCH_SIZE = histogram(
+    "inference_batch_size", "Requests per llama.cpp worker batch", buckets=(1, 2, 4, 8, 16, 32)
+)
+INFERENCE_QUEUE_SECONDS = histogram(
+    "inference_queue_seconds", "Time queued for the llama.cpp worker", ["priority"]
+)
+
+# Ingestion
+INGEST_STAGE_SECONDS = histogram(
+    "ingest_stage_seconds", "Contract ingestion stage latency", ["stage"]
+)
+JOBS_IN_FLIGHT = gauge("jobs_in_flight", "Jobs currently running", ["kind"])
+JOB_MEMORY_RESERVED = gauge("job_memory_reserved_bytes", "Document text reserved by running jobs' LLM calls")
+JOB_MEMORY_WAITS = counter("job_memory_waits_total", "LLM calls that waited for their job's memory budget")
+CLAUSE_CLUSTER_ASSIGNMENTS = counter(
+    "clause_cluster_assignments_total", "New clauses matched to a clause library cluster at ingest", ["outcome"]
+)
+
+# HTTP and database
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+DB_QUERY_SECONDS = histogram("db_query_seconds", "Database query latency", ["endpoint"])
+
+# Runtime
+EVENT_LOOP_LAG_SECONDS = histogram(
+    "event_loop_lag_seconds",
+    "Delay of a scheduled event-loop wake-up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+def _limiter_samples(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+    def sample() -> Dict[Tuple[str, ...], float]:
+        from app.core.rate_limit import limiter_snapshot
+        return {(key,): state[field] for key, state in limiter_snapshot().items()}
+    return sample
+
+
+REGISTRY.register(CallbackGauge(
+    "llm_queue_depth", "Calls waiting for an LLM concurrency slot", ["limiter"],
+    _limiter_samples("waiting")
+))
+REGISTRY.register(CallbackGauge(
+    "llm_in_flight", "LLM calls in flight", ["limiter"], _limiter_samples("in_flight")
+))
+REGISTRY.register(CallbackGauge(
+    "llm_concurrency_limit", "Adaptive LLM concurrency limit", ["limiter"], _limiter_samples("limit")
+))
+
+
+def _inference_queue_samples() -> Dict[Tuple[str, ...], float]:
+    # Only once a llama.cpp model has been used
+    inference = sys.modules.get("app.core.inference")
+    if inference is None:
+        return {}
+    return {(path,): state["queued"] for path, state in inference.inference_snapshot().items()}
+
+
+REGISTRY.register(CallbackGauge(
+    "inference_queue_depth", "Requests waiting for the llama.cpp worker", ["model"],
+    _inference_queue_samples
+))
+
+
+def instrument(agent: str, method: Optional[str] = None):
+    """Record latency, outcome, parse failures and a span for an async agent method."""
+    def decorator(func):
+        name = method or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            from langchain_core.exceptions import OutputParserException
+
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                with span(f"{agent}.{name}"):
+                    result = await func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            except OutputParserException:
+                AGENT_PARSE_FAILURES.inc(agent=agent)
+                raise
+            finally:
+                AGENT_CALL_SECONDS.observe(time.perf_counter() - start, agent=agent, method=name)
+                AGENT_CALLS.inc(agent=agent, method=name, outcome=outcome)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def stage(name: str):
+    """Time and trace one ingestion stage."""
+    with span(f"ingest.{name}"), INGEST_STAGE_SECONDS.time(stage=name):
+        yield
+
+
+# ASGI scope of the request being served, for labelling database queries
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+
+def endpoint_label() -> str:
+    """Route template of the current request, for low-cardinality labels."""
+    scope = current_scope.get()
+    if scope is None:
+        return "background"
+    if "route" not in scope:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=endpoint_label(),
+                status=str(status["code"])
+            )
+            current_scope.reset(token)
+
+
+def instrument_engine(engine):
+    """Time every query run through a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint_label())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(ctx):
+        # A failed query never reaches after_cursor_execute; drop its start
+        # so the stack does not grow for the life of the pooled connection
+        if ctx.connection is not None and ctx.connection.info.get("query_start"):
+            ctx.connection.info["query_start"].pop()
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Continuously measure how late the event loop wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - interval))
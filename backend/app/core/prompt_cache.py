@@ -0,0 +1,164 @@
+"""Prompt prefix caching across providers.
+
+Agent prompts are laid out so everything but the final message is a
+stable prefix: static instructions first, then per-contract context, with
+the per-call input (a clause, a chunk) last. Consecutive calls for the
+same contract then share a byte-identical prefix, which providers can
+serve from cache: Anthropic through a `cache_control` marker on the end
+of the prefix, Ollama and llama.cpp by reusing the KV cache of the
+previous prompt (kept loaded with `OLLAMA_KEEP_ALIVE`).
+
+`PrefixCacheTracker` records, per backend, which prefixes were sent
+recently, and per contract how many calls could reuse one, alongside the
+cached prompt tokens providers report.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
+
+from app.core.config import settings
+from app.core.metrics import LLM_CACHED_PROMPT_TOKENS, LLM_PREFIX_CACHE
+
+# Contract whose calls are being made, for per-contract hit rates
+current_cache_scope: ContextVar[Optional[str]] = ContextVar("current_cache_scope", default=None)
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+@contextmanager
+def cache_scope(contract_id: str):
+    """Attribute LLM calls in this context to a contract."""
+    token = current_cache_scope.set(contract_id)
+    try:
+        yield
+    finally:
+        current_cache_scope.reset(token)
+
+
+def as_messages(input: Any) -> Optional[List[BaseMessage]]:
+    """Messages of a prompt value or message list; None for plain strings."""
+    if isinstance(input, PromptValue):
+        return input.to_messages()
+    if isinstance(input, list) and all(isinstance(m, BaseMessage) for m in input):
+        return input
+    return None
+
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in message.content)
+
+
+def prefix_key(messages: List[BaseMessage]) -> Optional[str]:
+    """Hash of every message but the last, or None for single-message prompts."""
+    if len(messages) < 2:
+        return None
+    digest = hashlib.sha256()
+    for message in messages[:-1]:
+        digest.update(message.type.encode())
+        digest.update(b"\0")
+        digest.update(_text(message).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def mark_cache_prefix(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """Copy of the messages with an Anthropic cache marker ending the prefix."""
+    if len(messages) < 2:
+        return messages
+    last_prefix = messages[-2]
+    if isinstance(last_prefix.content, str):
+        blocks = [{"type": "text", "text": last_prefix.content}]
+    else:
+        blocks = [b if isinstance(b, dict) else {"type": "text", "text": str(b)} for b in last_prefix.content]
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return [*messages[:-2], last_prefix.model_copy(update={"content": blocks}), messages[-1]]
+
+
+def prepare_prompt(input: Any, provider: str) -> Any:
+    """Adapt a prompt to a provider's prefix caching."""
+    if provider != "anthropic":
+        return input
+    messages = as_messages(input)
+    return input if messages is None else mark_cache_prefix(messages)
+
+
+class PrefixCacheTracker:
+    """Prefix reuse per backend and hit rates per contract.
+
+    A call is a prefix hit when the same backend completed a call with the
+    same prefix before it started, within `llm_prefix_cache_ttl` seconds,
+    i.e. when a provider cache or a warm KV cache could serve it. Calls
+    fanned out at once therefore miss until the first one completes.
+    """
+
+    def __init__(self, max_prefixes: int = 256, max_scopes: int = 1000):
+        self.max_prefixes = max_prefixes
+        self.max_scopes = max_scopes
+        # backend -> prefix key -> [first completion, last completion]
+        self.prefixes: Dict[str, "OrderedDict[str, List[float]]"] = {}
+        self.scopes: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.totals = {"calls": 0, "prefix_hits": 0, "cached_tokens": 0}
+
+    def record(self, task: str, backend: str, input: Any, started: float, cached_tokens: int = 0) -> Optional[bool]:
+        """Record a completed call started at `started` (perf_counter); returns whether it was a prefix hit."""
+        messages = as_messages(input)
+        key = prefix_key(messages) if messages else None
+        if key is None:
+            return None
+
+        now = time.perf_counter()
+        seen = self.prefixes.setdefault(backend, OrderedDict())
+        entry = seen.pop(key, None)
+        if entry is None or now - entry[1] > settings.llm_prefix_cache_ttl:
+            entry = [now, now]
+        hit = entry[0] <= started
+        entry[1] = now
+        seen[key] = entry
+        while len(seen) > self.max_prefixes:
+            seen.popitem(last=False)
+
+        LLM_PREFIX_CACHE.inc(task=task, outcome="hit" if hit else "miss")
+        if cached_tokens:
+            LLM_CACHED_PROMPT_TOKENS.inc(cached_tokens, task=task)
+
+        counters = [self.totals]
+        scope = current_cache_scope.get()
+        if scope is not None:
+            stats = self.scopes.pop(scope, None) or {"calls": 0, "prefix_hits": 0, "cached_tokens": 0}
+            self.scopes[scope] = stats
+            while len(self.scopes) > self.max_scopes:
+                self.scopes.popitem(last=False)
+            counters.append(stats)
+        for stats in counters:
+            stats["calls"] += 1
+            stats["prefix_hits"] += hit
+            stats["cached_tokens"] += cached_tokens
+        return hit
+
+    @staticmethod
+    def _with_rate(stats: Dict[str, int]) -> dict:
+        calls = stats["calls"]
+        return {**stats, "hit_rate": round(stats["prefix_hits"] / calls, 4) if calls else None}
+
+    def snapshot(self, contract_id: Optional[str] = None, limit: int = 50) -> Optional[dict]:
+        """Overall and most recent per-contract stats, or one contract's."""
+        if contract_id is not None:
+            stats = self.scopes.get(contract_id)
+            return self._with_rate(stats) if stats else None
+        recent = list(reversed(self.scopes.items()))[:limit]
+        return {
+            "overall": self._with_rate(self.totals),
+            "contracts": {scope: self._with_rate(stats) for scope, stats in recent},
+        }
+
+
+PREFIX_CACHE = PrefixCacheTracker()
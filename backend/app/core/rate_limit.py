@@ -0,0 +1,241 @@
+"""Provider rate limiting and adaptive concurrency for LLM calls."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+from app.core.resilience import LLMQueueTimeoutError
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    """Whether an error is a provider rate-limit (429) response."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(exc).__name__.lower()
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it said."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` tokens are available and take them (FIFO)."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AIMDController:
+    """Additive-increase/multiplicative-decrease concurrency limit.
+
+    The limit grows by one after a full window of healthy calls, and is cut
+    by `decrease_factor` on a rate-limit error or when latency exceeds
+    `latency_tolerance` times the observed baseline.
+    """
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        initial: int = 4,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.waiting = 0
+        self.baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self, latency: float):
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            # Baseline tracks the fast end of the latency distribution
+            weight = 0.3 if latency < self.baseline else 0.02
+            self.baseline += weight * (latency - self.baseline)
+
+        if latency > self.baseline * self.latency_tolerance:
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_overload(self):
+        self._decrease()
+
+    def _decrease(self):
+        # Only back off once per in-flight generation of requests
+        now = time.monotonic()
+        if self.baseline and now - self._last_decrease < self.baseline:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "baseline_latency": self.baseline,
+        }
+
+
+class Reservation:
+    """Token budget taken for one call, settled with actual usage."""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+
+class ProviderLimiter:
+    """Requests/tokens-per-minute budgets plus adaptive concurrency for a provider."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = AIMDController(
+            min_limit=settings.llm_concurrency_min,
+            max_limit=settings.llm_concurrency_max,
+            initial=settings.llm_concurrency_initial
+        )
+        self.rate_limited = 0
+        self.queue_timeouts = 0
+
+    async def _acquire(self, estimated_tokens: int):
+        await self.concurrency.acquire()
+        try:
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens:
+                await self.tokens.acquire(estimated_tokens)
+        except BaseException:
+            # Cancelled while waiting for budget: give the slot back
+            await self.concurrency.release()
+            raise
+
+    @asynccontextmanager
+    async def reserve(self, estimated_tokens: int, timeout: Optional[float] = None) -> AsyncIterator[Reservation]:
+        """Hold a concurrency slot and budget for the duration of one call.
+
+        Raises LLMQueueTimeoutError if they are not available within `timeout` seconds.
+        """
+        reservation = Reservation(estimated_tokens)
+        try:
+            await asyncio.wait_for(self._acquire(estimated_tokens), timeout or None)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise LLMQueueTimeoutError(f"No rate limit slot within {timeout}s")
+        try:
+            start = time.monotonic()
+            try:
+                yield reservation
+            except Exception as e:
+                if is_rate_limited(e):
+                    self.rate_limited += 1
+                    self.concurrency.on_overload()
+                    wait = retry_after(e)
+                    for bucket in (self.requests, self.tokens):
+                        if bucket and wait:
+                            bucket.pause(wait)
+                raise
+
+            self.concurrency.on_success(time.monotonic() - start)
+            if self.tokens and reservation.actual_tokens is not None:
+                self.tokens.adjust(reservation.actual_tokens - estimated_tokens)
+        finally:
+            await self.concurrency.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "rate_limited": self.rate_limited,
+            "queue_timeouts": self.queue_timeouts,
+            "tokens_available": int(self.tokens.tokens) if self.tokens else None,
+            **self.concurrency.snapshot(),
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str, backend_name: str) -> ProviderLimiter:
+    """Get the limiter for a backend.
+
+    Providers with configured quotas share one limiter across all their
+    backends; other backends get their own adaptive concurrency limit.
+    """
+    quota = settings.llm_rate_limits.get(provider)
+    key = provider if quota is not None else backend_name
+    limiter = _limiters.get(key)
+    if limiter is None:
+        quota = quota or {}
+        limiter = ProviderLimiter(rpm=quota.get("rpm"), tpm=quota.get("tpm"))
+        _limiters[key] = limiter
+    return limiter
+
+
+def limiter_snapshot() -> dict:
+    """State of every limiter."""
+    return {key: limiter.snapshot() for key, limiter in _limiters.items()}
@@ -0,0 +1,173 @@
+"""Timeouts, retries and circuit breaking for LLM calls."""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+class LLMTimeoutError(Exception):
+    """An LLM call exceeded its task deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Every backend for a task is currently failing fast."""
+
+
+class LLMQueueTimeoutError(Exception):
+    """An LLM call waited longer than allowed for a rate limit slot."""
+
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+def _status_code(exc: Exception):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_transient(exc: Exception) -> bool:
+    """Whether an error is worth retrying."""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    status = _status_code(exc)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+
+    try:
+        import httpx
+        if isinstance(exc, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+
+    name = type(exc).__name__.lower()
+    return any(marker in name for marker in ("timeout", "connection", "ratelimit", "overloaded"))
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt: int) -> float:
+        """Sleep before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class Deadline:
+    """A task's deadline, started once its first call holds a rate limit slot.
+
+    Time queued behind the provider's quota does not count against it, so a
+    deep queue of calls runs at the quota instead of timing out.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at: Optional[float] = None
+
+    def start(self):
+        if self.expires_at is None:
+            self.expires_at = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return self.seconds
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker state."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails fast after consecutive failures, probing again after a cool-down.
+
+    Half-open, a single call at a time is let through as the probe; its
+    outcome closes or reopens the circuit. A probe that never reports back
+    (e.g. it was not sent after all) frees the slot after `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+        self._state = CircuitState.CLOSED
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted; half-open, this claims the probe."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN:
+            return False
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.probe_started_at = None
+        self._state = CircuitState.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started_at = None
+        if self._state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(backend_name: str) -> CircuitBreaker:
+    """Get the circuit breaker shared by every route using a backend."""
+    breaker = _breakers.get(backend_name)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_timeout=settings.llm_circuit_reset_seconds
+        )
+        _breakers[backend_name] = breaker
+    return breaker
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Get the configured retry policy."""
+    return RetryPolicy(
+        max_attempts=settings.llm_max_attempts,
+        base_delay=settings.llm_retry_base_delay,
+        max_delay=settings.llm_retry_max_delay
+    )
+
+
+def get_timeout(task: str) -> float:
+    """Get the deadline in seconds for a task."""
+    return settings.llm_timeouts.get(task, settings.llm_default_timeout)
@@ -0,0 +1,167 @@
+"""Conditional GET and an in-process cache of serialized responses.
+
+Contract-scoped resources are validated by the contract's `updated_at`,
+which every write to the contract, its clauses or its amendments moves
+forward (see `app.models.events`). A client holding the current ETag gets
+a 304 after a single primary-key lookup; otherwise the serialized body is
+served from a bounded LRU keyed by that version, and rebuilt only after a
+write. Committed writes also evict the contract's entries right away.
+With a shared coordinator, bodies one worker built are also kept in the
+shared cache for the others; entries are keyed by version, so an old one
+is never served, and expires after `COORDINATION_CACHE_TTL`.
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.coordination import get_coordinator
+from app.core.metrics import CACHE_HITS, CACHE_MISSES
+from app.models.events import on_contracts_committed
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """LRU of response bodies, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, bytes]]" = OrderedDict()
+        self._by_contract: Dict[str, Set[Tuple[str, str]]] = {}
+
+    def get(self, contract_id: str, key: str, etag: str) -> Optional[bytes]:
+        entry = self._entries.get((contract_id, key))
+        if entry is None or entry[0] != etag:
+            return None
+        self._entries.move_to_end((contract_id, key))
+        return entry[1]
+
+    def put(self, contract_id: str, key: str, etag: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        self._remove((contract_id, key))
+        self._entries[(contract_id, key)] = (etag, body)
+        self._by_contract.setdefault(contract_id, set()).add((contract_id, key))
+        self.size += len(body)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, contract_ids: Set[str]):
+        """Drop every entry of the given contracts."""
+        for contract_id in contract_ids:
+            for entry_key in self._by_contract.pop(contract_id, ()):
+                entry = self._entries.pop(entry_key, None)
+                if entry is not None:
+                    self.size -= len(entry[1])
+
+    def _remove(self, entry_key: Tuple[str, str]):
+        entry = self._entries.pop(entry_key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[1])
+        keys = self._by_contract.get(entry_key[0])
+        if keys is not None:
+            keys.discard(entry_key)
+            if not keys:
+                del self._by_contract[entry_key[0]]
+
+    def snapshot(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.size, "contracts": len(self._by_contract)}
+
+
+RESPONSE_CACHE = ResponseCache(settings.response_cache_entries, settings.response_cache_max_bytes)
+on_contracts_committed(RESPONSE_CACHE.invalidate)
+
+
+def validators(contract_id: str, updated_at: datetime) -> Tuple[str, str]:
+    """ETag and Last-Modified header values for a contract version."""
+    # Stored timestamps are naive UTC
+    updated_at = updated_at.replace(tzinfo=timezone.utc)
+    etag = f'W/"{contract_id}-{updated_at.timestamp():.6f}"'
+    last_modified = format_datetime(updated_at, usegmt=True)
+    return etag, last_modified
+
+
+def is_not_modified(request: Request, etag: str, updated_at: datetime) -> bool:
+    """Whether the request's validators still match (If-None-Match wins)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        # Weak comparison: W/"x" and "x" match
+        return "*" in tags or etag in tags or etag[2:] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        modified = updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+        return since.tzinfo is not None and modified <= since
+    return False
+
+
+async def _shared_response(shared_key: str, build: Callable[[], Awaitable[bytes]]) -> bytes:
+    """Body from the cache shared between workers, built and stored on a miss.
+
+    Best effort: if the shared cache cannot be read or written (e.g. the
+    database is locked), the body is built and served without it.
+    """
+    coordinator = get_coordinator()
+    if not coordinator.shared:
+        return await build()
+    try:
+        body = await coordinator.cache_get(shared_key)
+    except Exception:
+        logger.warning("Shared response cache read failed for %s", shared_key, exc_info=True)
+        return await build()
+    if body is not None:
+        CACHE_HITS.inc(cache="shared_response")
+        return body
+    CACHE_MISSES.inc(cache="shared_response")
+    body = await build()
+    try:
+        await coordinator.cache_set(shared_key, body)
+    except Exception:
+        logger.warning("Shared response cache write failed for %s", shared_key, exc_info=True)
+    return body
+
+
+async def cached_response(
+    request: Request,
+    contract_id: str,
+    updated_at: Optional[datetime],
+    build: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """Serve a contract-scoped JSON resource with conditional GET and caching.
+
+    `build` loads and serializes the resource; it only runs on a cache miss.
+    """
+    if updated_at is None:
+        return Response(content=await build(), media_type="application/json")
+
+    etag, last_modified = validators(contract_id, updated_at)
+    # Clients must revalidate, which is a cheap 304 while nothing changed
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+
+    if is_not_modified(request, etag, updated_at):
+        CACHE_HITS.inc(cache="http_not_modified")
+        return Response(status_code=304, headers=headers)
+
+    key = request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    body = RESPONSE_CACHE.get(contract_id, key, etag)
+    if body is None:
+        CACHE_MISSES.inc(cache="http_response")
+        body = await _shared_response(f"response:{etag}:{key}", build)
+        RESPONSE_CACHE.put(contract_id, key, etag, body)
+    else:
+        CACHE_HITS.inc(cache="http_response")
+    return Response(content=body, media_type="application/json", headers=headers)
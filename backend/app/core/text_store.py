@@ -0,0 +1,229 @@
+"""Disk-backed text of very large documents.
+
+Extracted text above `text_spill_threshold` bytes is written to a UTF-8
+file under `text_spill_dir` instead of being held as one `str` (and then
+copied into the database row and every prompt). `DocumentText` reads it
+through a memory map: chunking scans the map for paragraph breaks and
+hands out `TextSlice` byte ranges, which are decoded only when their LLM
+call runs, so the process holds a few chunks at a time rather than the
+document.
+"""
+
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+BLOCK_SIZE = 1024 * 1024
+# UTF-8 takes at most 4 bytes per character and a token at least one
+# character, so a range this many bytes per token over the limit is too big
+# to be worth decoding just to count it
+MAX_BYTES_PER_TOKEN = 16
+
+
+def spill_path(contract_id: str) -> str:
+    """Where a contract's spilled text is kept."""
+    return os.path.join(settings.text_spill_dir, f"{contract_id}.txt")
+
+
+def remove_spilled_text(contract_id: str):
+    """Delete a contract's spilled text, if it has any."""
+    try:
+        os.remove(spill_path(contract_id))
+    except FileNotFoundError:
+        pass
+
+
+class DocumentText:
+    """Read-only, memory-mapped view of a UTF-8 text file.
+
+    Offsets are in bytes; slices are widened or narrowed to character
+    boundaries before decoding.
+    """
+
+    def __init__(self, path: str, chars: Optional[int] = None):
+        self.path = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._chars = chars
+
+    def __enter__(self) -> "DocumentText":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        """Length in characters."""
+        if self._chars is None:
+            self._chars = sum(len(block) for block in self.blocks())
+        return self._chars
+
+    def _align(self, offset: int) -> int:
+        # Move past UTF-8 continuation bytes (0b10xxxxxx)
+        offset = max(0, min(offset, self.size))
+        while offset < self.size and self._map[offset] & 0xC0 == 0x80:
+            offset += 1
+        return offset
+
+    def slice(self, start: int, end: int) -> str:
+        return self._map[self._align(start):self._align(end)].decode("utf-8", errors="replace")
+
+    def head(self, chars: int) -> str:
+        """The first `chars` characters."""
+        return self.slice(0, chars * 4)[:chars]
+
+    def blocks(self, size: int = BLOCK_SIZE) -> Iterator[str]:
+        """The text in decoded blocks of about `size` bytes."""
+        start = 0
+        while start < self.size:
+            end = self._align(start + size)
+            yield self.slice(start, end)
+            start = end
+
+    def _breaks(self, start: int, end: int, separator: bytes) -> Iterator[Tuple[int, int]]:
+        """Ranges of [start, end) between occurrences of `separator`."""
+        while start < end:
+            found = self._map.find(separator, start, end)
+            if found < 0:
+                yield start, end
+                return
+            if found > start:
+                yield start, found
+            start = found + len(separator)
+
+    def _pieces(self, max_tokens: int, provider: Optional[str]) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, tokens) of paragraphs, or lines and fixed steps of oversized ones."""
+        from app.core.tokens import count_tokens
+
+        for start, end in self._breaks(0, self.size, b"\n\n"):
+            if end - start <= max_tokens * MAX_BYTES_PER_TOKEN:
+                tokens = count_tokens(self.slice(start, end), provider)
+                if tokens <= max_tokens:
+                    yield start, end, tokens
+                    continue
+            for line_start, line_end in self._breaks(start, end, b"\n"):
+                if line_end - line_start <= max_tokens * MAX_BYTES_PER_TOKEN:
+                    tokens = count_tokens(self.slice(line_start, line_end), provider)
+                    if tokens <= max_tokens:
+                        yield line_start, line_end, tokens
+                        continue
+                yield from self._windows(line_start, line_end, max_tokens, provider)
+
+    def _windows(self, start: int, end: int, max_tokens: int, provider: Optional[str]) -> Iterator[Tuple[int, int, int]]:
+        """Fixed-size pieces of an oversized line, each measured and shrunk to fit."""
+        from app.core.tokens import SAFETY_MARGIN, count_tokens
+
+        step = max_tokens * 4
+        position = start
+        while position < end:
+            window_end = self._align(min(position + step, end))
+            tokens = count_tokens(self.slice(position, window_end), provider)
+            while tokens > max_tokens:
+                step = max(1, int((window_end - position) * max_tokens / tokens * (1 - SAFETY_MARGIN)))
+                window_end = self._align(min(position + step, end))
+                tokens = count_tokens(self.slice(position, window_end), provider)
+            yield position, window_end, tokens
+            position = window_end
+
+    def split(self, max_tokens: int, provider: Optional[str] = None) -> List["TextSlice"]:
+        """Chunks of at most `max_tokens`, preferring paragraph breaks.
+
+        Like `split_to_tokens`, but each chunk is one contiguous byte range,
+        separators included, and nothing is decoded beyond one paragraph.
+        """
+        chunks: List[TextSlice] = []
+        start = end = None
+        used = 0
+        for piece_start, piece_end, tokens in self._pieces(max_tokens, provider):
+            if start is not None and used + tokens + 1 > max_tokens:
+                chunks.append(TextSlice(self, start, end))
+                start = None
+            if start is None:
+                start, used = piece_start, 0
+            end = piece_end
+            used += tokens + 1
+        if start is not None:
+            chunks.append(TextSlice(self, start, end))
+        return chunks
+
+
+@dataclass
+class TextSlice:
+    """A byte range of a `DocumentText`, decoded on demand."""
+    document: DocumentText
+    start: int
+    end: int
+
+    @property
+    def nbytes(self) -> int:
+        return self.end - self.start
+
+    def read(self) -> str:
+        return self.document.slice(self.start, self.end)
+
+
+# Contract text as extracted: in memory, or spilled to disk when large
+ContractText = Union[str, DocumentText]
+
+
+def text_size(text: Union[str, DocumentText, TextSlice]) -> int:
+    """Approximate size in bytes of text or a view of it."""
+    if isinstance(text, DocumentText):
+        return text.size
+    if isinstance(text, TextSlice):
+        return text.nbytes
+    return len(text)
+
+
+def read_text(text: Union[str, DocumentText, TextSlice]) -> str:
+    """Decode a view (all of it) or pass a string through."""
+    if isinstance(text, DocumentText):
+        return text.slice(0, text.size)
+    if isinstance(text, TextSlice):
+        return text.read()
+    return text
+
+
+def spool_text(pieces: Iterable[str], path: str, threshold: int) -> ContractText:
+    """Collect text pieces, spilling to `path` once they exceed `threshold` bytes.
+
+    Returns the text itself when it stayed under the threshold, otherwise
+    a `DocumentText` over the file.
+    """
+    buffered: List[bytes] = []
+    size = chars = 0
+    output = None
+    try:
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            size += len(data)
+            chars += len(piece)
+            if output is None:
+                buffered.append(data)
+                if size <= threshold:
+                    continue
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                output = open(path, "wb")
+                output.writelines(buffered)
+                buffered = []
+            else:
+                output.write(data)
+    except BaseException:
+        if output is not None:
+            output.close()
+            os.remove(path)
+        raise
+
+    if output is None:
+        return b"".join(buffered).decode("utf-8")
+    output.close()
+    return DocumentText(path, chars=chars)
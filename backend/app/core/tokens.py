@@ -0,0 +1,220 @@
+"""Prompt token counting and per-agent token budgets."""
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterator, List, Optional, Union
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.config import settings
+from app.core.llm import LLMTask
+from app.core.text_store import ContractText, DocumentText, TextSlice
+
+# Average characters per token when no tokenizer is available
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "ollama": 3.5,
+    "llamacpp": 3.5,
+}
+
+# Headroom for tokenizer estimation error and chat-template overhead
+SAFETY_MARGIN = 0.05
+MIN_INPUT_TOKENS = 256
+
+
+@lru_cache()
+def _tiktoken_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: ContractText, provider: Optional[str] = None) -> int:
+    """Count tokens for a provider, exactly with tiktoken for OpenAI if installed."""
+    provider = (provider or settings.llm_provider).lower()
+    if isinstance(text, DocumentText):
+        return sum(count_tokens(block, provider) for block in text.blocks())
+    if not text:
+        return 0
+
+    if provider == "openai":
+        encoding = _tiktoken_encoding(settings.openai_model)
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN.get(provider, 4.0))
+
+
+def count_prompt_tokens(input: Any, provider: Optional[str] = None) -> int:
+    """Count tokens for a rendered prompt value, message list or string."""
+    text = input.to_string() if hasattr(input, "to_string") else str(input)
+    return count_tokens(text, provider)
+
+
+def context_window(provider: str) -> int:
+    """Context window in tokens for a provider."""
+    provider = provider.lower()
+    if provider == "ollama":
+        return settings.ollama_num_ctx
+    if provider == "llamacpp":
+        return settings.llamacpp_n_ctx
+    return settings.llm_context_windows.get(provider, 8192)
+
+
+def trim_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None) -> str:
+    """Trim text to at most `max_tokens`, cutting at a whitespace boundary."""
+    total = count_tokens(text, provider)
+    if total <= max_tokens:
+        return text
+
+    marker = "\n[...]"
+    end = int(len(text) * max_tokens / total)
+    while end > 0 and count_tokens(text[:end], provider) + 2 > max_tokens:
+        end = int(end * 0.9)
+    cut = text.rfind(" ", 0, end)
+    if cut > end // 2:
+        end = cut
+    return text[:end] + marker
+
+
+def split_to_tokens(text: ContractText, max_tokens: int, provider: Optional[str] = None) -> List[Union[str, TextSlice]]:
+    """Split text into chunks of at most `max_tokens`, preferring paragraph breaks.
+
+    Spilled text is split into slices of its file instead of strings.
+    """
+    if isinstance(text, DocumentText):
+        return text.split(max_tokens, provider)
+    if count_tokens(text, provider) <= max_tokens:
+        return [text]
+
+    # separators[i] joins pieces[i] to the piece before it, so packed chunks
+    # keep the text's own breaks: paragraphs, lines, or none inside a line.
+    pieces: List[str] = []
+    separators: List[str] = []
+    for paragraph in text.split("\n\n"):
+        separator = "\n\n"
+        if count_tokens(paragraph, provider) <= max_tokens:
+            pieces.append(paragraph)
+            separators.append(separator)
+            continue
+        for line in paragraph.split("\n"):
+            for window in _windows(line, max_tokens, provider):
+                pieces.append(window)
+                separators.append(separator)
+                separator = ""
+            separator = "\n"
+
+    return [
+        pieces[group[0]] + "".join(separators[i] + pieces[i] for i in group[1:])
+        for group in pack_indices(pieces, max_tokens, provider)
+    ]
+
+
+def _windows(line: str, max_tokens: int, provider: Optional[str]) -> Iterator[str]:
+    """Pieces of a line, each measured and shrunk until it fits in `max_tokens`."""
+    tokens = count_tokens(line, provider)
+    if tokens <= max_tokens:
+        yield line
+        return
+    step = max(1, int(len(line) * max_tokens / tokens * (1 - SAFETY_MARGIN)))
+    position = 0
+    while position < len(line):
+        window = line[position:position + step]
+        tokens = count_tokens(window, provider)
+        while tokens > max_tokens and len(window) > 1:
+            step = max(1, int(len(window) * max_tokens / tokens * (1 - SAFETY_MARGIN)))
+            window = line[position:position + step]
+            tokens = count_tokens(window, provider)
+        yield window
+        position += len(window)
+
+
+def pack_to_tokens(
+    items: List[str],
+    max_tokens: int,
+    provider: Optional[str] = None,
+    separator: str = "\n\n"
+) -> List[str]:
+    """Greedily join items into groups of at most `max_tokens`."""
+    return [
+        separator.join(items[i] for i in group)
+        for group in pack_indices(items, max_tokens, provider)
+    ]
+
+
+def pack_indices(items: List[str], max_tokens: int, provider: Optional[str] = None) -> List[List[int]]:
+    """Greedily group item indices so each group fits in `max_tokens`.
+
+    An item larger than the budget gets a group of its own.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, item in enumerate(items):
+        size = count_tokens(item, provider) + 1
+        if current and used + size > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+@dataclass
+class PromptBudget:
+    """Token budget for the variable inputs of one agent prompt."""
+    provider: str
+    context_window: int
+    fixed_tokens: int
+    completion_tokens: int
+
+    def input_tokens(self, output_ratio: float = 0.0) -> int:
+        """Tokens available for variable input.
+
+        `output_ratio` reserves extra completion room proportional to the
+        input, for prompts whose answer echoes the input back.
+        """
+        free = self.context_window * (1 - SAFETY_MARGIN) - self.fixed_tokens - self.completion_tokens
+        return max(MIN_INPUT_TOKENS, int(free / (1 + output_ratio)))
+
+    def count(self, text: ContractText) -> int:
+        return count_tokens(text, self.provider)
+
+    def trim(self, text: str, max_tokens: int) -> str:
+        return trim_to_tokens(text, max_tokens, self.provider)
+
+    def split(self, text: ContractText, max_tokens: int) -> List[Union[str, TextSlice]]:
+        return split_to_tokens(text, max_tokens, self.provider)
+
+
+def plan_budget(
+    task: LLMTask,
+    prompt: ChatPromptTemplate,
+    completion_tokens: int,
+    **fixed_inputs: Any
+) -> PromptBudget:
+    """Plan a budget against the smallest context window in the task's route."""
+    from app.core.llm_routing import get_router
+
+    providers = [b.config.provider for b in get_router().route(task).backends]
+    provider = min(providers, key=context_window)
+
+    variables = {name: "" for name in prompt.input_variables}
+    variables.update(fixed_inputs)
+    fixed = count_tokens(prompt.format(**variables), provider)
+
+    return PromptBudget(
+        provider=provider,
+        context_window=context_window(provider),
+        fixed_tokens=fixed,
+        completion_tokens=completion_tokens
+    )
@@ -0,0 +1,110 @@
+"""Background warm-up of deferred imports and models.
+
+The API accepts connections as soon as the database is ready. The agent
+stack, LLM clients, local model weights and embeddings load here in the
+background so the first real request does not pay for them, and `/ready`
+reports when they have.
+"""
+
+import asyncio
+import importlib
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+
+# Imported at first use rather than at startup
+DEFERRED_MODULES = [
+    "fitz",
+    "docx",
+    "app.agents.document_parser",
+    "app.agents.clause_extractor",
+    "app.agents.risk_analyzer",
+    "app.agents.amendment_generator",
+    "app.workflows.pipeline",
+    "app.services.portfolio_risk",
+    "app.services.clause_library",
+]
+LOCAL_PROVIDERS = {"ollama", "llamacpp"}
+
+
+class WarmupState:
+    """Progress of the warm-up task."""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, dict] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def snapshot(self) -> dict:
+        end = self.finished_at or time.monotonic()
+        return {
+            "ready": self.ready,
+            "seconds": round(end - self.started_at, 3) if self.started_at else None,
+            "steps": self.steps,
+        }
+
+
+WARMUP = WarmupState()
+
+
+async def _step(name: str, fn: Callable[[], Awaitable[None]]):
+    """Run one warm-up step; failures are reported, not raised."""
+    start = time.monotonic()
+    entry = {"status": "running"}
+    WARMUP.steps[name] = entry
+    try:
+        await asyncio.wait_for(fn(), settings.warmup_timeout)
+        entry["status"] = "ok"
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+    entry["seconds"] = round(time.monotonic() - start, 3)
+
+
+async def _import_modules():
+    for module in DEFERRED_MODULES:
+        await asyncio.to_thread(importlib.import_module, module)
+
+
+async def _load_llm_clients():
+    from app.core.llm import LLMTask
+    from app.core.llm_routing import get_router
+
+    backends = {}
+    for task in LLMTask:
+        for backend in get_router().route(task).backends:
+            backends.setdefault(backend.name, backend)
+
+    for backend in backends.values():
+        model = await asyncio.to_thread(lambda: backend.model)
+        if settings.warmup_local_models and backend.config.provider in LOCAL_PROVIDERS:
+            # One short generation loads the weights into (GPU) memory
+            await model.ainvoke("Reply with OK.")
+
+
+async def _compile_workflow():
+    from app.workflows.pipeline import get_pipeline
+
+    await get_pipeline()
+
+
+async def _load_embeddings():
+    from app.core.llm import get_embeddings
+
+    embeddings = await asyncio.to_thread(get_embeddings)
+    await asyncio.to_thread(embeddings.embed_query, "warm-up")
+
+
+async def warm_up():
+    """Load deferred modules and models; run as a background task."""
+    WARMUP.started_at = time.monotonic()
+    await _step("imports", _import_modules)
+    await _step("workflow", _compile_workflow)
+    await _step("llm_clients", _load_llm_clients)
+    if settings.warmup_embeddings:
+        await _step("embeddings", _load_embeddings)
+    WARMUP.finished_at = time.monotonic()
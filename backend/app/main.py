@@ -1,11 +1,19 @@
 """FastAPI application entry point."""
 
+import asyncio
+import sys
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
+from app.core.coordination import LeaseHeld
 from app.core.database import init_db
+from app.core.metrics import REGISTRY, MetricsMiddleware, monitor_event_loop_lag
+from app.core.resilience import CircuitOpenError, LLMQueueTimeoutError, LLMTimeoutError
+from app.core.tracing import TracingMiddleware, shutdown_tracing
+from app.core.warmup import WARMUP, warm_up
 from app.api import contracts, clauses, amendments, analytics
 
 
@@ -13,7 +21,19 @@ from app.api import contracts, clauses, amendments, analytics
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     await init_db()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    warmup = asyncio.create_task(warm_up())
     yield
+    warmup.cancel()
+    lag_monitor.cancel()
+    # The workflow (and its checkpoint connection) may never have loaded
+    if "app.workflows.pipeline" in sys.modules:
+        from app.workflows.pipeline import close_pipeline
+        await close_pipeline()
+    if "app.services.pdf_extraction" in sys.modules:
+        from app.services.pdf_extraction import shutdown_pool
+        shutdown_pool()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -30,6 +50,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(contracts.router, prefix="/api/contracts", tags=["contracts"])
 app.include_router(clauses.router, prefix="/api/clauses", tags=["clauses"])
@@ -37,7 +59,44 @@ app.include_router(amendments.router, prefix="/api/amendments", tags=["amendment
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 
 
+@app.exception_handler(LLMTimeoutError)
+async def llm_timeout_handler(request: Request, exc: LLMTimeoutError):
+    """Report LLM deadline overruns as gateway timeouts."""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Report unavailable LLM backends without waiting on them."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.exception_handler(LLMQueueTimeoutError)
+async def llm_queue_timeout_handler(request: Request, exc: LLMQueueTimeoutError):
+    """Report LLM calls that could not get a rate limit slot in time as overload."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.exception_handler(LeaseHeld)
+async def lease_held_handler(request: Request, exc: LeaseHeld):
+    """Refuse work another worker is already doing instead of duplicating it."""
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": settings.app_name}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until background warm-up has finished."""
+    snapshot = WARMUP.snapshot()
+    return JSONResponse(status_code=200 if snapshot["ready"] else 503, content=snapshot)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -3,3 +3,9 @@
 from app.models.contract import Contract, ContractCreate, ContractResponse, ContractAnalysis
 from app.models.clause import Clause, ClauseCreate, ClauseResponse, ClauseType, RiskLevel
 from app.models.amendment import Amendment, AmendmentCreate, AmendmentResponse
+from app.models.portfolio import RiskModelWeights
+from app.models.clause_library import ClauseCluster
+from app.models.coordination import Lease, SharedCacheEntry
+
+# Registers the session hooks that version contracts on every write
+from app.models import events
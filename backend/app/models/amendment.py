@@ -66,6 +66,7 @@ class AmendmentSuggestion(BaseModel):
     risk_mitigation: str
     negotiation_points: List[str] = []
     priority: str  # low, medium, high
+    clause_index: Optional[int] = None  # Position of the source clause in the request
 
 
 class AmendmentResponse(BaseModel):
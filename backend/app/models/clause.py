@@ -46,7 +46,7 @@ class Clause(Base):
     __tablename__ = "clauses"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    contract_id = Column(String, ForeignKey("contracts.id"), nullable=False)
+    contract_id = Column(String, ForeignKey("contracts.id"), nullable=False, index=True)
     clause_type = Column(SQLEnum(ClauseType), default=ClauseType.OTHER)
     title = Column(String)
     text = Column(Text, nullable=False)
@@ -58,6 +58,8 @@ class Clause(Base):
     key_terms = Column(JSON, default=list)
     related_clauses = Column(JSON, default=list)
     analysis = Column(Text)
+    # Clause library cluster; not a foreign key, since rebuilds replace clusters wholesale
+    cluster_id = Column(String, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     contract = relationship("Contract", back_populates="clauses")
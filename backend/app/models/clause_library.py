@@ -0,0 +1,25 @@
+"""Clause library models."""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, Float, JSON, LargeBinary, Enum as SQLEnum
+import uuid
+
+from app.core.database import Base
+from app.models.clause import ClauseType
+
+
+class ClauseCluster(Base):
+    """One variant of a clause type: a centroid of clause embeddings."""
+    __tablename__ = "clause_clusters"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Clusters of one build share a run; a rebuild replaces the type's clusters
+    run_id = Column(String, nullable=False, index=True)
+    clause_type = Column(SQLEnum(ClauseType), nullable=False, index=True)
+    cluster_index = Column(Integer, nullable=False)
+    centroid = Column(LargeBinary, nullable=False)  # float32
+    embedding = Column(String, nullable=False)  # Space of the centroid, e.g. "hashing:512"
+    size = Column(Integer, default=0)  # Clauses assigned when built
+    mean_distance = Column(Float)  # Between members and the centroid
+    exemplar_clause_ids = Column(JSON, default=list)  # Closest to the centroid first
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
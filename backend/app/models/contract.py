@@ -43,15 +43,18 @@ class Contract(Base):
     contract_type = Column(SQLEnum(ContractType), default=ContractType.OTHER)
     status = Column(SQLEnum(ContractStatus), default=ContractStatus.UPLOADED)
     parties = Column(JSON, default=list)
-    effective_date = Column(DateTime)
-    expiration_date = Column(DateTime)
+    # Indexed for renewal-calendar range queries
+    effective_date = Column(DateTime, index=True)
+    expiration_date = Column(DateTime, index=True)
     raw_text = Column(Text)
     summary = Column(Text)
-    metadata = Column(JSON, default=dict)
+    # `metadata` is reserved on declarative classes; the column keeps its name
+    metadata_ = Column("metadata", JSON, default=dict)
     risk_score = Column(String)  # low, medium, high
     overall_assessment = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed: incremental readers pick up contracts changed since they last looked
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     clauses = relationship("Clause", back_populates="contract", cascade="all, delete-orphan")
     amendments = relationship("Amendment", back_populates="contract", cascade="all, delete-orphan")
@@ -89,8 +92,22 @@ class ContractResponse(BaseModel):
     summary: Optional[str] = None
     risk_score: Optional[str] = None
     overall_assessment: Optional[str] = None
+    metadata: dict = Field(default_factory=dict, validation_alias="metadata_")
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ExpiringContract(BaseModel):
+    """Renewal calendar entry."""
+    id: str
+    title: Optional[str] = None
+    contract_type: ContractType
+    parties: List[str] = []
+    effective_date: Optional[datetime] = None
+    expiration_date: datetime
+    days_remaining: int
+    notice_period_days: Optional[int] = None
+    notice_deadline: Optional[datetime] = None
@@ -0,0 +1,26 @@
+"""Coordination models: leases and the shared cache."""
+
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, LargeBinary
+
+from app.core.database import Base
+
+
+class Lease(Base):
+    """Exclusive, expiring claim on a unit of work, e.g. one stage of one contract."""
+    __tablename__ = "leases"
+
+    key = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)  # host:pid:token of the holder
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+    # The holder renews it while working; past this, anyone may take it over
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class SharedCacheEntry(Base):
+    """Value cached for every process on the database."""
+    __tablename__ = "shared_cache"
+
+    key = Column(String, primary_key=True)
+    value = Column(LargeBinary, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,72 @@
+"""Session hooks that keep a contract's `updated_at` current.
+
+`updated_at` doubles as the version of everything under a contract: any
+flush that writes the contract, one of its clauses or one of its
+amendments moves it forward, so HTTP validators and caches derived from
+it change with every write, whichever process made it.
+"""
+
+from datetime import datetime
+from itertools import chain
+from typing import Callable, List, Set
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+# Session.info key: ids of contracts written since the last commit
+TOUCHED_CONTRACTS = "touched_contracts"
+
+_commit_callbacks: List[Callable[[Set[str]], None]] = []
+
+
+def on_contracts_committed(callback: Callable[[Set[str]], None]):
+    """Call `callback(contract_ids)` after each commit that wrote contracts."""
+    _commit_callbacks.append(callback)
+
+
+def touched_contracts(session: Session) -> Set[str]:
+    """Contracts written in the session's current transaction."""
+    return session.info.setdefault(TOUCHED_CONTRACTS, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_contracts(session: Session, flush_context):
+    from app.models.amendment import Amendment
+    from app.models.clause import Clause
+    from app.models.contract import Contract
+
+    written, children = set(), set()
+    for obj in chain(session.new, session.deleted, session.dirty):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Contract):
+            written.add(obj.id)
+        elif isinstance(obj, (Clause, Amendment)) and obj.contract_id:
+            children.add(obj.contract_id)
+
+    # Contracts flushed themselves already got a fresh updated_at
+    stale = children - written
+    if stale:
+        now = datetime.utcnow()
+        session.connection().execute(
+            update(Contract).where(Contract.id.in_(stale)).values(updated_at=now)
+        )
+        for obj in session.identity_map.values():
+            if isinstance(obj, Contract) and obj.id in stale:
+                set_committed_value(obj, "updated_at", now)
+
+    touched_contracts(session).update(written | children)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session: Session):
+    contract_ids = session.info.pop(TOUCHED_CONTRACTS, None)
+    if contract_ids:
+        for callback in _commit_callbacks:
+            callback(contract_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched(session: Session):
+    session.info.pop(TOUCHED_CONTRACTS, None)
@@ -0,0 +1,34 @@
+"""Portfolio risk models."""
+
+from typing import Dict, List
+from pydantic import BaseModel, Field, field_validator
+
+from app.core.config import settings
+from app.models.clause import ClauseType
+
+
+class RiskModelWeights(BaseModel):
+    """Parameters of the contract risk model; defaults come from settings."""
+    clause_type_weights: Dict[ClauseType, float] = Field(
+        default_factory=lambda: dict(settings.portfolio_clause_type_weights)
+    )
+    mean_weight: float = Field(default_factory=lambda: settings.portfolio_mean_weight, ge=0)
+    max_weight: float = Field(default_factory=lambda: settings.portfolio_max_weight, ge=0)
+    percentile: float = Field(default_factory=lambda: settings.portfolio_percentile, ge=0, le=100)
+    percentile_weight: float = Field(default_factory=lambda: settings.portfolio_percentile_weight, ge=0)
+    missing_clause_penalties: Dict[ClauseType, float] = Field(
+        default_factory=lambda: dict(settings.portfolio_missing_clause_penalties)
+    )
+    level_thresholds: List[float] = Field(
+        default_factory=lambda: list(settings.portfolio_level_thresholds), min_length=3, max_length=3
+    )
+
+    @field_validator("level_thresholds")
+    @classmethod
+    def _ascending_fractions(cls, thresholds: List[float]) -> List[float]:
+        # Risk indices are fractions, and binning them needs the edges in order
+        if any(not 0 <= t <= 1 for t in thresholds):
+            raise ValueError("level thresholds must be between 0 and 1")
+        if thresholds != sorted(thresholds):
+            raise ValueError("level thresholds must be in ascending order")
+        return thresholds
@@ -0,0 +1 @@
+"""Application services shared by the API and CLI."""
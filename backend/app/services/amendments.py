@@ -0,0 +1,74 @@
+"""Amendment generation for a contract's risky clauses."""
+
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.amendment import Amendment, AmendmentStatus
+from app.models.clause import Clause, RiskLevel
+from app.models.contract import Contract
+
+
+def risk_levels_at_or_above(threshold: RiskLevel) -> List[RiskLevel]:
+    """Risk levels that need amendments for a threshold."""
+    risk_levels = [RiskLevel.CRITICAL, RiskLevel.HIGH]
+    if threshold == RiskLevel.MEDIUM:
+        risk_levels.append(RiskLevel.MEDIUM)
+    return risk_levels
+
+
+async def get_risky_clauses(db: AsyncSession, contract_id: str, threshold: RiskLevel) -> List[Clause]:
+    """Clauses of a contract at or above a risk threshold."""
+    result = await db.execute(
+        select(Clause).where(
+            Clause.contract_id == contract_id,
+            Clause.risk_level.in_(risk_levels_at_or_above(threshold))
+        )
+    )
+    return list(result.scalars().all())
+
+
+def describe_clause(clause: Clause) -> str:
+    """Format a clause and its risk assessment for the amendment prompt."""
+    return (
+        f"Clause: {clause.title or 'Untitled'} ({clause.clause_type.value})\n"
+        f"Risk Level: {clause.risk_level.value if clause.risk_level else 'unknown'}\n"
+        f"Risk Factors: {', '.join(clause.risk_factors or [])}\n"
+        f"Text: {clause.text}\n"
+        f"Analysis: {clause.analysis or 'No analysis'}"
+    )
+
+
+async def generate_contract_amendments(
+    db: AsyncSession,
+    contract: Contract,
+    clauses: List[Clause]
+) -> List[Amendment]:
+    """Generate and add draft amendments for the given clauses."""
+    from app.agents.amendment_generator import AmendmentGeneratorAgent
+
+    generator = AmendmentGeneratorAgent()
+    suggestions = await generator.generate(
+        clauses_with_risks=[describe_clause(c) for c in clauses],
+        contract_type=contract.contract_type.value,
+        contract_summary=contract.summary or ""
+    )
+
+    amendments = []
+    for suggestion in suggestions:
+        clause = clauses[suggestion.clause_index] if suggestion.clause_index is not None else None
+        amendment = Amendment(
+            contract_id=contract.id,
+            clause_id=clause.id if clause else None,
+            amendment_type=suggestion.amendment_type,
+            original_text=suggestion.original_text,
+            proposed_text=suggestion.proposed_text,
+            rationale=suggestion.rationale,
+            risk_mitigation=suggestion.risk_mitigation,
+            negotiation_points=suggestion.negotiation_points,
+            status=AmendmentStatus.DRAFT
+        )
+        db.add(amendment)
+        amendments.append(amendment)
+    return amendments
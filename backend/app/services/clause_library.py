@@ -0,0 +1,456 @@
+"""Clause library: the distinct ways each clause type is worded.
+
+An offline build (`python -m app.cli.clause_library`) embeds every clause
+of a type, clusters the embeddings with mini-batch k-means and stores the
+centroids, their sizes and the clauses closest to each centroid as
+exemplars. Embeddings are streamed to a memory-mapped scratch file and
+each k-means step reads one random batch of rows, so memory stays at a few
+batches whatever the number of clauses. At ingest, new clauses are
+assigned to the nearest centroid of their type, k distances per clause,
+which keeps the library current between rebuilds.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.coordination import LeaseHeld, lease
+from app.core.database import async_session_maker
+from app.models.clause import Clause, ClauseType, RiskLevel
+from app.models.clause_library import ClauseCluster
+
+# Rows per distance computation when assigning a whole clause type
+ASSIGN_CHUNK = 65536
+# Rows per bulk UPDATE of clause cluster ids
+UPDATE_CHUNK = 5000
+# Mini-batches without improvement of the smoothed batch inertia before stopping
+NO_IMPROVEMENT_BATCHES = 10
+# k-means++ seedings tried per clustering
+INIT_RUNS = 3
+# Centers that attracted no clause are reseeded this often (in batches)
+RESEED_EVERY = 10
+
+
+def embedding_key() -> str:
+    """The embedding space centroids are built in; centroids from another are ignored."""
+    if settings.clause_library_embeddings == "hashing":
+        return f"hashing:{settings.clause_library_embedding_dim}"
+    return f"model:{settings.llm_provider.lower()}"
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """Unit-length float32 embeddings of clause texts."""
+    if settings.clause_library_embeddings == "hashing":
+        from app.core.embeddings import HashingEmbeddings
+        return HashingEmbeddings().embed_array(texts)
+
+    from app.core.llm import get_embeddings
+    vectors = np.asarray(get_embeddings().embed_documents(list(texts)), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def nearest(vectors: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Index of and squared distance to each vector's nearest centroid."""
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2; |x|^2 does not change the argmin
+    partial = (centroids * centroids).sum(axis=1) - 2 * vectors @ centroids.T
+    labels = partial.argmin(axis=1)
+    distances = partial[np.arange(len(vectors)), labels] + (vectors * vectors).sum(axis=1)
+    return labels, np.maximum(distances, 0)
+
+
+def kmeans_plusplus(sample: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Greedy k-means++ seeding.
+
+    Each next center is drawn in proportion to squared distance from the
+    centers so far; of 2 + log(k) such draws, the one that lowers the
+    sample's inertia most is kept.
+    """
+    trials = 2 + int(np.log(k))
+    centers = [sample[rng.integers(len(sample))]]
+    closest = ((sample - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        if total <= 0:
+            candidates = rng.integers(len(sample), size=1)
+        else:
+            candidates = np.searchsorted(np.cumsum(closest), rng.random(trials) * total)
+            candidates = np.minimum(candidates, len(sample) - 1)
+        options = [np.minimum(closest, ((sample - sample[i]) ** 2).sum(axis=1)) for i in candidates]
+        best = int(np.argmin([option.sum() for option in options]))
+        centers.append(sample[candidates[best]])
+        closest = options[best]
+    return np.array(centers, dtype=np.float32)
+
+
+def minibatch_kmeans(
+    data: np.ndarray,
+    k: int,
+    batch_size: int,
+    max_iterations: int,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, int]:
+    """Cluster the rows of `data` (an array or memmap) into k centroids.
+
+    Sculley's mini-batch k-means: each step assigns one random batch and
+    moves every center towards the mean of its batch members with a
+    per-center learning rate of 1 / (points seen), so a center converges
+    to the mean of everything it has attracted. Stops once the smoothed
+    batch inertia stops improving. Returns the centroids and the number
+    of batches used.
+    """
+    n = len(data)
+    k = min(k, n)
+    # Best of a few seedings, judged on a separate sample
+    sample_size = min(n, max(3 * batch_size, 10 * k))
+    holdout = np.asarray(data[np.sort(rng.integers(0, n, size=sample_size))], dtype=np.float32)
+    centroids, best_inertia = None, np.inf
+    for _ in range(INIT_RUNS):
+        seed_rows = np.unique(rng.integers(0, n, size=sample_size))
+        candidate = kmeans_plusplus(np.asarray(data[seed_rows], dtype=np.float32), k, rng)
+        inertia = nearest(holdout, candidate)[1].sum()
+        if inertia < best_inertia:
+            centroids, best_inertia = candidate, inertia
+    counts = np.zeros(k)
+
+    smoothed, best, stale = None, np.inf, 0
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        rows = np.sort(rng.integers(0, n, size=min(batch_size, n)))
+        batch = np.asarray(data[rows], dtype=np.float32)
+        labels, distances = nearest(batch, centroids)
+
+        members = np.bincount(labels, minlength=k)
+        one_hot = np.zeros((len(batch), k), dtype=np.float32)
+        one_hot[np.arange(len(batch)), labels] = 1
+        sums = one_hot.T @ batch
+        hit = members > 0
+        seen = counts[hit] + members[hit]
+        centroids[hit] = (centroids[hit] * (counts[hit] / seen)[:, None] + sums[hit] / seen[:, None]).astype(np.float32)
+        counts[hit] = seen
+
+        if iteration % RESEED_EVERY == 0 and not counts.all():
+            # Move idle centers onto the worst-fitted points of the batch
+            dead = np.flatnonzero(counts == 0)
+            worst = np.argsort(distances)[::-1][:len(dead)]
+            centroids[dead[:len(worst)]] = batch[worst]
+
+        inertia = float(distances.mean())
+        smoothed = inertia if smoothed is None else 0.9 * smoothed + 0.1 * inertia
+        if smoothed < best - 1e-9:
+            best, stale = smoothed, 0
+        else:
+            stale += 1
+            if stale >= NO_IMPROVEMENT_BATCHES:
+                break
+    return centroids, iteration
+
+
+def assign_rows(data: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest centroid and distance for every row, in chunks."""
+    labels = np.empty(len(data), dtype=np.int64)
+    distances = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), ASSIGN_CHUNK):
+        end = min(start + ASSIGN_CHUNK, len(data))
+        chunk_labels, chunk_distances = nearest(np.asarray(data[start:end], dtype=np.float32), centroids)
+        labels[start:end] = chunk_labels
+        distances[start:end] = np.sqrt(chunk_distances)
+    return labels, distances
+
+
+def exemplar_rows(labels: np.ndarray, distances: np.ndarray, k: int, per_cluster: int) -> List[List[int]]:
+    """Rows closest to their centroid, `per_cluster` per cluster, closest first."""
+    order = np.lexsort((distances, labels))
+    sizes = np.bincount(labels, minlength=k)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return [order[start:start + min(size, per_cluster)].tolist() for start, size in zip(starts, sizes)]
+
+
+async def _assign_unclustered(db: AsyncSession, clause_type: ClauseType, cluster_ids: List[str], centroids: np.ndarray) -> int:
+    """Assign clauses of a type that are not in any of `cluster_ids`, e.g. ones ingested mid-build."""
+    assigned = 0
+    while True:
+        rows = (await db.execute(
+            select(Clause.id, Clause.text)
+            .where(Clause.clause_type == clause_type)
+            .where(or_(Clause.cluster_id.is_(None), Clause.cluster_id.notin_(cluster_ids)))
+            .limit(settings.clause_library_embed_batch)
+        )).all()
+        if not rows:
+            return assigned
+        vectors = await asyncio.to_thread(embed_texts, [row.text for row in rows])
+        labels, _ = nearest(vectors, centroids)
+        await _set_clusters(db, [row.id for row in rows], [cluster_ids[i] for i in labels])
+        assigned += len(rows)
+
+
+async def _set_clusters(db: AsyncSession, clause_ids: List[str], cluster_ids: List[str]):
+    statement = (
+        update(Clause.__table__)
+        .where(Clause.__table__.c.id == bindparam("b_id"))
+        .values(cluster_id=bindparam("b_cluster"))
+    )
+    for start in range(0, len(clause_ids), UPDATE_CHUNK):
+        await db.execute(statement, [
+            {"b_id": clause_id, "b_cluster": cluster_id}
+            for clause_id, cluster_id in zip(clause_ids[start:start + UPDATE_CHUNK], cluster_ids[start:start + UPDATE_CHUNK])
+        ])
+
+
+async def build_clause_type(
+    db: AsyncSession,
+    clause_type: ClauseType,
+    workdir: str,
+    run_id: Optional[str] = None,
+    clusters: Optional[int] = None,
+    seed: Optional[int] = None
+) -> dict:
+    """Rebuild the clusters of one clause type and reassign its clauses."""
+    start = time.perf_counter()
+    run_id = run_id or str(uuid.uuid4())
+    rng = np.random.default_rng(seed)
+    total = (await db.execute(select(func.count(Clause.id)).where(Clause.clause_type == clause_type))).scalar() or 0
+
+    # Embed in id order (keyset pages) into a scratch file, `total` rows at most
+    clause_ids: List[str] = []
+    vectors: Optional[np.ndarray] = None
+    last_id = ""
+    while len(clause_ids) < total:
+        rows = (await db.execute(
+            select(Clause.id, Clause.text)
+            .where(Clause.clause_type == clause_type, Clause.id > last_id)
+            .order_by(Clause.id)
+            .limit(settings.clause_library_embed_batch)
+        )).all()
+        if not rows:
+            break
+        rows = rows[:total - len(clause_ids)]
+        embedded = await asyncio.to_thread(embed_texts, [row.text for row in rows])
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(
+                os.path.join(workdir, f"{clause_type.value}.npy"), mode="w+",
+                dtype=np.float32, shape=(total, embedded.shape[1])
+            )
+        vectors[len(clause_ids):len(clause_ids) + len(rows)] = embedded
+        clause_ids.extend(row.id for row in rows)
+        last_id = rows[-1].id
+
+    n = len(clause_ids)
+    result = {"clause_type": clause_type.value, "clauses": n, "clusters": 0}
+    if n == 0:
+        await db.execute(delete(ClauseCluster).where(ClauseCluster.clause_type == clause_type))
+        await db.commit()
+        return result
+
+    data = vectors[:n]
+    k = min(clusters or settings.clause_library_clusters, max(1, n // settings.clause_library_min_cluster_size))
+    centroids, iterations = await asyncio.to_thread(
+        minibatch_kmeans, data, k, settings.clause_library_batch_size, settings.clause_library_max_iterations, rng
+    )
+    labels, distances = await asyncio.to_thread(assign_rows, data, centroids)
+    sizes = np.bincount(labels, minlength=len(centroids))
+    # Duplicate centers (many identical clauses) end up with no members
+    if not sizes.all():
+        keep = sizes > 0
+        labels = (np.cumsum(keep) - 1)[labels]
+        centroids, sizes = centroids[keep], sizes[keep]
+    distance_sums = np.bincount(labels, weights=distances, minlength=len(centroids))
+    exemplars = exemplar_rows(labels, distances, len(centroids), settings.clause_library_exemplars)
+
+    key = embedding_key()
+    rows = [
+        ClauseCluster(
+            id=str(uuid.uuid4()),
+            run_id=run_id,
+            clause_type=clause_type,
+            cluster_index=i,
+            centroid=centroids[i].tobytes(),
+            embedding=key,
+            size=int(sizes[i]),
+            mean_distance=float(distance_sums[i] / sizes[i]) if sizes[i] else None,
+            exemplar_clause_ids=[clause_ids[row] for row in exemplars[i]],
+        )
+        for i in range(len(centroids))
+    ]
+    db.add_all(rows)
+    await db.flush()
+    cluster_ids = [row.id for row in rows]
+    await _set_clusters(db, clause_ids, [cluster_ids[label] for label in labels])
+    await db.execute(
+        delete(ClauseCluster).where(ClauseCluster.clause_type == clause_type, ClauseCluster.run_id != run_id)
+    )
+    await db.commit()
+    late = await _assign_unclustered(db, clause_type, cluster_ids, centroids)
+    await db.commit()
+
+    result.update(
+        clusters=len(centroids),
+        iterations=iterations,
+        mean_distance=round(float(distances.mean()), 4),
+        late_assignments=late,
+        seconds=round(time.perf_counter() - start, 3),
+    )
+    return result
+
+
+async def build_clause_library(
+    clause_types: Optional[List[ClauseType]] = None,
+    clusters: Optional[int] = None,
+    seed: Optional[int] = None,
+    on_type: Optional[Callable[[dict], None]] = None
+) -> List[dict]:
+    """Rebuild the library for the given clause types (all by default), one type at a time.
+
+    A type another process is already building is skipped.
+    """
+    run_id = str(uuid.uuid4())
+    results = []
+    with tempfile.TemporaryDirectory(prefix="clause-library-") as workdir:
+        for clause_type in clause_types or list(ClauseType):
+            try:
+                async with lease(f"clause_library:{clause_type.value}", "build"):
+                    async with async_session_maker() as db:
+                        result = await build_clause_type(db, clause_type, workdir, run_id, clusters, seed)
+            except LeaseHeld:
+                result = {"clause_type": clause_type.value, "clauses": 0, "clusters": 0, "skipped": True}
+            # The type's scratch embeddings are not needed past its build
+            scratch = os.path.join(workdir, f"{clause_type.value}.npy")
+            if os.path.exists(scratch):
+                os.remove(scratch)
+            results.append(result)
+            if on_type:
+                on_type(result)
+    return results
+
+
+class ClauseLibrary:
+    """Centroids of the built library, for assigning new clauses at ingest."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.version: Optional[tuple] = None
+        self.centroids: Dict[ClauseType, Tuple[np.ndarray, List[str]]] = {}
+
+    async def refresh(self, db: AsyncSession):
+        """Reload the centroids if a build changed them since the last load."""
+        async with self._lock:
+            version = tuple((await db.execute(
+                select(func.max(ClauseCluster.created_at), func.count(ClauseCluster.id))
+            )).one())
+            if version == self.version:
+                return
+            rows = (await db.execute(
+                select(ClauseCluster.id, ClauseCluster.clause_type, ClauseCluster.centroid)
+                .where(ClauseCluster.embedding == embedding_key())
+                .order_by(ClauseCluster.clause_type, ClauseCluster.cluster_index)
+            )).all()
+            grouped: Dict[ClauseType, List[tuple]] = {}
+            for row in rows:
+                grouped.setdefault(row.clause_type, []).append(row)
+            self.centroids = {
+                clause_type: (
+                    np.stack([np.frombuffer(row.centroid, dtype=np.float32) for row in members]),
+                    [row.id for row in members],
+                )
+                for clause_type, members in grouped.items()
+            }
+            self.version = version
+
+    async def assign(self, db: AsyncSession, clauses: List[Clause]) -> int:
+        """Set `cluster_id` on clauses whose type has clusters; returns how many were assigned."""
+        await self.refresh(db)
+        candidates = [clause for clause in clauses if clause.clause_type in self.centroids]
+        if not candidates:
+            return 0
+        vectors = await asyncio.to_thread(embed_texts, [clause.text for clause in candidates])
+        by_type: Dict[ClauseType, List[int]] = {}
+        for i, clause in enumerate(candidates):
+            by_type.setdefault(clause.clause_type, []).append(i)
+        for clause_type, indexes in by_type.items():
+            centroids, cluster_ids = self.centroids[clause_type]
+            if centroids.shape[1] != vectors.shape[1]:
+                continue
+            labels, _ = nearest(vectors[indexes], centroids)
+            for i, label in zip(indexes, labels):
+                candidates[i].cluster_id = cluster_ids[label]
+        return sum(1 for clause in candidates if clause.cluster_id)
+
+
+CLAUSE_LIBRARY = ClauseLibrary()
+
+
+async def library_report(db: AsyncSession, clause_type: Optional[ClauseType] = None) -> dict:
+    """Clusters with live sizes, exemplars and risk statistics of their clauses."""
+    query = select(ClauseCluster).order_by(ClauseCluster.clause_type, ClauseCluster.cluster_index)
+    if clause_type:
+        query = query.where(ClauseCluster.clause_type == clause_type)
+    clusters = (await db.execute(query)).scalars().all()
+    cluster_ids = [cluster.id for cluster in clusters]
+
+    stats: Dict[str, tuple] = {}
+    levels: Dict[str, Dict[str, int]] = {}
+    exemplars: Dict[str, Clause] = {}
+    for start in range(0, len(cluster_ids), 500):
+        chunk = cluster_ids[start:start + 500]
+        for row in (await db.execute(
+            select(
+                Clause.cluster_id, func.count(Clause.id), func.count(Clause.risk_score),
+                func.avg(Clause.risk_score), func.min(Clause.risk_score), func.max(Clause.risk_score)
+            ).where(Clause.cluster_id.in_(chunk)).group_by(Clause.cluster_id)
+        )).all():
+            stats[row[0]] = tuple(row[1:])
+        for cluster_id, level, count in (await db.execute(
+            select(Clause.cluster_id, Clause.risk_level, func.count(Clause.id))
+            .where(Clause.cluster_id.in_(chunk), Clause.risk_level.isnot(None))
+            .group_by(Clause.cluster_id, Clause.risk_level)
+        )).all():
+            levels.setdefault(cluster_id, {})[level.value] = count
+    exemplar_ids = [clause_id for cluster in clusters for clause_id in cluster.exemplar_clause_ids or []]
+    for start in range(0, len(exemplar_ids), 500):
+        result = await db.execute(select(Clause).where(Clause.id.in_(exemplar_ids[start:start + 500])))
+        exemplars.update((clause.id, clause) for clause in result.scalars().all())
+
+    entries = []
+    for cluster in clusters:
+        count, assessed, mean, low, high = stats.get(cluster.id, (0, 0, None, None, None))
+        by_level = {level.value: levels.get(cluster.id, {}).get(level.value, 0) for level in RiskLevel}
+        leveled = sum(by_level.values())
+        members = [exemplars[i] for i in cluster.exemplar_clause_ids or [] if i in exemplars]
+        entries.append({
+            "id": cluster.id,
+            "clause_type": cluster.clause_type.value,
+            "cluster_index": cluster.cluster_index,
+            "label": next((clause.title for clause in members if clause.title), None),
+            "clauses": count,
+            "size_at_build": cluster.size,
+            "mean_distance": None if cluster.mean_distance is None else round(cluster.mean_distance, 4),
+            "risk": {
+                "assessed": assessed,
+                "mean_score": None if mean is None else round(float(mean), 4),
+                "min_score": low,
+                "max_score": high,
+                "by_level": by_level,
+                "high_or_critical_share": round((by_level["high"] + by_level["critical"]) / leveled, 4) if leveled else None,
+            },
+            "exemplars": [
+                {
+                    "clause_id": clause.id,
+                    "contract_id": clause.contract_id,
+                    "title": clause.title,
+                    "section_number": clause.section_number,
+                    "text": clause.text,
+                }
+                for clause in members
+            ],
+            "built_at": cluster.created_at,
+        })
+    entries.sort(key=lambda entry: (entry["clause_type"], -entry["clauses"]))
+    return {"total": len(entries), "clusters": entries}
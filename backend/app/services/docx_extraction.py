@@ -0,0 +1,305 @@
+"""Streaming DOCX text extraction.
+
+python-docx loads a whole document into an object model and its
+`paragraphs` skip tables and automatic numbering. Here `word/document.xml`
+is read with an incremental parser: each paragraph is turned into a line
+as soon as it ends and then freed, so memory stays proportional to one
+paragraph (or one table row). Table rows come out as Markdown rows in
+document order, like layout PDF extraction, and list and heading numbers
+are reconstructed from `numbering.xml` and paragraph styles, so
+"1.2 Termination" keeps its section number. Page headers, footers and
+footnotes live in other parts and are left out.
+"""
+
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+VAL = f"{W}val"
+# Run content that becomes text; deleted text and field codes are other tags
+TEXT_TAGS = (f"{W}t", f"{W}tab", f"{W}br", f"{W}cr", f"{W}noBreakHyphen")
+LEVEL_REFERENCE_RE = re.compile(r"%([1-9])")
+ROMAN = [(1000, "m"), (900, "cm"), (500, "d"), (400, "cd"), (100, "c"), (90, "xc"),
+         (50, "l"), (40, "xl"), (10, "x"), (9, "ix"), (5, "v"), (4, "iv"), (1, "i")]
+
+
+@dataclass
+class Level:
+    """One level of a numbering definition."""
+    start: int = 1
+    fmt: str = "decimal"
+    text: str = "%1."
+    legal: bool = False
+
+
+def _roman(value: int) -> str:
+    result = []
+    for number, letters in ROMAN:
+        count, value = divmod(value, number)
+        result.append(letters * count)
+    return "".join(result)
+
+
+def _letters(value: int) -> str:
+    # Word repeats the letter past z: a..z, aa..zz
+    return chr(ord("a") + (value - 1) % 26) * ((value - 1) // 26 + 1)
+
+
+def format_number(value: int, fmt: str) -> str:
+    """Render a list counter in a WordprocessingML number format."""
+    if fmt == "lowerLetter":
+        return _letters(value)
+    if fmt == "upperLetter":
+        return _letters(value).upper()
+    if fmt == "lowerRoman":
+        return _roman(value)
+    if fmt == "upperRoman":
+        return _roman(value).upper()
+    if fmt == "decimalZero":
+        return f"{value:02d}"
+    if fmt == "none":
+        return ""
+    return str(value)
+
+
+def _val(element, path: str) -> Optional[str]:
+    found = element.find(path)
+    return None if found is None else found.get(VAL)
+
+
+class Numbering:
+    """List numbering state for one document.
+
+    Counters are kept per abstract definition, so list instances sharing
+    one continue each other's numbering unless they override the start.
+    """
+
+    def __init__(self, numbering_xml: Optional[bytes], styles_xml: Optional[bytes]):
+        self.abstract: Dict[str, Dict[int, Level]] = {}
+        # numId -> (abstractNumId, {ilvl: start override})
+        self.instances: Dict[str, Tuple[str, Dict[int, int]]] = {}
+        # styleId -> (numId, ilvl) for styles that number their paragraphs
+        self.styles: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+        self.counters: Dict[str, List[Optional[int]]] = {}
+        self.started: set = set()
+        if numbering_xml:
+            self._load_numbering(etree.fromstring(numbering_xml))
+        if styles_xml:
+            self._load_styles(etree.fromstring(styles_xml))
+
+    def _load_numbering(self, root):
+        for abstract in root.iterfind(f"{W}abstractNum"):
+            levels = {}
+            for lvl in abstract.iterfind(f"{W}lvl"):
+                levels[int(lvl.get(f"{W}ilvl", "0"))] = Level(
+                    start=int(_val(lvl, f"{W}start") or 1),
+                    fmt=_val(lvl, f"{W}numFmt") or "decimal",
+                    text=_val(lvl, f"{W}lvlText") or "",
+                    legal=lvl.find(f"{W}isLgl") is not None,
+                )
+            self.abstract[abstract.get(f"{W}abstractNumId")] = levels
+        for num in root.iterfind(f"{W}num"):
+            overrides = {}
+            for override in num.iterfind(f"{W}lvlOverride"):
+                start = _val(override, f"{W}startOverride")
+                if start is not None:
+                    overrides[int(override.get(f"{W}ilvl", "0"))] = int(start)
+            self.instances[num.get(f"{W}numId")] = (_val(num, f"{W}abstractNumId"), overrides)
+
+    def _load_styles(self, root):
+        declared = {}
+        for style in root.iterfind(f"{W}style"):
+            if style.get(f"{W}type") != "paragraph":
+                continue
+            ilvl = _val(style, f"{W}pPr/{W}numPr/{W}ilvl")
+            declared[style.get(f"{W}styleId")] = (
+                _val(style, f"{W}basedOn"),
+                _val(style, f"{W}pPr/{W}numPr/{W}numId"),
+                None if ilvl is None else int(ilvl),
+            )
+        for style_id in declared:
+            num_id, ilvl, seen, current = None, None, set(), style_id
+            # Inherit numbering through basedOn chains
+            while current in declared and current not in seen and (num_id is None or ilvl is None):
+                seen.add(current)
+                based_on, own_num, own_ilvl = declared[current]
+                num_id = own_num if num_id is None else num_id
+                ilvl = own_ilvl if ilvl is None else ilvl
+                current = based_on
+            if num_id is not None:
+                self.styles[style_id] = (num_id, ilvl)
+
+    def label(self, paragraph_properties) -> str:
+        """Advance the paragraph's list counter and return its rendered label."""
+        num_id, ilvl = None, None
+        if paragraph_properties is not None:
+            style = _val(paragraph_properties, f"{W}pStyle")
+            if style in self.styles:
+                num_id, ilvl = self.styles[style]
+            numbered = paragraph_properties.find(f"{W}numPr")
+            if numbered is not None:
+                direct_num = _val(numbered, f"{W}numId")
+                direct_ilvl = _val(numbered, f"{W}ilvl")
+                num_id = direct_num if direct_num is not None else num_id
+                ilvl = int(direct_ilvl) if direct_ilvl is not None else ilvl
+        if num_id is None or num_id == "0" or num_id not in self.instances:
+            return ""
+        ilvl = ilvl or 0
+        abstract_id, overrides = self.instances[num_id]
+        levels = self.abstract.get(abstract_id, {})
+        if ilvl not in levels:
+            return ""
+
+        counters = self.counters.setdefault(abstract_id, [None] * 9)
+        if num_id not in self.started:
+            self.started.add(num_id)
+            for level, start in overrides.items():
+                if level < len(counters):
+                    counters[level] = start - 1
+        current = counters[ilvl]
+        counters[ilvl] = levels[ilvl].start if current is None else current + 1
+        for deeper in range(ilvl + 1, len(counters)):
+            counters[deeper] = None
+
+        level = levels[ilvl]
+        if level.fmt == "bullet":
+            return "•"
+
+        def reference(match) -> str:
+            index = int(match.group(1)) - 1
+            referenced = levels.get(index, level)
+            value = counters[index] if counters[index] is not None else referenced.start
+            # Legal-style numbering renders every referenced level in decimal
+            return format_number(value, "decimal" if level.legal else referenced.fmt)
+
+        return LEVEL_REFERENCE_RE.sub(reference, level.text).strip()
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for element in paragraph.iter(*TEXT_TAGS):
+        tag = element.tag
+        if tag == f"{W}t":
+            parts.append(element.text or "")
+        elif tag == f"{W}tab":
+            parts.append("\t")
+        elif tag == f"{W}noBreakHyphen":
+            parts.append("-")
+        elif element.get(f"{W}type") != "page":
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _release(element):
+    """Free a processed element and the already-processed siblings before it."""
+    element.clear()
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def _markdown_row(cells: List[str]) -> str:
+    return "| " + " | ".join(" ".join(cell.split()).replace("|", "\\|") for cell in cells) + " |"
+
+
+class _Table:
+    def __init__(self):
+        self.rows = 0
+        self.row: List[str] = []
+        self.cell: List[str] = []
+        # Text of rows from nested tables, folded into the enclosing cell
+        self.nested: List[str] = []
+
+
+def iter_docx_lines(file_path: str) -> Iterator[str]:
+    """Yield a DOCX document's text line by line, in document order.
+
+    Paragraphs become lines prefixed with their list label, tables become
+    Markdown rows (the first as header) set off by blank lines, and
+    single-column tables, usually layout boxes, become plain lines.
+    """
+    try:
+        archive = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a DOCX file: {e}") from e
+
+    with archive:
+        names = set(archive.namelist())
+        if "word/document.xml" not in names:
+            raise ValueError("Not a DOCX file: word/document.xml is missing")
+        numbering = Numbering(
+            archive.read("word/numbering.xml") if "word/numbering.xml" in names else None,
+            archive.read("word/styles.xml") if "word/styles.xml" in names else None,
+        )
+
+        tables: List[_Table] = []
+        # Depth inside mc:Fallback, which repeats text-box content for old readers
+        fallback = 0
+        with archive.open("word/document.xml") as stream:
+            events = etree.iterparse(
+                stream,
+                events=("start", "end"),
+                tag=(f"{W}p", f"{W}tbl", f"{W}tr", f"{W}tc", MC_FALLBACK),
+                huge_tree=True,
+            )
+            for event, element in events:
+                tag = element.tag
+                if event == "start":
+                    if tag == MC_FALLBACK:
+                        fallback += 1
+                    elif fallback:
+                        pass
+                    elif tag == f"{W}tbl":
+                        if not tables:
+                            yield ""
+                        tables.append(_Table())
+                    elif tag == f"{W}tr":
+                        tables[-1].row = []
+                    elif tag == f"{W}tc":
+                        tables[-1].cell = []
+                    continue
+
+                if tag == MC_FALLBACK:
+                    fallback -= 1
+                elif fallback:
+                    pass
+                elif tag == f"{W}p":
+                    text = _paragraph_text(element)
+                    label = numbering.label(element.find(f"{W}pPr"))
+                    line = f"{label} {text}" if label and text.strip() else text
+                    if tables:
+                        tables[-1].cell.append(line)
+                    else:
+                        yield line
+                elif tag == f"{W}tc":
+                    table = tables[-1]
+                    table.row.append(" ".join(table.cell + table.nested))
+                    table.nested = []
+                elif tag == f"{W}tr":
+                    table = tables[-1]
+                    cells = table.row
+                    if any(cell.strip() for cell in cells):
+                        if len(tables) > 1:
+                            tables[-2].nested.append("; ".join(cell for cell in cells if cell.strip()))
+                        elif len(cells) < 2:
+                            yield " ".join(cells[0].split())
+                        else:
+                            yield _markdown_row(cells)
+                            if table.rows == 0:
+                                yield "|" + "---|" * len(cells)
+                            table.rows += 1
+                elif tag == f"{W}tbl":
+                    tables.pop()
+                    if not tables:
+                        yield ""
+                _release(element)
+
+
+def extract_docx_text(file_path: str) -> str:
+    """Extract a DOCX document's text with tables and list numbering."""
+    return "".join(line + "\n" for line in iter_docx_lines(file_path))
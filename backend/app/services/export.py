@@ -0,0 +1,118 @@
+"""Streaming export of clauses and their risk data."""
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.models.clause import Clause, ClauseType, RiskLevel
+from app.models.contract import Contract
+
+# Exportable columns; contract_* columns join the contract
+EXPORT_COLUMNS: Dict[str, object] = {
+    "id": Clause.id,
+    "contract_id": Clause.contract_id,
+    "clause_type": Clause.clause_type,
+    "title": Clause.title,
+    "section_number": Clause.section_number,
+    "page_number": Clause.page_number,
+    "text": Clause.text,
+    "risk_level": Clause.risk_level,
+    "risk_score": Clause.risk_score,
+    "risk_factors": Clause.risk_factors,
+    "key_terms": Clause.key_terms,
+    "analysis": Clause.analysis,
+    "created_at": Clause.created_at,
+    "contract_title": Contract.title,
+    "contract_filename": Contract.filename,
+    "contract_type": Contract.contract_type,
+}
+DEFAULT_EXPORT_COLUMNS = [
+    "id", "contract_id", "clause_type", "title", "section_number",
+    "risk_level", "risk_score", "risk_factors", "created_at",
+]
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _json_default(value):
+    # String enums already encode as their values
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+_encoder = json.JSONEncoder(default=_json_default)
+
+
+def _csv_value(value):
+    if isinstance(value, Enum):
+        value = value.value
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, list):
+        return "; ".join(str(v) for v in value)
+    return "" if value is None else value
+
+
+def build_export_query(
+    columns: Sequence[str],
+    clause_types: Optional[List[ClauseType]] = None,
+    risk_levels: Optional[List[RiskLevel]] = None,
+    min_risk_score: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    contract_id: Optional[str] = None
+):
+    """Select only the requested columns, filtered; raises ValueError on unknown columns."""
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+
+    query = select(*(EXPORT_COLUMNS[c] for c in columns)).select_from(Clause)
+    if any(c.startswith("contract_") and c != "contract_id" for c in columns):
+        query = query.join(Contract, Contract.id == Clause.contract_id)
+    if clause_types:
+        query = query.where(Clause.clause_type.in_(clause_types))
+    if risk_levels:
+        query = query.where(Clause.risk_level.in_(risk_levels))
+    if min_risk_score is not None:
+        query = query.where(Clause.risk_score >= min_risk_score)
+    if created_after:
+        query = query.where(Clause.created_at >= created_after)
+    if created_before:
+        query = query.where(Clause.created_at < created_before)
+    if contract_id:
+        query = query.where(Clause.contract_id == contract_id)
+    return query
+
+
+async def stream_export(query, columns: Sequence[str], fmt: str) -> AsyncIterator[str]:
+    """Yield the export one batch at a time.
+
+    Rows come from a server-side cursor in batches of `export_batch_size`,
+    and each batch is encoded into a single chunk, so memory stays flat
+    regardless of the number of rows.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    # Own session: the request's is closed once the response starts
+    async with async_session_maker() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.export_batch_size))
+        async for batch in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([_csv_value(v) for v in row] for row in batch)
+                yield buffer.getvalue()
+            else:
+                yield "".join(_encoder.encode(dict(zip(columns, row))) + "\n" for row in batch)
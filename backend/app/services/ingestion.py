@@ -0,0 +1,470 @@
+"""Contract ingestion: single documents, bulk batches and shared pipeline steps."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import aiofiles
+from fastapi import UploadFile
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.coordination import get_coordinator, lease
+from app.core.database import async_session_maker
+from app.core.metrics import CACHE_HITS, CLAUSE_CLUSTER_ASSIGNMENTS, JOBS_IN_FLIGHT, stage
+from app.core.text_store import ContractText, DocumentText, spill_path
+from app.core.tracing import set_attributes, span
+from app.models.clause import Clause, ClauseRiskAssessment, ClauseType
+from app.models.contract import Contract, ContractAnalysis, ContractStatus
+from app.services.metadata import DATE_FIELDS, confident_fields, parse_date
+
+if TYPE_CHECKING:
+    # Agents pull in the LangChain stack; they are imported at first use
+    from app.agents.clause_extractor import ExtractedClause
+
+ALLOWED_EXTENSIONS = [".pdf", ".docx", ".doc", ".txt"]
+ARCHIVE_EXTENSIONS = [".zip"]
+COPY_CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest_file(
+    db: AsyncSession,
+    file_id: str,
+    file_path: str,
+    filename: str,
+    title: Optional[str] = None,
+    extraction_limit: Optional[asyncio.Semaphore] = None,
+    llm_limit: Optional[asyncio.Semaphore] = None,
+    on_stage: Optional[Callable[[str], None]] = None
+) -> Contract:
+    """Run a saved document through the analysis pipeline, as an upload is.
+
+    The optional semaphores bound how many of the pipeline's text
+    extractions and LLM calls run at once across a bulk job, and the job's
+    memory budget how much of one document's text its LLM calls hold. On
+    failure the contract is marked as errored and the exception re-raised.
+    """
+    from app.workflows.pipeline import PipelineLimits, pipeline_limits, run_pipeline
+
+    contract = await create_contract(db, file_id, filename, title)
+    limits = PipelineLimits(extraction=extraction_limit, llm=llm_limit, on_stage=on_stage)
+    try:
+        # Held so a resume cannot start on the contract while this run is going
+        async with lease(f"contract:{file_id}", "pipeline"):
+            with pipeline_limits(limits):
+                await run_pipeline(file_id, file_path)
+    except Exception:
+        contract.status = ContractStatus.ERROR
+        await db.commit()
+        raise
+
+    await db.refresh(contract)
+    return contract
+
+
+async def create_contract(db: AsyncSession, file_id: str, filename: str, title: Optional[str] = None) -> Contract:
+    """Create the record for an uploaded document, ready for parsing."""
+    set_attributes(contract_id=file_id)
+    contract = Contract(
+        id=file_id,
+        filename=filename,
+        title=title or filename,
+        status=ContractStatus.PARSING
+    )
+    db.add(contract)
+    with stage("db_commit"):
+        await db.commit()
+    return contract
+
+
+@contextmanager
+def open_contract_text(contract: Contract) -> Iterator[Optional[ContractText]]:
+    """A contract's extracted text: the stored string or a view of its spilled file.
+
+    Yields None when the contract has not been parsed yet.
+    """
+    if contract.raw_text is not None or not os.path.exists(spill_path(contract.id)):
+        yield contract.raw_text
+        return
+    with DocumentText(spill_path(contract.id)) as text:
+        yield text
+
+
+def apply_analysis(contract: Contract, analysis: ContractAnalysis):
+    """Update a contract with the document parser's analysis.
+
+    Fields the rule-based extractor settled with confidence are kept.
+    """
+    settled = confident_fields(contract)
+    contract.summary = analysis.summary
+    contract.contract_type = analysis.contract_type
+    contract.risk_score = analysis.risk_score
+    contract.overall_assessment = analysis.overall_assessment
+    if "parties" not in settled and analysis.parties:
+        contract.parties = analysis.parties
+
+    # LLM dates come in any format ("January 1, 2025"); unparseable ones are dropped
+    for name in DATE_FIELDS:
+        value = getattr(analysis, name)
+        if name not in settled and value:
+            parsed = parse_date(value)
+            if parsed:
+                setattr(contract, name, parsed)
+
+    contract.status = ContractStatus.PARSED
+
+
+def add_clauses(db: AsyncSession, contract_id: str, extracted_clauses: List["ExtractedClause"]) -> List[Clause]:
+    """Add extracted clauses to the session."""
+    set_attributes(clauses=len(extracted_clauses))
+    clauses = []
+    for clause_data in extracted_clauses:
+        clause = Clause(
+            contract_id=contract_id,
+            clause_type=ClauseType(clause_data.clause_type),
+            title=clause_data.title,
+            text=clause_data.text,
+            section_number=clause_data.section_number,
+            key_terms=clause_data.key_terms
+        )
+        db.add(clause)
+        clauses.append(clause)
+    return clauses
+
+
+async def assign_clusters(db: AsyncSession, clauses: List[Clause]):
+    """Match new clauses to the nearest clause library cluster of their type.
+
+    Best effort: without a built library, or if embedding fails, clauses
+    stay unassigned until the next library build picks them up.
+    """
+    if not settings.clause_library_assign_on_ingest or not clauses:
+        return
+    from app.services.clause_library import CLAUSE_LIBRARY
+
+    try:
+        with stage("clause_clustering"):
+            assigned = await CLAUSE_LIBRARY.assign(db, clauses)
+    except Exception:
+        CLAUSE_CLUSTER_ASSIGNMENTS.inc(len(clauses), outcome="error")
+        return
+    CLAUSE_CLUSTER_ASSIGNMENTS.inc(assigned, outcome="assigned")
+    CLAUSE_CLUSTER_ASSIGNMENTS.inc(len(clauses) - assigned, outcome="unassigned")
+
+
+async def assess_clauses(
+    clauses: List[Clause],
+    contract_context: str,
+    llm_limit: Optional[asyncio.Semaphore] = None
+) -> int:
+    """Assess risk for clauses concurrently, returning how many succeeded.
+
+    Provider limiters bound how many calls run at once; `llm_limit` can
+    bound it further. Failed assessments leave their clause unchanged.
+    """
+    from app.agents.risk_analyzer import RiskAnalyzerAgent
+    from app.core.prompt_cache import cache_scope
+
+    analyzer = RiskAnalyzerAgent()
+
+    async def assess(clause: Clause):
+        async with llm_limit or nullcontext():
+            with cache_scope(clause.contract_id):
+                return await analyzer.analyze_clause(
+                    clause_text=clause.text,
+                    clause_type=clause.clause_type.value,
+                    clause_title=clause.title or "",
+                    section_number=clause.section_number or "",
+                    contract_context=contract_context or ""
+                )
+
+    assessments = await asyncio.gather(*[assess(c) for c in clauses], return_exceptions=True)
+
+    assessed_count = 0
+    for clause, risk_assessment in zip(clauses, assessments):
+        if isinstance(risk_assessment, Exception):
+            continue
+        apply_risk(clause, risk_assessment)
+        assessed_count += 1
+    return assessed_count
+
+
+def apply_risk(clause: Clause, risk_assessment: ClauseRiskAssessment):
+    """Update a clause with its risk assessment."""
+    clause.risk_level = risk_assessment.risk_level
+    clause.risk_score = risk_assessment.risk_score
+    clause.risk_factors = risk_assessment.risk_factors
+    clause.analysis = risk_assessment.analysis
+
+
+def copy_hashed(source: BinaryIO, dest_path: str, max_bytes: int) -> Tuple[str, int]:
+    """Stream a file to disk in chunks, returning its SHA-256 and size."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as dest:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"File exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                dest.write(chunk)
+    except Exception:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return digest.hexdigest(), size
+
+
+@dataclass
+class FileProgress:
+    """Progress of one document in a bulk job."""
+    name: str
+    status: str = "queued"  # queued, extracting, analyzing, done, duplicate, skipped, error
+    contract_id: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    size: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestJob:
+    """A bulk ingestion batch and the progress of its documents."""
+    id: str
+    status: str = "receiving"  # receiving, running, completed
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+    files: List[FileProgress] = field(default_factory=list)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for f in self.files:
+            counts[f.status] = counts.get(f.status, 0) + 1
+        return counts
+
+    def to_dict(self, skip: int = 0, limit: Optional[int] = None) -> dict:
+        files = self.files[skip:skip + limit if limit is not None else None]
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "total": len(self.files),
+            "counts": self.counts(),
+            "files": [vars(f) for f in files],
+        }
+
+
+_jobs: Dict[str, IngestJob] = {}
+MAX_FINISHED_JOBS = 100
+
+
+def create_job() -> IngestJob:
+    """Register a new bulk job, forgetting the oldest finished ones."""
+    finished = [j for j in _jobs.values() if j.status == "completed"]
+    for old in sorted(finished, key=lambda j: j.created_at)[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[old.id]
+    job = IngestJob(id=str(uuid.uuid4()))
+    _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    return _jobs.get(job_id)
+
+
+async def publish_job(job: IngestJob):
+    """Share the job's progress with the other workers; best effort."""
+    coordinator = get_coordinator()
+    if not coordinator.shared:
+        return
+    try:
+        await coordinator.cache_set(f"bulk_job:{job.id}", json.dumps(jsonable_encoder(job.to_dict())).encode())
+    except Exception:
+        logger.debug("Could not publish progress of bulk job %s", job.id, exc_info=True)
+
+
+async def job_progress(job_id: str, skip: int = 0, limit: Optional[int] = None) -> Optional[dict]:
+    """Progress of a bulk job run by this worker, or as last published by the one running it."""
+    job = get_job(job_id)
+    if job is not None:
+        return job.to_dict(skip=skip, limit=limit)
+    coordinator = get_coordinator()
+    if not coordinator.shared:
+        return None
+    value = await coordinator.cache_get(f"bulk_job:{job_id}")
+    if value is None:
+        return None
+    CACHE_HITS.inc(cache="shared_bulk_job")
+    progress = json.loads(value)
+    progress["files"] = progress["files"][skip:skip + limit if limit is not None else None]
+    return progress
+
+
+async def spool_uploads(files: List[UploadFile]) -> Tuple[str, List[Tuple[str, str]]]:
+    """Stream uploaded files into a scratch directory.
+
+    Request bodies are gone once the response is sent, so a bulk job works
+    from its own copy. Returns the directory and (path, original name) pairs.
+    """
+    spool_dir = tempfile.mkdtemp(prefix="bulk-", dir=settings.upload_dir)
+    spooled = []
+    for i, upload in enumerate(files):
+        path = os.path.join(spool_dir, f"{i}{os.path.splitext(upload.filename)[1].lower()}")
+        with stage("file_write"):
+            async with aiofiles.open(path, "wb") as f:
+                while chunk := await upload.read(COPY_CHUNK_SIZE):
+                    await f.write(chunk)
+        spooled.append((path, upload.filename))
+    return spool_dir, spooled
+
+
+class BulkIngestor:
+    """Runs a bulk job through a bounded queue and a pool of workers.
+
+    The producer stages one document at a time from the uploads (streaming
+    archive entries straight to disk) and blocks while the queue is full,
+    so memory and staged disk usage stay flat however large the batch is.
+    Documents with identical content are ingested once per batch.
+    """
+
+    def __init__(self, job: IngestJob, spool_dir: str, sources: List[Tuple[str, str]]):
+        self.job = job
+        self.spool_dir = spool_dir
+        self.sources = sources
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ingest_queue_size)
+        self.extraction_limit = asyncio.Semaphore(settings.ingest_extraction_concurrency)
+        self.llm_limit = asyncio.Semaphore(settings.ingest_llm_concurrency)
+        self.seen: Dict[str, FileProgress] = {}
+
+    async def run(self):
+        self.job.status = "running"
+        workers = [asyncio.create_task(self._worker()) for _ in range(settings.ingest_workers)]
+        publisher = asyncio.create_task(self._publish())
+        try:
+            with JOBS_IN_FLIGHT.track(kind="bulk"), span("bulk_ingest", job_id=self.job.id):
+                try:
+                    await self._produce()
+                finally:
+                    for _ in workers:
+                        await self.queue.put(None)
+                    await asyncio.gather(*workers)
+        finally:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+            self.job.status = "completed"
+            self.job.completed_at = datetime.utcnow()
+            publisher.cancel()
+            await publish_job(self.job)
+
+    async def _publish(self):
+        while True:
+            await asyncio.sleep(settings.coordination_job_publish_interval)
+            await publish_job(self.job)
+
+    async def _produce(self):
+        for path, name in self.sources:
+            if os.path.splitext(name)[1].lower() in ARCHIVE_EXTENSIONS:
+                await self._produce_archive(path, name)
+            else:
+                with open(path, "rb") as source:
+                    await self._stage(source, name)
+
+    async def _produce_archive(self, path: str, name: str):
+        try:
+            archive = zipfile.ZipFile(path)
+        except zipfile.BadZipFile as e:
+            self.job.files.append(FileProgress(name=name, status="error", error=str(e)))
+            return
+
+        with archive:
+            entries = [info for info in archive.infolist() if not info.is_dir()]
+            for info in entries[:settings.ingest_max_archive_entries]:
+                entry_name = f"{name}/{info.filename}"
+                if os.path.splitext(info.filename)[1].lower() not in ALLOWED_EXTENSIONS:
+                    self.job.files.append(FileProgress(name=entry_name, status="skipped", error="Unsupported file type"))
+                    continue
+                with archive.open(info) as source:
+                    await self._stage(source, entry_name)
+            for info in entries[settings.ingest_max_archive_entries:]:
+                self.job.files.append(FileProgress(name=f"{name}/{info.filename}", status="skipped", error="Archive entry limit reached"))
+
+    async def _stage(self, source: BinaryIO, name: str):
+        progress = FileProgress(name=name)
+        self.job.files.append(progress)
+
+        file_id = str(uuid.uuid4())
+        ext = os.path.splitext(name)[1].lower()
+        file_path = os.path.join(settings.upload_dir, f"{file_id}{ext}")
+        try:
+            with stage("file_write"):
+                digest, progress.size = await asyncio.to_thread(
+                    copy_hashed, source, file_path, settings.max_file_size
+                )
+        except Exception as e:
+            progress.status, progress.error = "error", str(e)
+            return
+
+        original = self.seen.get(digest)
+        if original is not None:
+            os.remove(file_path)
+            progress.status, progress.duplicate_of = "duplicate", original.name
+            progress.contract_id = original.contract_id
+            return
+        self.seen[digest] = progress
+        progress.contract_id = file_id
+
+        # Blocks while the workers are behind
+        await self.queue.put((progress, file_id, file_path))
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            progress, file_id, file_path = item
+
+            def on_stage(name: str):
+                progress.status = name
+
+            try:
+                async with async_session_maker() as db:
+                    await ingest_file(
+                        db,
+                        file_id,
+                        file_path,
+                        os.path.basename(progress.name),
+                        extraction_limit=self.extraction_limit,
+                        llm_limit=self.llm_limit,
+                        on_stage=on_stage
+                    )
+                progress.status = "done"
+            except Exception as e:
+                progress.status, progress.error = "error", str(e)
+
+
+async def start_bulk_ingest(files: List[UploadFile]) -> IngestJob:
+    """Spool the uploads and start ingesting them in the background."""
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    job = create_job()
+    spool_dir, sources = await spool_uploads(files)
+    # Visible to every worker before the job id is returned
+    await publish_job(job)
+    job.task = asyncio.create_task(BulkIngestor(job, spool_dir, sources).run())
+    return job
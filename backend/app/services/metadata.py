@@ -0,0 +1,386 @@
+"""Rule-based extraction of contract metadata.
+
+Runs over the raw text before any LLM call. Compiled patterns pull
+normalized dates, party names from the preamble, monetary amounts and
+notice periods, each with a confidence. Fields at or above
+`metadata_confidence_threshold` are stored directly and left out of the
+document parser's request; the rest fall back to the LLM, whose dates are
+parsed with the same grammars.
+"""
+
+import calendar
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.text_store import ContractText, DocumentText
+from app.models.contract import Contract
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "twenty-four": 24, "thirty": 30, "thirty-six": 36, "forty-five": 45,
+    "sixty": 60, "ninety": 90, "one hundred twenty": 120, "one hundred eighty": 180,
+}
+# Preamble: where parties and the effective date are stated
+PREAMBLE_CHARS = 3000
+# How far before a date a cue such as "effective as of" may appear
+CUE_WINDOW = 120
+MAX_AMOUNTS = 50
+# Leading text scanned when a document was spilled to disk; dates, parties,
+# the term and headline amounts are stated well before this
+SPILLED_SCAN_CHARS = 1_000_000
+DATE_FIELDS = ("effective_date", "expiration_date")
+
+_MONTH = (
+    r"(?P<month>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+    r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_DAY = r"(?P<day>[0-3]?\d)(?:st|nd|rd|th)?"
+_YEAR = r"(?P<year>(?:19|20)\d{2})"
+_NUMBER = r"(?P<number>\d+|[a-z]+(?:[ -][a-z]+){0,3}?)(?:\s*\((?P<digits>\d+)\))?"
+
+# Years are rare in contract text, so dates are found by scanning for the
+# year and matching the grammars against the few characters before it
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+ISO_DATE_RE = re.compile(rf"{_YEAR}-(?P<mnum>[01]?\d)-{_DAY}\b")
+DATE_WINDOW = 40
+# (grammar ending at the year, confidence that a match is the date it looks like)
+DATE_GRAMMARS: List[Tuple["re.Pattern[str]", float]] = [
+    (re.compile(rf"\b{_MONTH}\s+{_DAY},?\s+{_YEAR}$", re.IGNORECASE), 1.0),
+    (re.compile(rf"\b{_DAY}(?:\s+day)?(?:\s+of)?\s+{_MONTH},?\s+{_YEAR}$", re.IGNORECASE), 1.0),
+    # Numeric dates are read month-first unless the first part exceeds 12
+    (re.compile(rf"\b(?P<first>[0-3]?\d)[/.-](?P<second>[0-3]?\d)[/.-]{_YEAR}$"), 0.8),
+]
+EFFECTIVE_CUES: List[Tuple["re.Pattern[str]", float]] = [
+    (re.compile(r"effective\s+date\W*$|effective\s+(?:as\s+of|on|from)\W*$", re.IGNORECASE), 0.95),
+    (re.compile(r"(?:entered\s+into|made|dated|executed)(?:\s+and\s+\w+)?\s+(?:as\s+of|on|this)\W*$|\bdated\W*$", re.IGNORECASE), 0.95),
+    (re.compile(r"commenc\w*\s+(?:on|as\s+of)\W*$|start\s+date\W*$", re.IGNORECASE), 0.9),
+    (re.compile(r"\bas\s+of\W*$", re.IGNORECASE), 0.8),
+]
+EXPIRATION_CUES: List[Tuple["re.Pattern[str]", float]] = [
+    (re.compile(r"(?:expiration|termination|end)\s+date\W*$", re.IGNORECASE), 0.95),
+    (re.compile(r"(?:expire|terminate|end)s?\s+(?:on|at\s+\S+\s+on)\W*$", re.IGNORECASE), 0.95),
+    (re.compile(r"(?:until|through|to\s+and\s+including)\W*$", re.IGNORECASE), 0.85),
+]
+TERM_RE = re.compile(
+    rf"\b(?:initial\s+)?(?:term|period)\s+of\s+{_NUMBER}\s*(?P<unit>years?|months?)\b",
+    re.IGNORECASE
+)
+
+_NAME_WORD = r"[A-Z][\w&'’-]*\.?"
+_SUFFIX = r"(?i:Inc|LLC|L\.L\.C|Ltd|Limited|Corp|Corporation|Co|Company|LLP|LP|GmbH|AG|PLC|S\.A|N\.V|B\.V)\.?"
+_NAME = rf"{_NAME_WORD}(?:[ \t]+(?:(?!AND\b|And\b){_NAME_WORD}|&|of|de|the))*(?:,?[ \t]+{_SUFFIX})?"
+# Names must be capitalized, so only the keywords ignore case
+PARTIES_RE = re.compile(
+    rf"\b(?i:between)[:\s]+(?:(?:1\.|\(1\))\s*)?(?P<first>{_NAME})(?P<between>.{{0,300}}?)"
+    rf"\b(?i:and)[:\s]+(?:(?:2\.|\(2\))\s*)?(?P<second>{_NAME})",
+    re.DOTALL
+)
+SUFFIX_RE = re.compile(rf"(?:^|\s){_SUFFIX}$")
+ABBREVIATION_RE = re.compile(r"(?:^|\s)(?i:Inc|Corp|Co|Ltd|L\.L\.C|S\.A|N\.V|B\.V|Jr|Sr)\.$")
+# Defined terms standing in for a name: a weak signal that the real name is elsewhere
+ROLE_WORDS = {
+    "company", "client", "customer", "vendor", "supplier", "contractor", "consultant",
+    "employer", "employee", "licensor", "licensee", "landlord", "tenant", "lessor",
+    "lessee", "buyer", "seller", "purchaser", "party", "parties", "provider", "recipient",
+    "discloser", "partner", "the",
+}
+
+_CURRENCIES = {"$": "USD", "us$": "USD", "usd": "USD", "dollars": "USD", "€": "EUR", "eur": "EUR",
+               "euros": "EUR", "£": "GBP", "gbp": "GBP", "pounds": "GBP"}
+_SCALES = {"thousand": 1e3, "k": 1e3, "million": 1e6, "m": 1e6, "mm": 1e6, "billion": 1e9, "bn": 1e9}
+_AMOUNT = r"(?P<num>\d{1,3}(?:,\d{3})+|\d+)(?:\.(?P<dec>\d{1,2}))?(?:\s*(?P<scale>(?i:thousand|million|billion|mm|bn|[km]))\b)?"
+# Currency codes are matched in capitals only, which keeps the scans cheap
+AMOUNT_RES = [
+    re.compile(rf"(?P<cur>US\$|\$|€|£|\b(?:USD|EUR|GBP)\b)\s?{_AMOUNT}"),
+    re.compile(rf"\b{_AMOUNT}\s*(?P<cur>USD|EUR|GBP|(?i:dollars|euros|pounds))\b"),
+]
+# Notice periods are read around each occurrence of "notice":
+# "thirty (30) days' prior written notice", "notice of at least 60 days"
+NOTICE_RE = re.compile(r"\b[Nn]otice\b")
+NOTICE_WINDOW = 60
+NOTICE_BEFORE_RE = re.compile(
+    rf"\b{_NUMBER}\s*(?:business\s+|calendar\s+)?(?P<unit>days?|months?)['’]?\s+"
+    r"(?:(?:prior|advance)\s+)?(?:written\s+)?$",
+    re.IGNORECASE
+)
+NOTICE_AFTER_RE = re.compile(
+    rf"\s+(?:period\s+)?of\s+(?:at\s+least\s+|not\s+less\s+than\s+|no\s+less\s+than\s+)?"
+    rf"{_NUMBER}\s*(?:business\s+|calendar\s+)?(?P<unit>days?|months?)\b",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class ExtractedField:
+    """One extracted value, its confidence (0-1) and the text it came from."""
+    value: Any
+    confidence: float
+    source: str
+
+
+@dataclass
+class ContractMetadata:
+    """Everything the rule-based extractor found in a contract."""
+    effective_date: Optional[ExtractedField] = None
+    expiration_date: Optional[ExtractedField] = None
+    parties: Optional[ExtractedField] = None
+    notice_period_days: Optional[ExtractedField] = None
+    amounts: List[ExtractedField] = field(default_factory=list)
+
+    def confident_fields(self, threshold: Optional[float] = None) -> Set[str]:
+        threshold = settings.metadata_confidence_threshold if threshold is None else threshold
+        return {
+            name for name in ("effective_date", "expiration_date", "parties", "notice_period_days")
+            if getattr(self, name) is not None and getattr(self, name).confidence >= threshold
+        }
+
+    def to_dict(self) -> dict:
+        """JSON-ready form, dates as ISO strings."""
+        def encode(item: ExtractedField) -> dict:
+            data = asdict(item)
+            if isinstance(item.value, datetime):
+                data["value"] = item.value.date().isoformat()
+            return data
+
+        result = {
+            name: encode(getattr(self, name))
+            for name in ("effective_date", "expiration_date", "parties", "notice_period_days")
+            if getattr(self, name) is not None
+        }
+        result["amounts"] = [encode(a) for a in self.amounts]
+        return result
+
+
+def _number(match: "re.Match[str]") -> Optional[int]:
+    if match.group("digits"):
+        return int(match.group("digits"))
+    text = match.group("number").lower()
+    if text.isdigit():
+        return int(text)
+    # The pattern may have taken leading words ("within thirty")
+    words = text.replace("-", " ").split()
+    for i in range(len(words)):
+        candidate = " ".join(words[i:])
+        for spelling in (candidate, candidate.replace(" ", "-")):
+            if spelling in NUMBER_WORDS:
+                return NUMBER_WORDS[spelling]
+    return None
+
+
+def _to_date(match: "re.Match[str]") -> Optional[Tuple[datetime, float]]:
+    groups = match.groupdict()
+    year = int(groups["year"])
+    penalty = 0.0
+    if groups.get("month"):
+        month = MONTHS[groups["month"][:3].lower()]
+    elif groups.get("mnum"):
+        month = int(groups["mnum"])
+    else:
+        first, second = int(groups["first"]), int(groups["second"])
+        month, day = (second, first) if first > 12 else (first, second)
+        # 03/04/2025 reads either way
+        if first <= 12 and second <= 12 and first != second:
+            penalty = 0.2
+        groups["day"] = str(day)
+    try:
+        return datetime(year, month, int(groups["day"])), penalty
+    except ValueError:
+        return None
+
+
+def find_dates(text: str) -> List[Tuple[int, int, datetime, float]]:
+    """All dates in the text as (start, end, date, confidence), in order."""
+    dates = []
+    last_end = -1
+    for year in YEAR_RE.finditer(text):
+        if year.start() < last_end:
+            continue
+        match, confidence = ISO_DATE_RE.match(text, year.start()), 1.0
+        offset = 0
+        if match is None:
+            offset = max(0, year.start() - DATE_WINDOW, last_end)
+            window = text[offset:year.end()]
+            # The earliest start is the longest match
+            found = [(m, c) for m, c in ((g.search(window), c) for g, c in DATE_GRAMMARS) if m]
+            if not found:
+                continue
+            match, confidence = min(found, key=lambda f: f[0].start())
+        parsed = _to_date(match)
+        if parsed:
+            dates.append((offset + match.start(), offset + match.end(), parsed[0], confidence - parsed[1]))
+            last_end = offset + match.end()
+    return dates
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    """Parse one date in any supported form ("2025-01-01", "January 1, 2025", "1st March 2025")."""
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    dates = find_dates(value)
+    return dates[0][2] if dates else None
+
+
+def _add_months(date: datetime, months: int) -> datetime:
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    return date.replace(year=year, month=month, day=min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def _cue_confidence(text: str, start: int, cues: List[Tuple["re.Pattern[str]", float]]) -> float:
+    window = text[max(0, start - CUE_WINDOW):start]
+    # Cues only count within the date's own sentence
+    window = re.split(r"[.;]\s", window)[-1]
+    return max((weight for cue, weight in cues if cue.search(window)), default=0.0)
+
+
+def _extract_dates(text: str, metadata: ContractMetadata):
+    effective, expiration = None, None
+    for start, end, date, confidence in find_dates(text):
+        source = text[max(0, start - 40):end].strip()
+        cue = _cue_confidence(text, start, EFFECTIVE_CUES)
+        if cue and (effective is None or cue * confidence > effective.confidence):
+            effective = ExtractedField(date, round(cue * confidence, 2), source)
+        cue = _cue_confidence(text, start, EXPIRATION_CUES)
+        if cue and (expiration is None or cue * confidence > expiration.confidence):
+            expiration = ExtractedField(date, round(cue * confidence, 2), source)
+
+    # An uncued date in the preamble is most likely the effective date
+    if effective is None:
+        preamble_dates = find_dates(text[:PREAMBLE_CHARS])
+        if preamble_dates:
+            start, end, date, confidence = preamble_dates[0]
+            effective = ExtractedField(date, round(0.6 * confidence, 2), text[start:end])
+
+    # "for a term of two (2) years" after a known effective date
+    if effective is not None and (expiration is None or expiration.confidence < 0.8):
+        match = TERM_RE.search(text)
+        count = _number(match) if match else None
+        if count:
+            months = count * 12 if match.group("unit").lower().startswith("year") else count
+            derived = ExtractedField(
+                _add_months(effective.value, months),
+                round(0.85 * effective.confidence, 2),
+                match.group(0)
+            )
+            if expiration is None or derived.confidence > expiration.confidence:
+                expiration = derived
+
+    if effective is not None and expiration is not None and expiration.value <= effective.value:
+        expiration.confidence = round(expiration.confidence * 0.5, 2)
+    metadata.effective_date, metadata.expiration_date = effective, expiration
+
+
+def _clean_name(name: str) -> str:
+    name = re.sub(r"\s+", " ", name).strip(" ,")
+    # A sentence-ending period is not part of the name
+    if name.endswith(".") and not ABBREVIATION_RE.search(name):
+        name = name[:-1]
+    return name
+
+
+def _extract_parties(text: str, metadata: ContractMetadata):
+    match = PARTIES_RE.search(text[:PREAMBLE_CHARS])
+    if not match:
+        return
+    names = [_clean_name(match.group("first")), _clean_name(match.group("second"))]
+    confidence = 0.85
+    for name in names:
+        words = name.lower().split()
+        if all(w.strip(".") in ROLE_WORDS for w in words):
+            confidence -= 0.4
+        elif SUFFIX_RE.search(name) or len(words) > 1:
+            confidence += 0.05
+    metadata.parties = ExtractedField(names, round(min(confidence, 0.95), 2), match.group(0)[:200])
+
+
+def _extract_amounts(text: str, metadata: ContractMetadata):
+    seen = set()
+    for pattern in AMOUNT_RES:
+        for match in pattern.finditer(text):
+            if match.start() in seen:
+                continue
+            seen.add(match.start())
+            value = float(match.group("num").replace(",", ""))
+            if match.group("dec"):
+                value += float("0." + match.group("dec"))
+            scale = (match.group("scale") or "").lower()
+            value *= _SCALES.get(scale, 1)
+            currency = _CURRENCIES[match.group("cur").lower()]
+            metadata.amounts.append(ExtractedField(
+                {"amount": value, "currency": currency},
+                0.9 if match.group("cur") in ("$", "€", "£", "US$") else 0.85,
+                match.group(0)
+            ))
+            if len(metadata.amounts) >= MAX_AMOUNTS:
+                return
+
+
+def _extract_notice_period(text: str, metadata: ContractMetadata):
+    periods: List[Tuple[int, str]] = []
+    for notice in NOTICE_RE.finditer(text):
+        start = max(0, notice.start() - NOTICE_WINDOW)
+        match = NOTICE_BEFORE_RE.search(text, start, notice.start())
+        if match is None:
+            match = NOTICE_AFTER_RE.match(text, notice.end(), notice.end() + NOTICE_WINDOW)
+            start = notice.start()
+        else:
+            start = match.start()
+        count = _number(match) if match else None
+        if count:
+            days = count * 30 if match.group("unit").lower().startswith("month") else count
+            periods.append((days, text[start:max(match.end(), notice.end())]))
+    if not periods:
+        return
+    counts = Counter(days for days, _ in periods)
+    days, _ = counts.most_common(1)[0]
+    confidence = 0.9 if len(counts) == 1 else 0.7
+    source = next(s for d, s in periods if d == days)
+    metadata.notice_period_days = ExtractedField(days, confidence, source)
+
+
+def extract_metadata(text: ContractText) -> ContractMetadata:
+    """Extract dates, parties, amounts and notice periods from contract text."""
+    if isinstance(text, DocumentText):
+        text = text.head(SPILLED_SCAN_CHARS)
+    metadata = ContractMetadata()
+    if not text:
+        return metadata
+    _extract_dates(text, metadata)
+    _extract_parties(text, metadata)
+    _extract_amounts(text, metadata)
+    _extract_notice_period(text, metadata)
+    return metadata
+
+
+def apply_metadata(contract: Contract, metadata: ContractMetadata):
+    """Store confident fields in their columns and every field in `metadata["extracted"]`."""
+    confident = metadata.confident_fields()
+    if "parties" in confident:
+        contract.parties = metadata.parties.value
+    for name in DATE_FIELDS:
+        if name in confident:
+            setattr(contract, name, getattr(metadata, name).value)
+    # Reassigned so the JSON column registers the change
+    contract.metadata_ = {**(contract.metadata_ or {}), "extracted": metadata.to_dict()}
+
+
+def confident_fields(contract: Contract) -> Set[str]:
+    """Fields of a contract already settled by the rule-based extractor."""
+    extracted = (contract.metadata_ or {}).get("extracted", {})
+    return {
+        name for name, item in extracted.items()
+        if isinstance(item, dict) and item.get("confidence", 0) >= settings.metadata_confidence_threshold
+    }
@@ -0,0 +1,241 @@
+"""Layout-aware PDF text extraction with pdfplumber.
+
+Plain text extraction reads tables cell by cell into unreadable runs and
+repeats running headers, footers and page numbers on every page. Here each
+page's ruled tables are detected and serialized as compact Markdown in
+reading order with the surrounding text lines; lines repeated at the top
+or bottom of most pages and bare page numbers are dropped, and words
+hyphenated across line breaks are joined.
+
+Tables are found from ruling lines, so only pages with vector drawings go
+through pdfplumber, whose pure-Python page parsing costs tens of
+microseconds per character; the rest are read with PyMuPDF. Longer
+documents are split into contiguous page ranges extracted in a shared
+process pool.
+"""
+
+import os
+import re
+import threading
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+# (kind, text) blocks of one page in reading order; kind is "text" or "table"
+Block = Tuple[str, str]
+
+PAGE_NUMBER_RE = re.compile(
+    r"^\s*(?:page\s+)?[-–—]?\s*\d{1,4}\s*[-–—]?\s*(?:(?:of|/)\s*\d{1,4})?\s*$",
+    re.IGNORECASE
+)
+# "Page 3", "3 of 12": the part of a running header or footer that changes
+PAGE_REFERENCE_RE = re.compile(r"\bpage\s+\d+(?:\s*(?:of|/)\s*\d+)?|\b\d+\s*(?:of|/)\s*\d+\b", re.IGNORECASE)
+HYPHENATED_END_RE = re.compile(r"[A-Za-z]-$")
+# Lines at each end of a page considered for running headers and footers
+MARGIN_LINES = 2
+# Pages assembled at a time when streaming
+WINDOW_PAGES = 32
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _cell(value: Optional[str]) -> str:
+    text = re.sub(r"([A-Za-z])-\n([a-z])", r"\1\2", value or "")
+    return " ".join(text.split()).replace("|", "\\|")
+
+
+def table_markdown(rows: List[List[Optional[str]]]) -> str:
+    """Serialize extracted table rows as Markdown, dropping empty rows and columns."""
+    cells = [[_cell(value) for value in row] for row in rows]
+    cells = [row for row in cells if any(row)]
+    if not cells:
+        return ""
+    width = max(len(row) for row in cells)
+    cells = [row + [""] * (width - len(row)) for row in cells]
+    columns = [i for i in range(width) if any(row[i] for row in cells)]
+    cells = [[row[i] for i in columns] for row in cells]
+    if len(columns) < 2 or len(cells) < 2:
+        # A ruled box rather than a table
+        return "\n".join(" ".join(value for value in row if value) for row in cells)
+
+    lines = ["| " + " | ".join(cells[0]) + " |", "|" + "---|" * len(columns)]
+    lines.extend("| " + " | ".join(row) + " |" for row in cells[1:])
+    return "\n".join(lines)
+
+
+def _text_blocks(page) -> List[Block]:
+    """Text lines of a PyMuPDF page without tables, top to bottom."""
+    return [("text", line.strip()) for line in page.get_text().splitlines() if line.strip()]
+
+
+def _table_page_blocks(page) -> List[Block]:
+    """Text lines and Markdown tables of a pdfplumber page, top to bottom."""
+    positioned = []
+    remaining = page
+    for table in page.find_tables():
+        markdown = table_markdown(table.extract())
+        if markdown:
+            positioned.append((table.bbox[1], "table", markdown))
+        remaining = remaining.outside_bbox(table.bbox, strict=False)
+    for line in remaining.extract_text_lines(return_chars=False):
+        if line["text"].strip():
+            positioned.append((line["top"], "text", line["text"].strip()))
+    positioned.sort(key=lambda block: block[0])
+    return [(kind, text) for _, kind, text in positioned]
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[List[Block]]:
+    """Blocks of pages [start, end), opening the document once."""
+    import fitz  # PyMuPDF
+
+    plumber = None
+    pages = []
+    try:
+        with fitz.open(file_path) as document:
+            for number in range(start, end):
+                page = document[number]
+                if not page.get_drawings():
+                    pages.append(_text_blocks(page))
+                    continue
+                if plumber is None:
+                    import pdfplumber
+                    plumber = pdfplumber.open(file_path)
+                table_page = plumber.pages[number]
+                pages.append(_table_page_blocks(table_page))
+                # Release the page's parsed layout before the next one
+                table_page.close()
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return pages
+
+
+def _margin_key(text: str) -> str:
+    return PAGE_REFERENCE_RE.sub("#", text.lower())
+
+
+def _margins(blocks: List[Block]) -> List[int]:
+    text_indices = [i for i, (kind, _) in enumerate(blocks) if kind == "text"]
+    return sorted(set(text_indices[:MARGIN_LINES] + text_indices[-MARGIN_LINES:]))
+
+
+def assemble(pages: List[List[Block]], counts: Optional[Counter] = None, pages_seen: int = 0) -> str:
+    """Join page blocks, dropping running headers, footers and page numbers.
+
+    `counts` and `pages_seen` carry margin line counts over from earlier
+    pages when a document is assembled window by window.
+    """
+    counts = Counter() if counts is None else counts
+    for blocks in pages:
+        counts.update({_margin_key(blocks[i][1]) for i in _margins(blocks)})
+    total = pages_seen + len(pages)
+    repeated = {key for key, count in counts.items() if count >= max(3, (total + 1) // 2)}
+
+    lines: List[str] = []
+    for blocks in pages:
+        drop = {
+            i for i in _margins(blocks)
+            if _margin_key(blocks[i][1]) in repeated or PAGE_NUMBER_RE.match(blocks[i][1])
+        }
+        previous_kind = None
+        for i, (kind, text) in enumerate(blocks):
+            if i in drop:
+                continue
+            if kind == "table" or previous_kind == "table":
+                lines.append("")
+            if (
+                kind == "text" and previous_kind == "text"
+                and HYPHENATED_END_RE.search(lines[-1]) and text[:1].islower()
+            ):
+                lines[-1] = lines[-1][:-1] + text
+            else:
+                lines.append(text)
+            previous_kind = kind
+        lines.append("")
+    return "\n".join(lines).strip() + "\n"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.pdf_page_workers or os.cpu_count() or 1)
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the page worker processes, if they were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def extract_pdf_layout(file_path: str) -> str:
+    """Extract a PDF's text with tables as Markdown and page furniture removed.
+
+    Documents of at least `pdf_parallel_min_pages` pages are split into one
+    contiguous page range per worker (`pdf_page_workers`, 0 = one per core;
+    1 runs in the calling thread).
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as document:
+        page_count = document.page_count
+
+    workers = min(settings.pdf_page_workers or os.cpu_count() or 1, page_count)
+    if workers <= 1 or page_count < settings.pdf_parallel_min_pages:
+        return assemble(extract_page_range(file_path, 0, page_count))
+
+    step = -(-page_count // workers)
+    futures = [
+        _get_pool().submit(extract_page_range, file_path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return assemble([page for future in futures for page in future.result()])
+
+
+def iter_pdf_layout(file_path: str, window_pages: int = WINDOW_PAGES) -> Iterator[str]:
+    """Like `extract_pdf_layout`, but yield the text window by window.
+
+    At most `window_pages` pages per worker are held at a time; running
+    headers and footers are recognised from the pages seen so far.
+    """
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as document:
+        page_count = document.page_count
+
+    workers = min(settings.pdf_page_workers or os.cpu_count() or 1, page_count)
+    parallel = workers > 1 and page_count >= settings.pdf_parallel_min_pages
+    if parallel:
+        # At least one window per worker
+        window_pages = min(window_pages, -(-page_count // workers))
+    windows = [(start, min(start + window_pages, page_count)) for start in range(0, page_count, window_pages)]
+
+    if parallel:
+        pool = _get_pool()
+        pending = deque()
+
+        def results() -> Iterator[List[List[Block]]]:
+            for window in windows:
+                pending.append(pool.submit(extract_page_range, file_path, *window))
+                # Keep every worker busy without extracting far ahead of the reader
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        window_results = results()
+    else:
+        window_results = (extract_page_range(file_path, start, end) for start, end in windows)
+
+    counts: Counter = Counter()
+    pages_seen = 0
+    for pages in window_results:
+        # Pages are separated by a blank line, within and across windows
+        yield ("\n" if pages_seen else "") + assemble(pages, counts, pages_seen)
+        pages_seen += len(pages)
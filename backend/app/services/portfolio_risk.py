@@ -0,0 +1,301 @@
+"""Deterministic contract-level risk computed from clause risk scores.
+
+A contract's risk index blends the weighted mean, the maximum and an upper
+percentile of its assessed clause scores, weighted per clause type, plus a
+penalty for each expected clause type it lacks. The whole portfolio is held
+as three columnar arrays (contract, clause type, score per clause), so
+scoring is a handful of vectorized passes, whatever the number of
+contracts. Committed writes mark contracts dirty (see `app.models.events`);
+the next read reloads only those contracts and rescores them in place.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import String, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.clause import Clause, ClauseType
+from app.models.contract import Contract, ContractType
+from app.models.events import on_contracts_committed
+from app.models.portfolio import RiskModelWeights
+
+CLAUSE_TYPES = list(ClauseType)
+# Enum columns store member names; loading them raw skips per-row conversion
+_TYPE_CODES = {t.name: i for i, t in enumerate(CLAUSE_TYPES)}
+_TYPE_CODES.update({t.value: i for i, t in enumerate(CLAUSE_TYPES)})
+_CONTRACT_TYPES = {t.name: t.value for t in ContractType}
+RISK_LEVELS = ["low", "medium", "high", "critical"]
+SCORE_FIELDS = ["risk_index", "weighted_mean", "max_score", "percentile_score", "missing_penalty"]
+# Keeps IN lists under SQLite's bound parameter limit
+_ID_CHUNK = 500
+
+
+def score_contracts(
+    contract_idx: np.ndarray,
+    type_idx: np.ndarray,
+    scores: np.ndarray,
+    n_contracts: int,
+    weights: RiskModelWeights
+) -> Dict[str, np.ndarray]:
+    """Score every contract from its clauses' columns in one pass.
+
+    `contract_idx` and `type_idx` locate each clause; `scores` is NaN for
+    clauses not yet assessed. Contracts without assessed clauses get a NaN
+    risk index.
+    """
+    n = n_contracts
+    type_weights = np.array([weights.clause_type_weights.get(t, 1.0) for t in CLAUSE_TYPES])
+    penalties = np.array([weights.missing_clause_penalties.get(t, 0.0) for t in CLAUSE_TYPES])
+
+    # Missing clause types count whether or not the clause was assessed
+    present = np.zeros((n, len(CLAUSE_TYPES)), dtype=bool)
+    present[contract_idx, type_idx] = True
+    missing_penalty = (~present) @ penalties
+    total = np.bincount(contract_idx, minlength=n)
+
+    assessed = ~np.isnan(scores)
+    c, s = contract_idx[assessed], scores[assessed]
+    w = type_weights[type_idx[assessed]]
+    counts = np.bincount(c, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weighted_mean = np.bincount(c, weights=w * s, minlength=n) / np.bincount(c, weights=w, minlength=n)
+
+    # Sorted by (contract, score): each contract's scores are one ascending run
+    order = np.lexsort((s, c))
+    s = s[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    scored = counts > 0
+    max_score = np.full(n, np.nan)
+    max_score[scored] = s[starts[scored] + counts[scored] - 1]
+    # Linear interpolation between closest ranks, as np.percentile does
+    position = weights.percentile / 100 * (counts[scored] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, counts[scored] - 1)
+    base = starts[scored]
+    percentile_score = np.full(n, np.nan)
+    percentile_score[scored] = s[base + low] + (position - low) * (s[base + high] - s[base + low])
+
+    blend = weights.mean_weight + weights.max_weight + weights.percentile_weight or 1.0
+    risk_index = (
+        weights.mean_weight * weighted_mean
+        + weights.max_weight * max_score
+        + weights.percentile_weight * percentile_score
+    ) / blend
+    risk_index = np.clip(risk_index + missing_penalty, 0.0, 1.0)
+
+    return {
+        "risk_index": risk_index,
+        "weighted_mean": weighted_mean,
+        "max_score": max_score,
+        "percentile_score": percentile_score,
+        "missing_penalty": missing_penalty,
+        "assessed_clauses": counts,
+        "total_clauses": total,
+    }
+
+
+def _chunks(ids: List[str]):
+    for i in range(0, len(ids), _ID_CHUNK):
+        yield ids[i:i + _ID_CHUNK]
+
+
+class PortfolioRiskModel:
+    """Columnar clause scores of every contract, with cached contract scores."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.contract_ids: List[str] = []
+        self.titles: List[Optional[str]] = []
+        self.contract_types: List[Optional[str]] = []
+        self.llm_risk_scores: List[Optional[str]] = []
+        self.active = np.zeros(0, dtype=bool)
+        self.clause_contract = np.zeros(0, dtype=np.int64)
+        self.clause_type = np.zeros(0, dtype=np.int64)
+        self.clause_score = np.zeros(0, dtype=np.float64)
+        self.scores: Optional[Dict[str, np.ndarray]] = None
+        self.loaded = False
+        self._index: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self._watermark: Optional[datetime] = None
+
+    def mark_dirty(self, contract_ids: Set[str]):
+        if self.loaded:
+            self._dirty.update(contract_ids)
+
+    async def _fetch(self, db: AsyncSession, contract_ids: Optional[List[str]]):
+        contract_query = select(
+            Contract.id, Contract.title, type_coerce(Contract.contract_type, String),
+            Contract.risk_score, Contract.updated_at
+        )
+        clause_query = select(Clause.contract_id, type_coerce(Clause.clause_type, String), Clause.risk_score)
+        if contract_ids is None:
+            contracts = (await db.execute(contract_query)).all()
+            clauses = (await db.execute(clause_query)).all()
+            return contracts, clauses
+        contracts, clauses = [], []
+        for chunk in _chunks(contract_ids):
+            contracts += (await db.execute(contract_query.where(Contract.id.in_(chunk)))).all()
+            clauses += (await db.execute(clause_query.where(Clause.contract_id.in_(chunk)))).all()
+        return contracts, clauses
+
+    def _add_contracts(self, contracts) -> None:
+        for contract_id, title, contract_type, llm_risk, updated_at in contracts:
+            idx = self._index.get(contract_id)
+            if idx is None:
+                self._index[contract_id] = idx = len(self.contract_ids)
+                self.contract_ids.append(contract_id)
+                self.titles.append(None)
+                self.contract_types.append(None)
+                self.llm_risk_scores.append(None)
+            self.titles[idx] = title
+            self.contract_types[idx] = _CONTRACT_TYPES.get(contract_type, contract_type)
+            self.llm_risk_scores[idx] = llm_risk
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+        self.active = np.concatenate((self.active, np.zeros(len(self.contract_ids) - len(self.active), dtype=bool)))
+
+    def _clause_columns(self, clauses):
+        index = self._index
+        # Orphaned clauses have no contract to score
+        clauses = [row for row in clauses if row[0] in index]
+        contract_idx = np.fromiter((index[row[0]] for row in clauses), dtype=np.int64, count=len(clauses))
+        type_idx = np.fromiter(
+            (_TYPE_CODES.get(row[1], _TYPE_CODES["OTHER"]) for row in clauses), dtype=np.int64, count=len(clauses)
+        )
+        scores = np.fromiter(
+            (np.nan if row[2] is None else row[2] for row in clauses), dtype=np.float64, count=len(clauses)
+        )
+        return contract_idx, type_idx, scores
+
+    async def _load(self, db: AsyncSession):
+        self._reset()
+        contracts, clauses = await self._fetch(db, None)
+        self._add_contracts(contracts)
+        self.active[:] = True
+        self.clause_contract, self.clause_type, self.clause_score = self._clause_columns(clauses)
+        self.scores = await asyncio.to_thread(
+            score_contracts, self.clause_contract, self.clause_type, self.clause_score,
+            len(self.contract_ids), RiskModelWeights()
+        )
+        self.loaded = True
+
+    async def _reload(self, db: AsyncSession, contract_ids: Set[str]):
+        """Replace the clauses of the given contracts and rescore only them."""
+        contracts, clauses = await self._fetch(db, sorted(contract_ids))
+        self._add_contracts(contracts)
+        n = len(self.contract_ids)
+        for key, column in self.scores.items():
+            if len(column) < n:
+                fill = 0 if column.dtype.kind == "i" else np.nan
+                self.scores[key] = np.concatenate((column, np.full(n - len(column), fill, dtype=column.dtype)))
+
+        # Deleted contracts stay indexed but drop out of the ranking
+        found = {row[0] for row in contracts}
+        for contract_id in contract_ids - found:
+            idx = self._index.get(contract_id)
+            if idx is not None:
+                self.active[idx] = False
+        changed = np.array(sorted(self._index[c] for c in contract_ids if c in self._index), dtype=np.int64)
+        self.active[[self._index[c] for c in found]] = True
+
+        keep = ~np.isin(self.clause_contract, changed)
+        contract_idx, type_idx, scores = self._clause_columns(clauses)
+        self.clause_contract = np.concatenate((self.clause_contract[keep], contract_idx))
+        self.clause_type = np.concatenate((self.clause_type[keep], type_idx))
+        self.clause_score = np.concatenate((self.clause_score[keep], scores))
+
+        local = score_contracts(
+            np.searchsorted(changed, contract_idx), type_idx, scores, len(changed), RiskModelWeights()
+        )
+        for key, values in local.items():
+            self.scores[key][changed] = values
+
+    async def refresh(self, db: AsyncSession):
+        """Bring the arrays up to date with the database.
+
+        Besides contracts committed in this process, picks up any contract
+        whose `updated_at` moved past the last one seen, so writes from other
+        processes are reflected too.
+        """
+        async with self._lock:
+            if not self.loaded:
+                await self._load(db)
+                return
+            dirty, self._dirty = self._dirty, set()
+            if self._watermark is not None:
+                result = await db.execute(select(Contract.id).where(Contract.updated_at > self._watermark))
+                dirty.update(result.scalars().all())
+            if dirty:
+                await self._reload(db, dirty)
+
+    async def rank(
+        self,
+        db: AsyncSession,
+        weights: Optional[RiskModelWeights] = None,
+        contract_type: Optional[str] = None,
+        min_risk_index: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> dict:
+        """Contracts ordered by risk index, highest first; unscored ones last.
+
+        Custom `weights` rescore the whole portfolio from the cached arrays
+        without touching the database beyond the refresh.
+        """
+        await self.refresh(db)
+        if weights is None:
+            scores = self.scores
+            weights = RiskModelWeights()
+        else:
+            scores = await asyncio.to_thread(
+                score_contracts, self.clause_contract, self.clause_type, self.clause_score,
+                len(self.contract_ids), weights
+            )
+
+        risk_index = scores["risk_index"]
+        levels = np.digitize(risk_index, weights.level_thresholds)
+        selected = self.active.copy()
+        if contract_type:
+            selected &= np.array([t == contract_type for t in self.contract_types], dtype=bool)
+        if min_risk_index is not None:
+            selected &= np.nan_to_num(risk_index, nan=-1.0) >= min_risk_index
+        candidates = np.flatnonzero(selected)
+
+        # NaN sorts last under ascending order of the negated index
+        order = candidates[np.argsort(-risk_index[candidates], kind="stable")]
+        page = order[offset:offset + limit]
+
+        scored = candidates[~np.isnan(risk_index[candidates])]
+        by_level = np.bincount(levels[scored], minlength=len(RISK_LEVELS))
+        return {
+            "total": int(len(candidates)),
+            "scored": int(len(scored)),
+            "by_level": {level: int(count) for level, count in zip(RISK_LEVELS, by_level)},
+            "contracts": [self._entry(int(i), scores, levels) for i in page],
+        }
+
+    def _entry(self, idx: int, scores: Dict[str, np.ndarray], levels: np.ndarray) -> dict:
+        unscored = np.isnan(scores["risk_index"][idx])
+        entry = {
+            "contract_id": self.contract_ids[idx],
+            "title": self.titles[idx],
+            "contract_type": self.contract_types[idx],
+            "risk_level": None if unscored else RISK_LEVELS[levels[idx]],
+            "llm_risk_score": self.llm_risk_scores[idx],
+            "assessed_clauses": int(scores["assessed_clauses"][idx]),
+            "total_clauses": int(scores["total_clauses"][idx]),
+        }
+        for key in SCORE_FIELDS:
+            value = scores[key][idx]
+            entry[key] = None if np.isnan(value) else round(float(value), 4)
+        return entry
+
+
+PORTFOLIO_RISK = PortfolioRiskModel()
+on_contracts_committed(PORTFOLIO_RISK.mark_dirty)
@@ -0,0 +1 @@
+"""Multi-agent workflows."""
@@ -0,0 +1,357 @@
+"""Contract analysis pipeline as a LangGraph workflow.
+
+    extract_text -+-> summarize ----------------------------------------+
+                  +-> extract_clauses (assessing each chunk's clauses) -+-> amend -> finalize
+
+Summary and clause extraction both only need the text, so they run in the
+same step. Each clause is assessed in its own task as soon as the chunk it
+came from is extracted, overlapping the extraction of later chunks; this
+happens inside `extract_clauses` because graph steps run in lockstep, so
+a node per clause could only start once every chunk was done. Amendments
+wait for the summary and every assessment. End-to-end latency is the
+longest of these paths rather than their sum. Text extraction also runs
+the rule-based metadata extractor, so the summary only asks the LLM for
+the dates and parties it could not settle.
+
+State is checkpointed per contract (thread id = contract id), so after a
+failure `resume_pipeline` re-runs only the nodes that did not finish. A
+clause whose assessment still fails after its retries is left unassessed
+rather than failing the run; a failed clause extraction re-runs along
+with its assessments. Uploads and bulk ingestion both run this
+graph; bulk jobs bound their stages with `pipeline_limits`.
+Very large documents are spilled to disk at extraction and read by the
+later nodes through a memory map, and all of a run's LLM calls share one
+memory budget.
+"""
+
+import asyncio
+import operator
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Annotated, Callable, List, Optional, TypedDict
+
+from langchain_core.exceptions import OutputParserException
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import RetryPolicy
+from sqlalchemy import delete
+
+from app.agents.clause_extractor import ClauseExtractorAgent
+from app.agents.document_parser import DocumentParserAgent
+from app.agents.risk_analyzer import RiskAnalyzerAgent
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.memory_budget import memory_budget
+from app.core.metrics import stage
+from app.core.prompt_cache import cache_scope
+from app.core.resilience import is_transient
+from app.core.text_store import DocumentText, spill_path
+from app.models.clause import Clause, RiskLevel
+from app.models.contract import Contract, ContractStatus
+from app.services.amendments import generate_contract_amendments, get_risky_clauses
+from app.services.ingestion import add_clauses, apply_analysis, apply_risk, assign_clusters, open_contract_text
+from app.services.metadata import apply_metadata, confident_fields, extract_metadata
+
+# Leading text (parties, recitals) given to each clause assessment as
+# context, since the summary is produced concurrently
+CONTEXT_CHARS = 2000
+
+
+@dataclass
+class PipelineLimits:
+    """Bounds shared by the runs of a bulk job, and its progress callback."""
+    extraction: Optional[asyncio.Semaphore] = None  # CPU-bound text extraction
+    llm: Optional[asyncio.Semaphore] = None  # LLM calls in flight
+    on_stage: Optional[Callable[[str], None]] = None
+
+
+current_limits: ContextVar[Optional[PipelineLimits]] = ContextVar("current_pipeline_limits", default=None)
+
+
+@contextmanager
+def pipeline_limits(limits: PipelineLimits):
+    """Apply `limits` to the pipeline runs in this context."""
+    token = current_limits.set(limits)
+    try:
+        yield
+    finally:
+        current_limits.reset(token)
+
+
+@asynccontextmanager
+async def _limited(kind: str, status: Optional[str] = None):
+    """Hold the current run's `kind` slot, if it has one, reporting `status`."""
+    limits = current_limits.get()
+    async with (getattr(limits, kind) if limits else None) or nullcontext():
+        if limits and limits.on_stage and status:
+            limits.on_stage(status)
+        yield
+
+
+class PipelineState(TypedDict, total=False):
+    """Workflow state; documents and results live in the database."""
+    contract_id: str
+    file_path: str
+    generate_amendments: bool
+    risk_threshold: str
+    text_chars: int
+    context: str
+    summary: str
+    clause_ids: List[str]
+    assessed: Annotated[List[str], operator.add]
+    unassessed: Annotated[List[str], operator.add]
+    amendment_ids: List[str]
+
+
+async def extract_text(state: PipelineState) -> dict:
+    async with _limited("extraction", "extracting"):
+        with stage("text_extraction"):
+            raw_text = await asyncio.to_thread(
+                DocumentParserAgent.extract_contract_text, state["file_path"], spill_path(state["contract_id"])
+            )
+    try:
+        with stage("metadata_extraction"):
+            metadata = await asyncio.to_thread(extract_metadata, raw_text)
+        async with async_session_maker() as db:
+            contract = await db.get(Contract, state["contract_id"])
+            # Spilled text stays in its file rather than the row
+            contract.raw_text = raw_text if isinstance(raw_text, str) else None
+            apply_metadata(contract, metadata)
+            await db.commit()
+        if isinstance(raw_text, DocumentText):
+            return {"text_chars": len(raw_text), "context": raw_text.head(CONTEXT_CHARS)}
+        return {"text_chars": len(raw_text), "context": raw_text[:CONTEXT_CHARS]}
+    finally:
+        if isinstance(raw_text, DocumentText):
+            raw_text.close()
+
+
+async def summarize(state: PipelineState) -> dict:
+    async with async_session_maker() as db:
+        contract = await db.get(Contract, state["contract_id"])
+        async with _limited("llm", "analyzing"):
+            with stage("summary_llm"), open_contract_text(contract) as raw_text:
+                analysis = await DocumentParserAgent().analyze(raw_text, known_fields=confident_fields(contract))
+        apply_analysis(contract, analysis)
+        await db.commit()
+    return {"summary": analysis.summary}
+
+
+async def extract_clauses(state: PipelineState) -> dict:
+    """Extract the clauses, assessing each chunk's as soon as it is extracted.
+
+    Every clause is assessed in its own task, started while the remaining
+    chunks are still being extracted rather than after all of them.
+    """
+    context = state.get("context", "")
+    assessments: List[asyncio.Task] = []
+    clause_ids: List[str] = []
+    async with async_session_maker() as db:
+        contract = await db.get(Contract, state["contract_id"])
+        # Re-runs replace rather than duplicate the clauses
+        await db.execute(delete(Clause).where(Clause.contract_id == contract.id))
+
+        async def add_chunk(extracted):
+            clauses = add_clauses(db, contract.id, extracted)
+            await assign_clusters(db, clauses)
+            await db.commit()
+            clause_ids.extend(c.id for c in clauses)
+            assessments.extend(asyncio.ensure_future(assess_clause(c.id, context)) for c in clauses)
+
+        try:
+            async with _limited("llm", "analyzing"):
+                with stage("clause_llm"), open_contract_text(contract) as raw_text:
+                    await ClauseExtractorAgent().extract(raw_text, on_chunk=add_chunk)
+            await db.commit()
+            assessed = await asyncio.gather(*assessments)
+        except BaseException:
+            for task in assessments:
+                task.cancel()
+            raise
+
+    return {
+        "clause_ids": clause_ids,
+        "assessed": [clause_id for clause_id, ok in zip(clause_ids, assessed) if ok],
+        "unassessed": [clause_id for clause_id, ok in zip(clause_ids, assessed) if not ok],
+    }
+
+
+async def assess_clause(clause_id: str, context: str) -> bool:
+    """Assess one clause, retrying like the nodes do; whether it succeeded.
+
+    A clause that still fails is left unassessed, as bulk assessment does,
+    so one bad clause does not fail the contract; it can be assessed again
+    through the API.
+    """
+    async with async_session_maker() as db:
+        clause = await db.get(Clause, clause_id)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with _limited("llm"):
+                    assessment = await RiskAnalyzerAgent().analyze_clause(
+                        clause_text=clause.text,
+                        clause_type=clause.clause_type.value,
+                        clause_title=clause.title or "",
+                        section_number=clause.section_number or "",
+                        contract_context=context
+                    )
+                break
+            except Exception as e:
+                if attempt >= settings.workflow_node_max_attempts or not _should_retry(e):
+                    return False
+        apply_risk(clause, assessment)
+        await db.commit()
+    return True
+
+
+async def amend(state: PipelineState) -> dict:
+    if not state.get("generate_amendments"):
+        return {"amendment_ids": []}
+    async with async_session_maker() as db:
+        contract = await db.get(Contract, state["contract_id"])
+        threshold = RiskLevel(state.get("risk_threshold", RiskLevel.MEDIUM.value))
+        clauses = await get_risky_clauses(db, contract.id, threshold)
+        async with _limited("llm"):
+            amendments = await generate_contract_amendments(db, contract, clauses) if clauses else []
+        await db.commit()
+        return {"amendment_ids": [a.id for a in amendments]}
+
+
+async def finalize(state: PipelineState) -> dict:
+    async with async_session_maker() as db:
+        contract = await db.get(Contract, state["contract_id"])
+        contract.status = ContractStatus.ANALYZED
+        await db.commit()
+    return {}
+
+
+def _should_retry(exc: Exception) -> bool:
+    # Routed LLM calls already retry transient errors themselves; a node
+    # retry also covers malformed model output
+    return is_transient(exc) or isinstance(exc, OutputParserException)
+
+
+def build_graph() -> StateGraph:
+    """Define the pipeline DAG."""
+    retry = RetryPolicy(max_attempts=settings.workflow_node_max_attempts, retry_on=_should_retry)
+
+    graph = StateGraph(PipelineState)
+    graph.add_node("extract_text", extract_text)
+    graph.add_node("summarize", summarize, retry_policy=retry)
+    graph.add_node("extract_clauses", extract_clauses, retry_policy=retry)
+    graph.add_node("amend", amend, retry_policy=retry)
+    graph.add_node("finalize", finalize)
+
+    graph.add_edge(START, "extract_text")
+    graph.add_edge("extract_text", "summarize")
+    graph.add_edge("extract_text", "extract_clauses")
+    # Waits for the summary and every clause assessment
+    graph.add_edge(["summarize", "extract_clauses"], "amend")
+    graph.add_edge("amend", "finalize")
+    graph.add_edge("finalize", END)
+    return graph
+
+
+_pipeline = None
+_pipeline_lock = asyncio.Lock()
+
+
+async def _create_checkpointer():
+    path = settings.workflow_checkpoint_path
+    if path:
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError:
+            pass
+        else:
+            saver = AsyncSqliteSaver(await aiosqlite.connect(path))
+            await saver.setup()
+            return saver
+
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver()
+
+
+async def get_pipeline():
+    """Get the compiled pipeline with its checkpointer.
+
+    State persists in SQLite when langgraph-checkpoint-sqlite is installed
+    and `WORKFLOW_CHECKPOINT_PATH` is set, otherwise in memory.
+    """
+    global _pipeline
+    async with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = build_graph().compile(checkpointer=await _create_checkpointer())
+    return _pipeline
+
+
+async def close_pipeline():
+    """Close the checkpoint database connection, if any."""
+    global _pipeline
+    async with _pipeline_lock:
+        conn = getattr(_pipeline and _pipeline.checkpointer, "conn", None)
+        if conn is not None:
+            await conn.close()
+        _pipeline = None
+
+
+def _config(contract_id: str) -> dict:
+    return {"configurable": {"thread_id": contract_id}}
+
+
+async def run_pipeline(
+    contract_id: str,
+    file_path: str,
+    generate_amendments: bool = False,
+    risk_threshold: RiskLevel = RiskLevel.MEDIUM
+) -> dict:
+    """Run the full pipeline for a newly uploaded contract."""
+    pipeline = await get_pipeline()
+    with cache_scope(contract_id), memory_budget():
+        return await pipeline.ainvoke(
+            {
+                "contract_id": contract_id,
+                "file_path": file_path,
+                "generate_amendments": generate_amendments,
+                "risk_threshold": risk_threshold.value,
+            },
+            _config(contract_id)
+        )
+
+
+async def resume_pipeline(contract_id: str) -> dict:
+    """Re-run only the nodes that failed or never ran for a contract."""
+    pipeline = await get_pipeline()
+    with cache_scope(contract_id), memory_budget():
+        return await pipeline.ainvoke(None, _config(contract_id))
+
+
+async def get_pipeline_state(contract_id: str) -> Optional[dict]:
+    """Checkpointed progress of a contract's pipeline, or None if it never ran."""
+    pipeline = await get_pipeline()
+    snapshot = await pipeline.aget_state(_config(contract_id))
+    if not snapshot.values:
+        return None
+    values = snapshot.values
+    return {
+        "contract_id": contract_id,
+        "completed": not snapshot.next,
+        "pending": list(snapshot.next),
+        "errors": [
+            {"node": task.name, "error": str(task.error)}
+            for task in snapshot.tasks if task.error
+        ],
+        "clauses": len(values.get("clause_ids", [])),
+        "assessed": len(values.get("assessed", [])),
+        "unassessed": len(values.get("unassessed", [])),
+        "amendments": len(values.get("amendment_ids", [])),
+    }
+
+
+async def delete_pipeline_state(contract_id: str):
+    """Drop a contract's checkpointed pipeline state, if any."""
+    pipeline = await get_pipeline()
+    await pipeline.checkpointer.adelete_thread(contract_id)
@@ -0,0 +1,542 @@
+"""Synthetic contract corpus for scale testing.
+
+Generates contracts of every `ContractType` with numbered sections drawn
+from every `ClauseType`, with log-normal length distributions and a
+controllable rate of near-duplicates. Contracts can be written out as
+TXT/DOCX/PDF files for the upload path, or bulk-loaded straight into the
+database with analysis and risk fields already populated.
+
+Usage:
+    python -m benchmarks.corpus files ./corpus --count 500 --formats txt,docx,pdf
+    python -m benchmarks.corpus load --contracts 80000 --database-url sqlite+aiosqlite:///./scale.db
+"""
+
+import argparse
+import math
+import os
+import random
+import re
+import textwrap
+import time
+import uuid
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.models.clause import ClauseType, RiskLevel
+from app.models.contract import ContractStatus, ContractType
+
+PARTY_NAMES = [
+    "Acme Corp", "Globex LLC", "Initech Inc", "Umbrella Holdings", "Stark Industries",
+    "Wayne Enterprises", "Hooli Ltd", "Vandelay Imports", "Soylent Co", "Cyberdyne Systems",
+    "Tyrell Corporation", "Wonka Industries", "Aperture Labs", "Massive Dynamic", "Oscorp",
+]
+STATES = ["Delaware", "New York", "California", "Texas", "England and Wales", "Ontario"]
+
+CLAUSE_SENTENCES: Dict[ClauseType, List[str]] = {
+    ClauseType.TERMINATION: [
+        "Either party may terminate this Agreement upon {days} days' written notice to the other party.",
+        "{a} may terminate this Agreement immediately if {b} materially breaches any provision and fails to cure within {days} days.",
+        "Upon termination, all licenses granted hereunder shall cease and {b} shall return all materials.",
+    ],
+    ClauseType.CONFIDENTIALITY: [
+        "{b} shall hold all Confidential Information of {a} in strict confidence for a period of {years} years.",
+        "Confidential Information excludes information that is or becomes publicly available through no fault of the receiving party.",
+        "The receiving party shall not disclose Confidential Information to any third party without prior written consent.",
+    ],
+    ClauseType.INDEMNIFICATION: [
+        "{b} shall indemnify, defend and hold harmless {a} from any and all claims arising out of {b}'s performance.",
+        "The indemnified party shall give prompt notice of any claim and reasonable cooperation in its defense.",
+        "{a}'s indemnification obligations shall not apply to claims caused by {b}'s negligence.",
+    ],
+    ClauseType.LIABILITY: [
+        "In no event shall {a}'s aggregate liability exceed ${amount}.",
+        "Neither party shall be liable for any indirect, incidental, consequential or punitive damages.",
+        "The limitations in this Section shall not apply to breaches of confidentiality or gross negligence.",
+    ],
+    ClauseType.INTELLECTUAL_PROPERTY: [
+        "All intellectual property developed by {b} in the course of the Services shall vest exclusively in {a}.",
+        "{b} hereby assigns to {a} all right, title and interest in and to the Deliverables.",
+        "Each party retains ownership of its pre-existing intellectual property.",
+    ],
+    ClauseType.NON_COMPETE: [
+        "During the Term and for {years} years thereafter, {b} shall not engage in any business competing with {a}.",
+        "This restriction applies within any territory in which {a} conducts business.",
+    ],
+    ClauseType.NON_SOLICITATION: [
+        "For {years} years following termination, {b} shall not solicit any employee or customer of {a}.",
+        "General advertisements not targeted at {a}'s employees shall not breach this Section.",
+    ],
+    ClauseType.PAYMENT: [
+        "{a} shall pay {b} a fee of ${amount} within {days} days of receipt of a valid invoice.",
+        "Late payments shall accrue interest at {rate}% per month or the maximum rate permitted by law.",
+        "All fees are exclusive of applicable taxes, which shall be borne by {a}.",
+    ],
+    ClauseType.WARRANTY: [
+        "{b} warrants that the Services will be performed in a professional and workmanlike manner.",
+        "Except as expressly provided herein, {b} disclaims all warranties, express or implied.",
+        "{b} warrants that the Deliverables will conform to the Specifications for {days} days after delivery.",
+    ],
+    ClauseType.DISPUTE_RESOLUTION: [
+        "Any dispute arising under this Agreement shall be finally resolved by binding arbitration in {state}.",
+        "The parties shall first attempt in good faith to resolve any dispute through negotiation for {days} days.",
+    ],
+    ClauseType.FORCE_MAJEURE: [
+        "Neither party shall be liable for any failure to perform caused by events beyond its reasonable control.",
+        "If a force majeure event continues for more than {days} days, either party may terminate this Agreement.",
+    ],
+    ClauseType.GOVERNING_LAW: [
+        "This Agreement shall be governed by and construed in accordance with the laws of {state}.",
+        "The courts of {state} shall have exclusive jurisdiction over any proceedings.",
+    ],
+    ClauseType.ASSIGNMENT: [
+        "{b} may not assign this Agreement without the prior written consent of {a}.",
+        "{a} may assign this Agreement to any affiliate or successor without consent.",
+    ],
+    ClauseType.AMENDMENT: [
+        "This Agreement may be amended only by a written instrument signed by both parties.",
+    ],
+    ClauseType.NOTICES: [
+        "All notices shall be in writing and delivered by hand, courier or email to the addresses set out above.",
+        "Notices shall be deemed received {days} business days after dispatch.",
+    ],
+    ClauseType.ENTIRE_AGREEMENT: [
+        "This Agreement constitutes the entire agreement between the parties and supersedes all prior understandings.",
+    ],
+    ClauseType.SEVERABILITY: [
+        "If any provision of this Agreement is held invalid, the remaining provisions shall continue in full force.",
+    ],
+    ClauseType.OTHER: [
+        "The headings in this Agreement are for convenience only and shall not affect its interpretation.",
+        "This Agreement may be executed in counterparts, each of which shall be deemed an original.",
+    ],
+}
+
+# Clause types every contract of a kind carries before random extras
+CORE_CLAUSES: Dict[ContractType, List[ClauseType]] = {
+    ContractType.NDA: [ClauseType.CONFIDENTIALITY, ClauseType.TERMINATION, ClauseType.GOVERNING_LAW],
+    ContractType.EMPLOYMENT: [ClauseType.PAYMENT, ClauseType.NON_COMPETE, ClauseType.NON_SOLICITATION, ClauseType.TERMINATION],
+    ContractType.SERVICE: [ClauseType.PAYMENT, ClauseType.WARRANTY, ClauseType.LIABILITY, ClauseType.INDEMNIFICATION],
+    ContractType.LICENSE: [ClauseType.INTELLECTUAL_PROPERTY, ClauseType.PAYMENT, ClauseType.WARRANTY],
+    ContractType.LEASE: [ClauseType.PAYMENT, ClauseType.TERMINATION, ClauseType.ASSIGNMENT],
+    ContractType.PURCHASE: [ClauseType.PAYMENT, ClauseType.WARRANTY, ClauseType.LIABILITY],
+    ContractType.PARTNERSHIP: [ClauseType.INTELLECTUAL_PROPERTY, ClauseType.DISPUTE_RESOLUTION, ClauseType.ASSIGNMENT],
+    ContractType.OTHER: [ClauseType.OTHER],
+}
+
+RISK_FACTORS = [
+    "Uncapped liability", "One-sided termination right", "Ambiguous scope", "Broad indemnity",
+    "Missing cure period", "Perpetual confidentiality", "Unilateral assignment", "Automatic renewal",
+]
+RISK_WEIGHTS = [0.45, 0.3, 0.18, 0.07]
+
+
+@dataclass
+class SyntheticSection:
+    """One numbered section of a synthetic contract."""
+    number: str
+    clause_type: ClauseType
+    title: str
+    text: str
+
+
+@dataclass
+class SyntheticContract:
+    """A generated contract with the fields the pipeline would extract."""
+    id: str
+    contract_type: ContractType
+    title: str
+    parties: List[str]
+    effective_date: datetime
+    expiration_date: datetime
+    sections: List[SyntheticSection] = field(default_factory=list)
+    duplicate_of: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        header = (
+            f"{self.title.upper()}\n\n"
+            f"This Agreement is entered into as of {self.effective_date:%B %d, %Y} "
+            f"by and between {self.parties[0]} and {self.parties[1]}.\n"
+        )
+        body = "\n\n".join(f"Section {s.number}. {s.title}\n{s.text}" for s in self.sections)
+        return f"{header}\n{body}\n"
+
+
+class CorpusGenerator:
+    """Seeded generator of synthetic contracts.
+
+    Section counts follow a log-normal around `mean_sections`, sentences per
+    section a log-normal around `mean_sentences`. With probability
+    `duplicate_rate` a contract is a near-duplicate of a recent one: same
+    sections with different parties, dates and amounts.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        duplicate_rate: float = 0.0,
+        mean_sections: int = 12,
+        max_sections: int = 120,
+        mean_sentences: float = 3.0,
+        length_sigma: float = 0.5
+    ):
+        self.rng = random.Random(seed)
+        self.duplicate_rate = duplicate_rate
+        self.mean_sections = mean_sections
+        self.max_sections = max_sections
+        self.mean_sentences = mean_sentences
+        self.length_sigma = length_sigma
+        self._recent: List[SyntheticContract] = []
+
+    def _lognormal(self, mean: float, upper: int) -> int:
+        value = self.rng.lognormvariate(math.log(mean), self.length_sigma)
+        return max(1, min(upper, round(value)))
+
+    def _slots(self, parties: List[str]) -> dict:
+        return {
+            "a": parties[0],
+            "b": parties[1],
+            "days": self.rng.choice([5, 10, 15, 30, 45, 60, 90]),
+            "years": self.rng.randint(1, 5),
+            "amount": f"{self.rng.randint(1, 500) * 1000:,}",
+            "rate": self.rng.choice(["1", "1.5", "2"]),
+            "state": self.rng.choice(STATES),
+        }
+
+    def section(self, number: int, clause_type: ClauseType, parties: List[str], sentences: Optional[int] = None) -> SyntheticSection:
+        """Generate one section of a clause type."""
+        templates = CLAUSE_SENTENCES[clause_type]
+        count = sentences or self._lognormal(self.mean_sentences, 20)
+        slots = self._slots(parties)
+        text = " ".join(self.rng.choice(templates).format(**slots) for _ in range(count))
+        title = clause_type.value.replace("_", " ").title()
+        return SyntheticSection(str(number), clause_type, title, text)
+
+    def contract(
+        self,
+        contract_type: Optional[ContractType] = None,
+        sections: Optional[int] = None,
+        sentences: Optional[int] = None
+    ) -> SyntheticContract:
+        """Generate one contract, with all its core clause types first."""
+        contract_type = contract_type or self.rng.choice(list(ContractType))
+        parties = self.rng.sample(PARTY_NAMES, 2)
+        count = sections or self._lognormal(self.mean_sections, self.max_sections)
+
+        clause_types = list(CORE_CLAUSES[contract_type])
+        all_types = list(ClauseType)
+        while len(clause_types) < count:
+            clause_types.append(self.rng.choice(all_types))
+
+        effective = datetime(2018, 1, 1) + timedelta(days=self.rng.randint(0, 2500))
+        return SyntheticContract(
+            id=str(uuid.UUID(int=self.rng.getrandbits(128), version=4)),
+            contract_type=contract_type,
+            title=f"{contract_type.value.title()} Agreement",
+            parties=parties,
+            effective_date=effective,
+            expiration_date=effective + timedelta(days=365 * self.rng.randint(1, 5)),
+            sections=[
+                self.section(i + 1, clause_type, parties, sentences)
+                for i, clause_type in enumerate(clause_types[:count])
+            ],
+        )
+
+    def near_duplicate(self, original: SyntheticContract) -> SyntheticContract:
+        """Copy a contract with new parties, dates and amounts in a few sections."""
+        parties = self.rng.sample(PARTY_NAMES, 2)
+        sections = []
+        for s in original.sections:
+            text = s.text.replace(original.parties[0], parties[0]).replace(original.parties[1], parties[1])
+            if self.rng.random() < 0.1:
+                text = self.section(int(s.number), s.clause_type, parties).text
+            sections.append(replace(s, text=text))
+        shift = timedelta(days=self.rng.randint(1, 400))
+        return replace(
+            original,
+            id=str(uuid.UUID(int=self.rng.getrandbits(128), version=4)),
+            parties=parties,
+            effective_date=original.effective_date + shift,
+            expiration_date=original.expiration_date + shift,
+            sections=sections,
+            duplicate_of=original.id,
+        )
+
+    def generate(self, count: int) -> Iterator[SyntheticContract]:
+        """Yield `count` contracts, including near-duplicates at the configured rate."""
+        for _ in range(count):
+            if self._recent and self.rng.random() < self.duplicate_rate:
+                contract = self.near_duplicate(self.rng.choice(self._recent))
+            else:
+                contract = self.contract()
+                self._recent.append(contract)
+                if len(self._recent) > 1000:
+                    self._recent.pop(0)
+            yield contract
+
+
+def write_txt(contract: SyntheticContract, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(contract.text)
+
+
+def write_docx(contract: SyntheticContract, path: str):
+    """Write a DOCX with automatically numbered section headings and a fee schedule table."""
+    from docx import Document
+
+    document = Document()
+    document.add_heading(contract.title.upper(), level=1)
+    document.add_paragraph(contract.text.split("\n\n", 2)[1])
+    for s in contract.sections:
+        # Numbered by Word ("1."), not in the paragraph text
+        document.add_paragraph(style="List Number").add_run(s.title).bold = True
+        # One run per sentence, as edited documents end up with
+        paragraph = document.add_paragraph()
+        for sentence in re.split(r"(?<=\.) ", s.text):
+            paragraph.add_run(sentence + " ")
+    document.add_paragraph("Schedule A. Fees and Service Levels")
+    rows = fee_schedule(contract)
+    table = document.add_table(rows=len(rows), cols=len(rows[0]))
+    table.style = "Table Grid"
+    for row, values in zip(table.rows, rows):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    document.save(path)
+
+
+FEE_SERVICES = [
+    "Platform subscription", "Premium support", "Implementation", "Data migration", "Training day",
+    "Additional user seat", "Storage (per TB)", "API calls (per million)", "Dedicated environment",
+    "Custom integration", "Disaster recovery", "Security review",
+]
+
+
+def fee_schedule(contract: SyntheticContract) -> List[List[str]]:
+    """Fee schedule table rows (header first) for a contract."""
+    rng = random.Random(contract.id)
+    rows = [["Service", "Unit", "Rate (USD)", "Minimum Term", "Service Level"]]
+    for service in rng.sample(FEE_SERVICES, rng.randint(6, len(FEE_SERVICES))):
+        rows.append([
+            service,
+            rng.choice(["per month", "per year", "one-time", "per unit"]),
+            f"{rng.randint(1, 250) * 100:,}.00",
+            f"{rng.choice([1, 3, 6, 12, 24])} months",
+            f"{rng.choice(['99.5', '99.9', '99.95'])}% uptime",
+        ])
+    return rows
+
+
+def _draw_table(page, rows: List[List[str]], top: float, widths: List[float], left: float = 50, height: float = 16):
+    right = left + sum(widths)
+    for r, row in enumerate(rows):
+        y = top + r * height
+        page.draw_line((left, y), (right, y))
+        x = left
+        for width, value in zip(widths, row):
+            page.insert_text((x + 3, y + 11), value, fontsize=8)
+            x += width
+    bottom = top + len(rows) * height
+    page.draw_line((left, bottom), (right, bottom))
+    x = left
+    for width in [0] + widths:
+        x += width
+        page.draw_line((x, top), (x, bottom))
+
+
+def write_pdf(contract: SyntheticContract, path: str, lines_per_page: int = 60):
+    """Write a paginated PDF with a running header, page numbers and a ruled fee schedule."""
+    import fitz  # PyMuPDF
+
+    lines: List[str] = []
+    for paragraph in contract.text.split("\n"):
+        lines.extend(textwrap.wrap(paragraph, 95) or [""])
+
+    starts = list(range(0, len(lines), lines_per_page))
+    total = len(starts) + 1
+    document = fitz.open()
+    for number, start in enumerate(starts, 1):
+        page = document.new_page()
+        page.insert_text((50, 30), f"{contract.title} - Confidential", fontsize=8)
+        page.insert_text((50, 60), "\n".join(lines[start:start + lines_per_page]), fontsize=9)
+        page.insert_text((270, 815), f"Page {number} of {total}", fontsize=8)
+
+    page = document.new_page()
+    page.insert_text((50, 30), f"{contract.title} - Confidential", fontsize=8)
+    page.insert_text((50, 60), "Schedule A. Fees and Service Levels", fontsize=10)
+    _draw_table(page, fee_schedule(contract), 75, [140, 70, 80, 90, 100])
+    page.insert_text((270, 815), f"Page {total} of {total}", fontsize=8)
+    document.save(path)
+    document.close()
+
+
+WRITERS = {"txt": write_txt, "docx": write_docx, "pdf": write_pdf}
+
+
+def write_files(contracts: Iterable[SyntheticContract], out_dir: str, formats: List[str]) -> int:
+    """Write contracts to `out_dir`, cycling through `formats`."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = 0
+    for i, contract in enumerate(contracts):
+        extension = formats[i % len(formats)]
+        WRITERS[extension](contract, os.path.join(out_dir, f"{contract.id}.{extension}"))
+        written += 1
+    return written
+
+
+def _risk_rows(gen: CorpusGenerator, contract: SyntheticContract, now: datetime) -> List[dict]:
+    rng = gen.rng
+    rows = []
+    for s in contract.sections:
+        level = rng.choices(list(RiskLevel), RISK_WEIGHTS)[0]
+        score = round(0.25 * list(RiskLevel).index(level) + rng.uniform(0.0, 0.25), 2)
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "contract_id": contract.id,
+            "clause_type": s.clause_type,
+            "title": s.title,
+            "text": s.text,
+            "section_number": s.number,
+            "page_number": None,
+            "risk_level": level,
+            "risk_score": score,
+            "risk_factors": rng.sample(RISK_FACTORS, rng.randint(0, 3)),
+            "key_terms": s.title.lower().split(),
+            "related_clauses": [],
+            "analysis": f"{level.value.title()} risk: the {s.title.lower()} terms favour {contract.parties[0]}.",
+            "created_at": now,
+        })
+    return rows
+
+
+def load_corpus(
+    database_url: str,
+    contracts: int,
+    gen: CorpusGenerator,
+    batch_size: int = 2000,
+    include_raw_text: bool = True
+) -> Dict[str, int]:
+    """Bulk-insert generated contracts and clauses with risk fields populated.
+
+    Uses a synchronous engine and multi-row Core inserts; on SQLite the
+    journal is relaxed for the duration of the load.
+    """
+    from sqlalchemy import create_engine, event, insert
+    from sqlalchemy.engine import make_url
+
+    from app.core.database import Base
+    from app.models.clause import Clause
+    from app.models.contract import Contract
+    import app.models.amendment  # noqa: F401  (register the table)
+
+    url = make_url(database_url)
+    url = url.set(drivername=url.get_backend_name())
+    engine = create_engine(url)
+    if url.get_backend_name() == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _fast_sqlite(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+    Base.metadata.create_all(engine)
+
+    totals = {"contracts": 0, "clauses": 0}
+    contract_rows: List[dict] = []
+    clause_rows: List[dict] = []
+
+    def flush(conn):
+        if contract_rows:
+            conn.execute(insert(Contract.__table__), contract_rows)
+        if clause_rows:
+            conn.execute(insert(Clause.__table__), clause_rows)
+        totals["contracts"] += len(contract_rows)
+        totals["clauses"] += len(clause_rows)
+        contract_rows.clear()
+        clause_rows.clear()
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for contract in gen.generate(contracts):
+            clauses = _risk_rows(gen, contract, now)
+            worst = max((c["risk_score"] for c in clauses), default=0.0)
+            contract_rows.append({
+                "id": contract.id,
+                "filename": f"{contract.id}.txt",
+                "title": contract.title,
+                "contract_type": contract.contract_type,
+                "status": ContractStatus.ANALYZED,
+                "parties": contract.parties,
+                "effective_date": contract.effective_date,
+                "expiration_date": contract.expiration_date,
+                "raw_text": contract.text if include_raw_text else None,
+                "summary": f"{contract.title} between {contract.parties[0]} and {contract.parties[1]}.",
+                "metadata": {"synthetic": True, "duplicate_of": contract.duplicate_of},
+                "risk_score": "high" if worst >= 0.75 else "medium" if worst >= 0.5 else "low",
+                "overall_assessment": "Synthetic contract for scale testing.",
+                "created_at": now,
+                "updated_at": now,
+            })
+            clause_rows.extend(clauses)
+            if len(clause_rows) >= batch_size:
+                flush(conn)
+        flush(conn)
+
+    engine.dispose()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Fraction of near-duplicates")
+    parser.add_argument("--mean-sections", type=int, default=12)
+    parser.add_argument("--mean-sentences", type=float, default=3.0)
+    parser.add_argument("--length-sigma", type=float, default=0.5, help="Log-normal spread of lengths")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    files = commands.add_parser("files", help="Write contract documents to a directory")
+    files.add_argument("out_dir")
+    files.add_argument("--count", type=int, default=100)
+    files.add_argument("--formats", default="txt,docx,pdf")
+
+    load = commands.add_parser("load", help="Insert contracts and clauses into a database")
+    load.add_argument("--contracts", type=int, default=10000)
+    load.add_argument("--database-url", help="Defaults to DATABASE_URL from settings")
+    load.add_argument("--batch-size", type=int, default=2000, help="Clause rows per insert")
+    load.add_argument("--no-raw-text", action="store_true", help="Skip storing full contract text")
+
+    args = parser.parse_args()
+    gen = CorpusGenerator(
+        seed=args.seed,
+        duplicate_rate=args.duplicate_rate,
+        mean_sections=args.mean_sections,
+        mean_sentences=args.mean_sentences,
+        length_sigma=args.length_sigma,
+    )
+
+    start = time.perf_counter()
+    if args.command == "files":
+        written = write_files(gen.generate(args.count), args.out_dir, args.formats.split(","))
+        print(f"Wrote {written} contracts to {args.out_dir} in {time.perf_counter() - start:.1f}s")
+    else:
+        from app.core.config import settings
+
+        totals = load_corpus(
+            args.database_url or settings.database_url,
+            args.contracts,
+            gen,
+            batch_size=args.batch_size,
+            include_raw_text=not args.no_raw_text,
+        )
+        elapsed = time.perf_counter() - start
+        print(
+            f"Loaded {totals['contracts']} contracts and {totals['clauses']} clauses "
+            f"in {elapsed:.1f}s ({totals['clauses'] / elapsed:,.0f} clauses/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Peak memory of ingesting very large documents.
+
+Writes one large synthetic contract (TXT by default), then in a fresh
+process per stage and mode runs `--jobs` concurrent jobs over it against
+the fake LLM while sampling resident memory. Stages:
+
+    summary    text extraction, metadata and the summary call
+    ingest     all of `ingest_file`, i.e. the analysis pipeline; the
+               clause records themselves grow with the document
+
+Modes:
+
+    bounded    text above TEXT_SPILL_THRESHOLD spilled and memory-mapped,
+               LLM calls within JOB_MEMORY_BUDGET per job (the defaults)
+    unbounded  the whole text in memory, no budget
+
+Peak RSS counts file-backed pages of the memory map, which the kernel can
+drop at any time; anonymous RSS is what actually presses against a
+worker's memory limit.
+
+Usage:
+    python -m benchmarks.memory --megabytes 20 --jobs 2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from benchmarks.pipeline import RESULTS_DIR, RssSampler, _rss_bytes
+
+MODES = {
+    "bounded": {},
+    "unbounded": {"TEXT_SPILL_THRESHOLD": "0", "JOB_MEMORY_BUDGET": "0"},
+}
+
+
+def _anon_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return _rss_bytes()
+
+
+class AnonRssSampler(RssSampler):
+    """Tracks peak anonymous (non file-backed) resident memory."""
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _anon_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "AnonRssSampler":
+        super().__enter__()
+        self.peak = _anon_rss_bytes()
+        return self
+
+
+def write_document(path: str, megabytes: float, seed: int, extension: str):
+    """Write a synthetic contract of about `megabytes` of text."""
+    from benchmarks.corpus import WRITERS, CorpusGenerator
+
+    generator = CorpusGenerator(seed=seed)
+    probe = generator.contract(sections=200)
+    sections = math.ceil(megabytes * 2**20 / (len(probe.text) / 200))
+    WRITERS[extension](generator.contract(sections=sections), path)
+
+
+def child(path: str, jobs: int, stage: str) -> dict:
+    """Run `jobs` concurrent jobs over copies of a document inside this (fresh) process."""
+    import shutil
+    import uuid
+
+    from app.agents.document_parser import DocumentParserAgent
+    from app.core.database import async_session_maker, init_db
+    from app.core.memory_budget import memory_budget
+    from app.core.metrics import JOB_MEMORY_WAITS
+    from app.core.text_store import DocumentText, spill_path
+    from app.services.ingestion import ingest_file
+    from app.services.metadata import extract_metadata
+
+    async def summarize(file_path: str):
+        parser = DocumentParserAgent()
+        text = await asyncio.to_thread(parser.extract_contract_text, file_path, spill_path(str(uuid.uuid4())))
+        try:
+            metadata = await asyncio.to_thread(extract_metadata, text)
+            with memory_budget():
+                await parser.analyze(text, known_fields=metadata.confident_fields())
+        finally:
+            if isinstance(text, DocumentText):
+                text.close()
+
+    async def ingest(file_path: str):
+        async with async_session_maker() as db:
+            await ingest_file(db, str(uuid.uuid4()), file_path, os.path.basename(file_path))
+
+    job = summarize if stage == "summary" else ingest
+
+    async def run() -> dict:
+        await init_db()
+        # Warm imports, models and pools outside the measurement
+        warm = os.path.join(os.path.dirname(path), "warm.txt")
+        with open(warm, "w", encoding="utf-8") as f:
+            f.write("Section 1. Payment\nFees are due monthly.\n")
+        await job(warm)
+
+        copies = []
+        for i in range(jobs):
+            copies.append(f"{path}.{i}{os.path.splitext(path)[1]}")
+            shutil.copyfile(path, copies[-1])
+
+        baseline, baseline_anon = _rss_bytes(), _anon_rss_bytes()
+        with RssSampler() as rss, AnonRssSampler() as anon:
+            start = time.perf_counter()
+            await asyncio.gather(*[job(copy) for copy in copies])
+            elapsed = time.perf_counter() - start
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "baseline_rss_mb": round(baseline / 2**20, 1),
+            "peak_rss_mb": round(rss.peak / 2**20, 1),
+            "peak_anon_rss_mb": round(anon.peak / 2**20, 1),
+            "anon_rss_per_job_mb": round((anon.peak - baseline_anon) / jobs / 2**20, 1),
+            "memory_budget_waits": int(sum(JOB_MEMORY_WAITS.values.values())),
+        }
+
+    return asyncio.run(run())
+
+
+def run_mode(args: argparse.Namespace, stage: str, mode: str, document: str, workdir: str) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{workdir}/{stage}-{mode}.db",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+        CHROMA_PERSIST_DIR=os.path.join(workdir, "chroma"),
+        TEXT_SPILL_DIR=os.path.join(workdir, "text"),
+        LLM_PROVIDER="fake",
+        LLM_ROUTES="{}",
+        FAKE_LLM_LATENCY=str(args.latency),
+        LLM_CONCURRENCY_MAX=str(args.llm_concurrency),
+        LLM_CONCURRENCY_INITIAL=str(args.llm_concurrency),
+        TRACING_EXPORTER="none",
+    )
+    if args.budget is not None:
+        env["JOB_MEMORY_BUDGET"] = str(int(args.budget * 2**20))
+    env.update(MODES[mode])
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory", "--child", document, "--jobs", str(args.jobs), "--stages", stage],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return {"stage": stage, "mode": mode, **json.loads(output.strip().splitlines()[-1])}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of large-document ingestion")
+    parser.add_argument("--megabytes", type=float, default=20, help="Text size of the document")
+    parser.add_argument("--format", choices=["txt", "docx", "pdf"], default="txt")
+    parser.add_argument("--jobs", type=int, default=2, help="Concurrent ingestion jobs")
+    parser.add_argument("--modes", default="bounded,unbounded")
+    parser.add_argument("--stages", default="summary,ingest", help="summary: extraction, metadata and summary; ingest: also clauses")
+    parser.add_argument("--budget", type=float, help="JOB_MEMORY_BUDGET in MB for the bounded mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency (s)")
+    parser.add_argument("--llm-concurrency", type=int, default=32, help="Max in-flight fake LLM calls")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/memory-<time>.json)")
+    parser.add_argument("--child", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.jobs, args.stages)))
+        return 0
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="contract-memory-") as workdir:
+        document = os.path.join(workdir, f"large.{args.format}")
+        write_document(document, args.megabytes, args.seed, args.format)
+        print(f"document: {os.path.getsize(document) / 2**20:.1f} MB {args.format}, {args.jobs} concurrent jobs")
+        for stage in args.stages.split(","):
+            for mode in args.modes.split(","):
+                run = run_mode(args, stage, mode, document, workdir)
+                runs.append(run)
+                print(
+                    f"{stage:<8} {mode:<10} elapsed={run['elapsed_seconds']}s peak_rss={run['peak_rss_mb']}MB "
+                    f"peak_anon_rss={run['peak_anon_rss_mb']}MB per_job={run['anon_rss_per_job_mb']}MB "
+                    f"budget_waits={run['memory_budget_waits']}"
+                )
+
+    results = {
+        "benchmark": "memory",
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "child")},
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"memory-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
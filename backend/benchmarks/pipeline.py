@@ -0,0 +1,270 @@
+"""End-to-end benchmark of the analysis pipeline against the fake LLM.
+
+Drives the real FastAPI app in-process through upload -> assess-all-risks ->
+generate amendments, for every combination of document size and
+concurrency, with a fresh SQLite database per run.
+
+Usage:
+    python -m benchmarks.pipeline --sizes 5,25,100 --concurrency 1,8 --documents 20
+    python -m benchmarks.pipeline --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is a lifetime peak: KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Tracks peak resident memory on a background thread."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = _rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def configure(args: argparse.Namespace, workdir: str):
+    """Point the app at a scratch database and the fake LLM.
+
+    Must run before anything under `app` is imported, since settings are
+    read at import time.
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/bench.db",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "CHROMA_PERSIST_DIR": os.path.join(workdir, "chroma"),
+        "LLM_PROVIDER": "fake",
+        "LLM_ROUTES": "{}",
+        "FAKE_LLM_LATENCY": str(args.latency),
+        "FAKE_LLM_LATENCY_JITTER": str(args.jitter),
+        "FAKE_LLM_LATENCY_DISTRIBUTION": args.distribution,
+        "FAKE_LLM_FAILURE_RATE": str(args.failure_rate),
+        "FAKE_LLM_SEED": str(args.seed),
+        "LLM_CONCURRENCY_MAX": str(args.llm_concurrency),
+        "LLM_CONCURRENCY_INITIAL": str(args.llm_concurrency),
+        "TRACING_EXPORTER": "none",
+    })
+
+
+async def run_document(client, text: str, name: str) -> Dict[str, float]:
+    """Run one document through the pipeline, returning per-step seconds."""
+    timings = {}
+    start = time.perf_counter()
+    response = await client.post("/api/contracts", files={"file": (name, text.encode("utf-8"), "text/plain")})
+    response.raise_for_status()
+    contract_id = response.json()["id"]
+    timings["upload"] = time.perf_counter() - start
+
+    step = time.perf_counter()
+    response = await client.post(f"/api/clauses/contract/{contract_id}/assess-all-risks")
+    response.raise_for_status()
+    timings["assess"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    response = await client.post(f"/api/amendments/contract/{contract_id}/generate")
+    response.raise_for_status()
+    timings["amend"] = time.perf_counter() - step
+
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+async def run_cell(client, args: argparse.Namespace, sections: int, concurrency: int) -> dict:
+    """Benchmark one (document size, concurrency) combination."""
+    from app.core.metrics import DB_QUERY_SECONDS
+    from benchmarks.corpus import CorpusGenerator
+
+    gen = CorpusGenerator(seed=args.seed)
+    documents = [
+        gen.contract(sections=sections, sentences=args.sentences_per_section).text
+        for _ in range(args.documents)
+    ]
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Dict[str, float]] = []
+    failures = 0
+
+    async def worker(index: int, text: str):
+        nonlocal failures
+        async with semaphore:
+            try:
+                results.append(await run_document(client, text, f"bench-{sections}-{index}.txt"))
+            except Exception:
+                failures += 1
+
+    db_count, db_seconds = DB_QUERY_SECONDS.totals()
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i, text) for i, text in enumerate(documents)])
+        elapsed = time.perf_counter() - start
+    db_count_after, db_seconds_after = DB_QUERY_SECONDS.totals()
+
+    totals = [r["total"] for r in results]
+    return {
+        "sections": sections,
+        "concurrency": concurrency,
+        "documents": len(documents),
+        "failures": failures,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_docs_per_second": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(totals, 0.50), 4),
+            "p95": round(percentile(totals, 0.95), 4),
+            "p99": round(percentile(totals, 0.99), 4),
+        },
+        "step_p50_seconds": {
+            step: round(percentile([r[step] for r in results], 0.50), 4)
+            for step in ("upload", "assess", "amend")
+        },
+        "db_queries": db_count_after - db_count,
+        "db_seconds": round(db_seconds_after - db_seconds, 4),
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+    }
+
+
+async def run(args: argparse.Namespace) -> List[dict]:
+    import httpx
+    from app.main import app
+
+    cells = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for sections in args.sizes:
+                for concurrency in args.concurrency:
+                    cell = await run_cell(client, args, sections, concurrency)
+                    cells.append(cell)
+                    print_cell(cell)
+    return cells
+
+
+def print_cell(cell: dict):
+    latency = cell["latency_seconds"]
+    print(
+        f"sections={cell['sections']:<5} concurrency={cell['concurrency']:<3} "
+        f"docs/s={cell['throughput_docs_per_second']:<8} p50={latency['p50']:.3f}s "
+        f"p95={latency['p95']:.3f}s p99={latency['p99']:.3f}s db={cell['db_seconds']:.3f}s "
+        f"rss={cell['peak_rss_mb']}MB failures={cell['failures']}"
+    )
+
+
+def compare(cells: List[dict], baseline: dict, tolerance: float) -> List[str]:
+    """List regressions against a baseline run beyond `tolerance` (a fraction)."""
+    previous = {(c["sections"], c["concurrency"]): c for c in baseline["cells"]}
+    regressions = []
+    for cell in cells:
+        before = previous.get((cell["sections"], cell["concurrency"]))
+        if before is None:
+            continue
+        label = f"sections={cell['sections']} concurrency={cell['concurrency']}"
+        checks = [
+            ("throughput", before["throughput_docs_per_second"], cell["throughput_docs_per_second"], False),
+            ("p95", before["latency_seconds"]["p95"], cell["latency_seconds"]["p95"], True),
+            ("db_seconds", before["db_seconds"], cell["db_seconds"], True),
+        ]
+        for name, old, new, higher_is_worse in checks:
+            if not old:
+                continue
+            change = (new - old) / old
+            print(f"  {label} {name}: {old} -> {new} ({change:+.1%})")
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append(f"{label} {name} {change:+.1%}")
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the contract analysis pipeline")
+    parser.add_argument("--sizes", type=_int_list, default=[5, 25, 100], help="Sections per document")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="Documents in flight")
+    parser.add_argument("--documents", type=int, default=20, help="Documents per combination")
+    parser.add_argument("--sentences-per-section", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median fake LLM latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Uniform jitter (s) or lognormal sigma")
+    parser.add_argument("--distribution", choices=["uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-concurrency", type=int, default=32, help="Max in-flight fake LLM calls")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/pipeline-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression fraction")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="contract-bench-") as workdir:
+        configure(args, workdir)
+        cells = asyncio.run(run(args))
+
+    results = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "cells": cells,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(cells, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Cold-start benchmark of the API process.
+
+Each run starts a fresh interpreter that imports `app.main`, runs the
+lifespan startup, sends its first request and then polls `/ready` until
+background warm-up finishes. Every timing is measured from interpreter
+start, and the run also records which heavy modules the import pulled in
+eagerly.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --baseline benchmarks/results/startup-baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.pipeline import RESULTS_DIR, percentile
+
+# Should stay out of `import app.main`; warm-up loads them in the background
+HEAVY_MODULES = ["langchain_core", "langgraph", "fitz", "docx", "app.agents", "app.workflows.pipeline", "numpy"]
+METRICS = ["import_s", "startup_s", "first_request_s", "ready_s"]
+
+
+def child(first_path: str) -> dict:
+    """Measure one cold start inside this (fresh) process."""
+    import asyncio
+
+    def since_start() -> float:
+        # Process start, so interpreter boot counts too
+        return time.time() - float(os.environ["BENCH_SPAWNED_AT"])
+
+    from app.main import app
+    timings = {"import_s": since_start()}
+    eager = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    async def run():
+        import httpx
+
+        async with app.router.lifespan_context(app):
+            timings["startup_s"] = since_start()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                response = await client.get(first_path)
+                response.raise_for_status()
+                timings["first_request_s"] = since_start()
+                while (await client.get("/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+                timings["ready_s"] = since_start()
+                ready = (await client.get("/ready")).json()
+        return ready
+
+    ready = asyncio.run(run())
+    return {**timings, "eager_modules": eager, "warmup": ready["steps"]}
+
+
+def run_once(args: argparse.Namespace, workdir: str) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{workdir}/startup.db",
+        UPLOAD_DIR=os.path.join(workdir, "uploads"),
+        WORKFLOW_CHECKPOINT_PATH=os.path.join(workdir, "checkpoints.db"),
+        LLM_PROVIDER=args.provider,
+        BENCH_SPAWNED_AT=repr(time.time()),
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", args.first_path],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs: List[dict]) -> Dict[str, float]:
+    summary = {}
+    for metric in METRICS:
+        values = [r[metric] for r in runs]
+        summary[f"{metric}_p50"] = round(percentile(values, 0.5), 4)
+        summary[f"{metric}_max"] = round(max(values), 4)
+    return summary
+
+
+def compare(summary: Dict[str, float], baseline: dict, tolerance: float) -> List[str]:
+    """Median timings that regressed beyond the tolerance."""
+    regressions = []
+    for metric in METRICS:
+        key = f"{metric}_p50"
+        old = baseline.get("summary", {}).get(key)
+        if old and summary[key] > old * (1 + tolerance):
+            regressions.append(f"{key}: {old:.3f}s -> {summary[key]:.3f}s")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark API cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="fake", help="LLM_PROVIDER for the started process")
+    parser.add_argument("--first-path", default="/api/contracts", help="First request after startup")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression fraction")
+    parser.add_argument("--child", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return 0
+
+    runs = []
+    for i in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="contract-startup-") as workdir:
+            run = run_once(args, workdir)
+        runs.append(run)
+        print(
+            f"run {i + 1}: import={run['import_s']:.3f}s startup={run['startup_s']:.3f}s "
+            f"first_request={run['first_request_s']:.3f}s ready={run['ready_s']:.3f}s"
+            + (f" eager={','.join(run['eager_modules'])}" if run["eager_modules"] else "")
+        )
+
+    summary = summarize(runs)
+    results = {
+        "benchmark": "startup",
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "child")},
+        "summary": summary,
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    eager = sorted({m for r in runs for m in r["eager_modules"]})
+    if eager:
+        print(f"Heavy modules imported at startup: {', '.join(eager)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Test settings: the fake LLM and a scratch database, set before the app is imported."""
+
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="contract-tests-")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_scratch}/test.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("WORKFLOW_CHECKPOINT_PATH", "")
+
+
+@pytest.fixture
+def llm_models(monkeypatch):
+    """Models served to routed backends, keyed by the backend's model name.
+
+    Backends without a model name use "default". Circuit breakers, limiters
+    and the router start fresh in every test.
+    """
+    from app.core import llm_routing, rate_limit, resilience
+
+    models = {}
+    monkeypatch.setattr(
+        llm_routing, "create_llm", lambda provider, model=None, base_url=None: models[model or "default"]
+    )
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    llm_routing.get_router.cache_clear()
+    yield models
+    llm_routing.get_router.cache_clear()
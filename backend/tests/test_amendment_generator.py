@@ -0,0 +1,43 @@
+"""Tests for grouped amendment generation."""
+
+import asyncio
+
+import pytest
+
+from app.agents.amendment_generator import AmendmentGeneratorAgent
+from app.core.config import settings
+from app.core.fake_llm import ContractFakeChatModel
+
+CLAUSES = [f"[liability] Clause {i}: the supplier's liability is unlimited. " * 6 for i in range(4)]
+
+
+class FailingGroupModel(ContractFakeChatModel):
+    """Contract fake model that fails every request containing one of `failing` clause numbers."""
+
+    failing: set = set()
+
+    def render(self, messages):
+        if any(f"[{n}]" in messages[-1].content for n in self.failing):
+            raise ValueError("unusable answer")
+        return super().render(messages)
+
+
+@pytest.fixture
+def one_clause_per_group(monkeypatch):
+    monkeypatch.setattr(settings, "amendment_group_tokens", 60)
+    monkeypatch.setattr(settings, "llm_circuit_failure_threshold", 100)
+
+
+def test_failed_group_keeps_the_other_groups(llm_models, one_clause_per_group):
+    llm_models["default"] = FailingGroupModel(failing={2})
+
+    suggestions = asyncio.run(AmendmentGeneratorAgent().generate(CLAUSES, "service", "Summary."))
+
+    assert {s.clause_index for s in suggestions} == {0, 2, 3}
+
+
+def test_raises_when_every_group_fails(llm_models, one_clause_per_group):
+    llm_models["default"] = FailingGroupModel(failing={1, 2, 3, 4})
+
+    with pytest.raises(ValueError):
+        asyncio.run(AmendmentGeneratorAgent().generate(CLAUSES, "service", "Summary."))
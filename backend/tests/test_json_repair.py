@@ -0,0 +1,91 @@
+"""Tests for tolerant parsing of model JSON output."""
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+from app.core.json_repair import TolerantJsonOutputParser, repair_json
+
+
+def test_valid_json_needs_no_repair():
+    output = repair_json('{"risk_level": "high", "risk_score": 0.7}')
+    assert output.value == {"risk_level": "high", "risk_score": 0.7}
+    assert not output.repaired
+    assert not output.truncated
+
+
+def test_code_fence_is_not_a_repair():
+    output = repair_json('```json\n{"a": 1}\n```')
+    assert output.value == {"a": 1}
+    assert not output.repaired
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1,}', {"a": 1}),
+    ('{"clauses": [{"a": 1}, {"a": 2},]}', {"clauses": [{"a": 1}, {"a": 2}]}),
+    ('{"clauses": [1, 2, 3,],}', {"clauses": [1, 2, 3]}),
+])
+def test_trailing_commas(text, expected):
+    output = repair_json(text)
+    assert output.value == expected
+    assert "trailing commas" in output.repairs
+    assert not output.truncated
+
+
+def test_missing_commas():
+    output = repair_json('{"a": 1 "b": 2}')
+    assert output.value == {"a": 1, "b": 2}
+    assert "missing commas" in output.repairs
+
+
+def test_single_quotes_and_python_literals():
+    output = repair_json("{'a': True, 'b': None, 'c': 'x'}")
+    assert output.value == {"a": True, "b": None, "c": "x"}
+    assert output.repaired
+
+
+@pytest.mark.parametrize("text", [
+    'Sure! Here is the analysis:\n{"a": [1, 2]}',
+    '{"a": [1, 2]}\nLet me know if you need anything else.',
+    'Here you go: {"a": [1, 2]} Hope this helps {really}',
+])
+def test_prose_wrapping(text):
+    output = repair_json(text)
+    assert output.value == {"a": [1, 2]}
+    assert "surrounding prose" in output.repairs
+
+
+def test_prose_and_fence_with_trailing_comma():
+    output = repair_json('Sure:\n```json\n{"clauses": [{"a": 1}, {"a": 2},]}\n```')
+    assert output.value == {"clauses": [{"a": 1}, {"a": 2}]}
+    assert output.repairs == ["surrounding prose", "trailing commas"]
+
+
+def test_truncated_array_keeps_complete_items():
+    output = repair_json('{"clauses": [{"a": 1}, {"a": 2}, {"a": "tru')
+    assert output.value == {"clauses": [{"a": 1}, {"a": 2}]}
+    assert output.truncated
+
+
+def test_truncated_after_complete_item():
+    output = repair_json('{"clauses": [{"a": 1}, {"a": 2}')
+    assert output.value == {"clauses": [{"a": 1}, {"a": 2}]}
+    assert output.truncated
+
+
+def test_truncated_number_is_dropped():
+    # "3" may have been the start of "35"
+    output = repair_json("[1, 2, 3")
+    assert output.value == [1, 2]
+    assert output.truncated
+
+
+@pytest.mark.parametrize("text", ["no json here", '{"clauses": [{"a": "tru'])
+def test_unusable_output_raises(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
+
+
+def test_parser_reports_unusable_output_as_parse_failure():
+    parser = TolerantJsonOutputParser(agent="test")
+    with pytest.raises(OutputParserException):
+        parser.parse_output("I cannot help with that.")
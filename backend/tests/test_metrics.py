@@ -0,0 +1,20 @@
+"""Tests for the Prometheus text exposition."""
+
+import pytest
+
+from app.core.metrics import Counter, Metric
+
+
+def test_label_values_are_escaped():
+    errors = Counter("test_errors_total", "Errors", ["error"])
+    errors.inc(error='bad "quote" in C:\\path\nsecond line')
+
+    sample = list(errors.samples())[0]
+
+    assert sample == 'test_errors_total{error="bad \\"quote\\" in C:\\\\path\\nsecond line"} 1'
+    assert "\n" not in sample
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("test_untyped", "Untyped")
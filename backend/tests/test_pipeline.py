@@ -0,0 +1,57 @@
+"""Tests for the analysis pipeline's clause stage."""
+
+import asyncio
+import uuid
+
+from app.core.config import settings
+from app.core.database import async_session_maker, init_db
+from app.core.fake_llm import ContractFakeChatModel
+from app.models.contract import Contract, ContractStatus
+from app.workflows.pipeline import extract_clauses
+
+SECTIONS = 12
+TEXT = "\n\n".join(
+    f"Section {i}. Obligation {i}\n" + f"The supplier shall perform obligation {i} with due care. " * 25
+    for i in range(1, SECTIONS + 1)
+)
+
+
+class SlowLastChunkModel(ContractFakeChatModel):
+    """Logs each call; extracting the chunk with the last section is slow."""
+
+    events: list = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        system, text = messages[0].content, messages[-1].content
+        if "clause identification" in system:
+            if f"Section {SECTIONS}." in text:
+                await asyncio.sleep(0.5)
+            self.events.append("extracted")
+        elif "risk analyst" in system:
+            self.events.append("assessed")
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+def test_clauses_are_assessed_while_later_chunks_are_extracted(llm_models, monkeypatch):
+    # A small window splits the contract into several chunks
+    monkeypatch.setattr(settings, "llm_context_windows", {"fake": 2500})
+    model = llm_models["default"] = SlowLastChunkModel(events=[])
+    contract_id = str(uuid.uuid4())
+
+    async def run():
+        await init_db()
+        async with async_session_maker() as db:
+            db.add(Contract(
+                id=contract_id, filename="a.txt", title="a.txt", status=ContractStatus.PARSING, raw_text=TEXT
+            ))
+            await db.commit()
+        return await extract_clauses({"contract_id": contract_id, "context": "Supply agreement."})
+
+    result = asyncio.run(run())
+
+    assert model.events.count("extracted") > 1
+    assert len(result["clause_ids"]) == SECTIONS
+    assert sorted(result["assessed"]) == sorted(result["clause_ids"])
+    # Assessment started before the slow chunk finished extracting
+    last_extracted = len(model.events) - 1 - model.events[::-1].index("extracted")
+    assert model.events.index("assessed") < last_extracted
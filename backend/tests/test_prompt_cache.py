@@ -0,0 +1,88 @@
+"""Tests for stable prompt prefixes across the clauses of a contract."""
+
+import asyncio
+from typing import List
+
+from langchain_core.messages import BaseMessage
+
+from app.agents.amendment_generator import AmendmentGeneratorAgent
+from app.agents.risk_analyzer import RiskAnalyzerAgent
+from app.core.fake_llm import ContractFakeChatModel
+from app.core.prompt_cache import cache_scope, prefix_key
+
+CONTRACT_CONTEXT = "MASTER SERVICES AGREEMENT between Acme Corp and Globex LLC. " * 40
+CLAUSES = [
+    ("payment", "Payment", "4.1", "Invoices are payable within thirty days."),
+    ("liability", "Limitation of Liability", "9", "Neither party is liable for indirect damages. " * 30),
+    ("termination", "", "", "Either party may terminate on notice."),
+]
+
+
+class RecordingModel(ContractFakeChatModel):
+    """Contract fake model that keeps every prompt it was sent."""
+
+    prompts: List[List[BaseMessage]] = []
+
+    def render(self, messages: List[BaseMessage]) -> str:
+        self.prompts.append(messages)
+        return super().render(messages)
+
+
+def _prefix(messages: List[BaseMessage]) -> List[tuple]:
+    return [(m.type, m.content) for m in messages[:-1]]
+
+
+def test_risk_prompts_share_a_byte_identical_prefix(llm_models):
+    model = llm_models["default"] = RecordingModel(prompt_cache=True, prompts=[])
+    agent = RiskAnalyzerAgent()
+
+    async def assess_all():
+        with cache_scope("contract-1"):
+            for clause_type, title, section, text in CLAUSES:
+                await agent.analyze_clause(
+                    clause_text=text,
+                    clause_type=clause_type,
+                    clause_title=title,
+                    section_number=section,
+                    contract_context=CONTRACT_CONTEXT
+                )
+
+    asyncio.run(assess_all())
+
+    assert len(model.prompts) == len(CLAUSES)
+    first = _prefix(model.prompts[0])
+    assert all(_prefix(prompt) == first for prompt in model.prompts[1:])
+    assert len({prefix_key(prompt) for prompt in model.prompts}) == 1
+    # Only the final message differs, and it carries the clause
+    for prompt, (_, _, _, text) in zip(model.prompts, CLAUSES):
+        assert text.strip()[:40] in prompt[-1].content
+
+
+def test_fake_model_reports_repeated_prefix_as_cached():
+    model = ContractFakeChatModel(prompt_cache=True)
+    agent = RiskAnalyzerAgent()
+    fixed = {"format_instructions": agent.parser.get_format_instructions(), "contract_context": CONTRACT_CONTEXT}
+
+    def usage(clause_type, title, section, text):
+        messages = agent.prompt.format_messages(
+            clause_text=text, clause_type=clause_type, clause_title=title, section_number=section, **fixed
+        )
+        return asyncio.run(model.ainvoke(messages)).usage_metadata
+
+    first, second = usage(*CLAUSES[0]), usage(*CLAUSES[1])
+    assert first["input_token_details"]["cache_read"] == 0
+    assert 0 < second["input_token_details"]["cache_read"] < second["input_tokens"]
+
+
+def test_amendment_groups_share_the_summary_prefix(llm_models, monkeypatch):
+    from app.core.config import settings
+
+    model = llm_models["default"] = RecordingModel(prompt_cache=True, prompts=[])
+    # Small groups, so the clauses are spread over several calls
+    monkeypatch.setattr(settings, "amendment_group_tokens", 200)
+    clauses = [f"[{clause_type}] {text}\nRisk: high" for clause_type, _, _, text in CLAUSES]
+
+    asyncio.run(AmendmentGeneratorAgent().generate(clauses, "service", "Summary of the agreement."))
+
+    assert len(model.prompts) > 1
+    assert len({prefix_key(prompt) for prompt in model.prompts}) == 1
@@ -0,0 +1,179 @@
+"""Tests for LLM deadlines, retries, failover, circuit breaking and hedging."""
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from app.core.config import settings
+from app.core.fake_llm import FakeChatModel, FakeLLMError
+from app.core.llm import LLMTask
+from app.core.llm_routing import get_router
+from app.core.resilience import CircuitBreaker, CircuitOpenError, CircuitState, LLMTimeoutError
+
+PROMPT = [HumanMessage(content="Assess this clause.")]
+
+
+@pytest.fixture
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.01)
+    monkeypatch.setattr(settings, "llm_retry_max_delay", 0.02)
+    monkeypatch.setattr(settings, "llm_circuit_failure_threshold", 2)
+    monkeypatch.setattr(settings, "llm_circuit_reset_seconds", 30.0)
+    monkeypatch.setattr(settings, "llm_timeouts", {"risk_analysis": 0.3})
+
+
+def _route(monkeypatch, *backends):
+    monkeypatch.setattr(settings, "llm_routes", {"risk_analysis": list(backends)})
+    return get_router().route(LLMTask.RISK_ANALYSIS)
+
+
+def test_fails_over_to_the_next_backend(llm_models, fast_settings, monkeypatch):
+    llm_models["bad"] = FakeChatModel(failure_rate=1.0)
+    llm_models["good"] = FakeChatModel(response="ok")
+    routed = _route(
+        monkeypatch, {"provider": "fake", "model": "bad", "weight": 1e6}, {"provider": "fake", "model": "good"}
+    )
+
+    result = asyncio.run(routed.ainvoke(PROMPT))
+
+    assert result.content == "ok"
+    assert llm_models["good"].calls == 1
+    assert routed.backends[0].stats.errors == 1
+
+
+def test_retries_transient_errors(llm_models, fast_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_attempts", 3)
+    monkeypatch.setattr(settings, "llm_circuit_failure_threshold", 10)
+    llm_models["default"] = FakeChatModel(failure_rate=1.0)
+    routed = _route(monkeypatch, {"provider": "fake"})
+
+    with pytest.raises(FakeLLMError):
+        asyncio.run(routed.ainvoke(PROMPT))
+
+    assert routed.backends[0].stats.errors == 3
+
+
+def test_breaker_opens_after_consecutive_failures(llm_models, fast_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_attempts", 1)
+    llm_models["default"] = FakeChatModel(failure_rate=1.0)
+    routed = _route(monkeypatch, {"provider": "fake"})
+
+    for _ in range(2):
+        with pytest.raises(FakeLLMError):
+            asyncio.run(routed.ainvoke(PROMPT))
+    assert routed.backends[0].breaker.state == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(routed.ainvoke(PROMPT))
+    assert routed.backends[0].stats.errors == 2
+
+
+def test_half_open_breaker_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+
+def test_hung_call_times_out_and_counts_against_the_backend(llm_models, fast_settings, monkeypatch):
+    llm_models["default"] = FakeChatModel(hang_rate=1.0, hang_seconds=30)
+    routed = _route(monkeypatch, {"provider": "fake"})
+
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(routed.ainvoke(PROMPT))
+
+    assert time.monotonic() - start < 2
+    assert routed.backends[0].breaker.failures == 1
+
+
+def test_deadline_is_not_retried_on_another_backend(llm_models, fast_settings, monkeypatch):
+    llm_models["hung"] = FakeChatModel(hang_rate=1.0, hang_seconds=30)
+    llm_models["good"] = FakeChatModel(response="ok")
+    routed = _route(
+        monkeypatch, {"provider": "fake", "model": "hung", "weight": 1e6}, {"provider": "fake", "model": "good"}
+    )
+
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(routed.ainvoke(PROMPT))
+    assert llm_models["good"].calls == 0
+
+
+def test_cancelled_call_is_not_a_backend_failure(llm_models, fast_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_timeouts", {"risk_analysis": 30})
+    llm_models["default"] = FakeChatModel(hang_rate=1.0, hang_seconds=30)
+    routed = _route(monkeypatch, {"provider": "fake"})
+
+    async def abandon():
+        call = asyncio.ensure_future(routed.ainvoke(PROMPT))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+
+    asyncio.run(abandon())
+    assert routed.backends[0].breaker.failures == 0
+    assert routed.backends[0].stats.errors == 0
+
+
+def test_hedge_answers_when_the_primary_stalls(llm_models, fast_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedging", True)
+    monkeypatch.setattr(settings, "llm_timeouts", {"risk_analysis": 30})
+    llm_models["slow"] = FakeChatModel(hang_rate=1.0, hang_seconds=30)
+    llm_models["fast"] = FakeChatModel(response="hedged")
+    routed = _route(
+        monkeypatch, {"provider": "fake", "model": "slow", "weight": 1e6}, {"provider": "fake", "model": "fast"}
+    )
+    slow = routed.backends[0]
+    # The hedge goes out once the primary exceeds its usual (p95) latency
+    for _ in range(5):
+        slow.stats.record(0.02, ok=True)
+
+    start = time.monotonic()
+    result = asyncio.run(routed.ainvoke(PROMPT))
+
+    assert result.content == "hedged"
+    assert time.monotonic() - start < 2
+    # The abandoned primary is cancelled, not counted as a failure
+    assert slow.breaker.failures == 0
+
+
+def test_half_open_secondary_keeps_its_probe_when_the_primary_answers(llm_models, fast_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_circuit_reset_seconds", 0.05)
+    llm_models["primary"] = FakeChatModel(response="ok")
+    llm_models["secondary"] = FakeChatModel(response="ok")
+    routed = _route(
+        monkeypatch, {"provider": "fake", "model": "primary", "weight": 1e6},
+        {"provider": "fake", "model": "secondary"}
+    )
+    secondary = routed.backends[1].breaker
+    for _ in range(2):
+        secondary.record_failure()
+    time.sleep(0.06)
+
+    asyncio.run(routed.ainvoke(PROMPT))
+
+    assert llm_models["secondary"].calls == 0
+    assert secondary.state == CircuitState.HALF_OPEN
+    assert secondary.allow()
@@ -0,0 +1,32 @@
+"""Tests for token-budgeted text splitting."""
+
+import math
+
+from app.core import tokens
+from app.core.tokens import split_to_tokens
+
+
+def test_oversized_paragraph_keeps_its_line_breaks():
+    lines = [f"line {i} " + "x" * 30 for i in range(6)]
+    text = "intro\n\n" + "\n".join(lines) + "\n\noutro"
+
+    chunks = split_to_tokens(text, 25, "fake")
+
+    assert len(chunks) > 1
+    assert all(chunk in text for chunk in chunks)
+    assert any(chunk.count("\n") > 1 for chunk in chunks)
+
+
+def test_oversized_line_is_shrunk_until_each_piece_fits(monkeypatch):
+    def count_tokens(text, provider=None):
+        # Digits cost a token each, everything else a quarter token.
+        digits = sum(c.isdigit() for c in text)
+        return digits + math.ceil((len(text) - digits) / 4)
+
+    monkeypatch.setattr(tokens, "count_tokens", count_tokens)
+    line = "a" * 200 + "1" * 100
+
+    chunks = split_to_tokens(line, 20, "fake")
+
+    assert "".join(chunks) == line
+    assert all(count_tokens(chunk) <= 20 for chunk in chunks)